@@ -0,0 +1,93 @@
+"""Memory and filter latency of the columnar memory engine against MemoryRepository.
+
+Run with ``python -m benchmarks.columnar_memory [ROWS]``.
+Memory is what tracemalloc sees allocated by filling the engine, so it includes
+the indexes of MemoryRepository and the content table of ColumnarRepository.
+"""
+
+import asyncio
+import gc
+import sys
+import time
+import tracemalloc
+
+from simple_example.domain_logic.consts import DataTypeEnum
+from simple_example.domain_logic.models import DataEntity, Filters
+from simple_example.repository_implementation.columnar_repo import (
+    ColumnarDatabase,
+    ColumnarRepository,
+)
+from simple_example.repository_implementation.memory_repo import (
+    Database,
+    MemoryRepository,
+)
+
+DATA_TYPES = list(DataTypeEnum)
+ENGINES = {
+    "memory": (Database, MemoryRepository),
+    "columnar": (ColumnarDatabase, ColumnarRepository),
+}
+QUERIES = {
+    "data_type, page of 100": Filters(
+        data_type=DataTypeEnum.ULTRA_SUPRA_COOL, limit=100
+    ),
+    "count range, page of 100": Filters(
+        count_lower_limit=10, count_upper_limit=12, limit=100
+    ),
+    "count point + type": Filters(
+        data_type=DataTypeEnum.SIMPLE, count_lower_limit=50, count_upper_limit=50
+    ),
+    "count range": Filters(count_lower_limit=10, count_upper_limit=12),
+    "search": Filters(search_string="em-12345"),
+    "search + type": Filters(search_string="7777", data_type=DataTypeEnum.COMPLEX),
+}
+REPEAT = 5
+
+
+def fill(engine: str, rows: int):
+    database_class, repository_class = ENGINES[engine]
+    gc.collect()
+    tracemalloc.start()
+    database = database_class()
+    for i in range(rows):
+        database.add(
+            DataEntity(
+                id=i + 1,
+                name=f"item-{i}",
+                data_type=DATA_TYPES[i % len(DATA_TYPES)],
+                count=i % 100,
+            )
+        )
+    gc.collect()
+    allocated, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return repository_class(database=database), allocated
+
+
+async def run(rows: int):
+    for engine in ENGINES:
+        start = time.perf_counter()
+        repository, allocated = fill(engine, rows)
+        print(
+            f"{engine:<9} {rows} rows filled in {time.perf_counter() - start:.1f} s, "
+            f"{allocated / 2**20:8.1f} MiB, {allocated / rows:6.0f} bytes per row"
+        )
+        for name, filters in QUERIES.items():
+            start = time.perf_counter()
+            for _ in range(REPEAT):
+                result = await repository.list(filters=filters)
+            elapsed = (time.perf_counter() - start) / REPEAT
+            print(
+                f"{engine:<9} {name:<26} {len(result):>8} results "
+                f"{elapsed * 1000:9.2f} ms"
+            )
+        del repository
+
+
+def main():
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    asyncio.run(run(rows))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+"""Latency of full responses against revalidations answered with 304.
+
+Run with ``python -m benchmarks.conditional_requests [ROWS] [REQUESTS]``.
+Requests go straight to the ASGI app of the ``memory`` backend. A
+revalidation sends the ``ETag`` of the previous response in
+``If-None-Match``; list tags come from the dataset version, so an
+unchanged list is answered before the query runs.
+"""
+
+import asyncio
+import logging
+import os
+import sys
+import time
+
+import httpx
+
+from simple_example.domain_logic.consts import DataTypeEnum
+from simple_example.domain_logic.models import DataEntity
+from simple_example.web_app_example.application_factory import app_setup
+
+DATA_TYPES = list(DataTypeEnum)
+PATHS = [
+    "/api/data/?limit=1000",
+    "/api/data/?data_type=2&count_lower_limit=50&limit=1000",
+    "/api/data/stats",
+    "/api/data/1234",
+]
+
+
+async def measure(client: httpx.AsyncClient, path: str, requests: int, headers):
+    start = time.perf_counter()
+    for _ in range(requests):
+        response = await client.get(path, headers=headers)
+    return response, (time.perf_counter() - start) / requests
+
+
+async def run(rows: int, requests: int):
+    os.environ.update(API_PREFIX="/api", USE_DATABASE="False")
+    app = app_setup()
+    logging.getLogger().setLevel(logging.WARNING)
+    for i in range(rows):
+        app.state.database.add(
+            DataEntity(
+                id=i + 1,
+                name=f"item-{i + 1}",
+                data_type=DATA_TYPES[i % len(DATA_TYPES)],
+                count=i % 100,
+            )
+        )
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(
+        transport=transport, base_url="http://bench"
+    ) as client:
+        for path in PATHS:
+            response, full = await measure(client, path, requests, {})
+            tag = response.headers["etag"]
+            response, revalidated = await measure(
+                client, path, requests, {"If-None-Match": tag}
+            )
+            assert response.status_code == 304
+            print(
+                f"{path:<44} 200 {full * 1e6:9.1f} us  "
+                f"304 {revalidated * 1e6:7.1f} us  {full / revalidated:6.1f}x"
+            )
+
+
+def main():
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    requests = int(sys.argv[2]) if len(sys.argv) > 2 else 200
+    asyncio.run(run(rows, requests))
+
+
+if __name__ == "__main__":
+    main()
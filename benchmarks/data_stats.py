@@ -0,0 +1,103 @@
+"""Latency of repository stats against listing every item and counting them.
+
+Run with ``python -m benchmarks.data_stats [ROWS]``.
+Counting a full list is what dashboards did before ``GET /data/stats``. The
+memory and columnar engines answer unsearched stats from histograms kept by
+every write, the sqlite backend runs one GROUP BY on a temporary file.
+"""
+
+import asyncio
+import os
+import sys
+import tempfile
+import time
+
+from simple_example.domain_logic.consts import DataTypeEnum
+from simple_example.domain_logic.models import DataEntity, Filters, InputModel
+from simple_example.repository_implementation.columnar_repo import (
+    ColumnarDatabase,
+    ColumnarRepository,
+)
+from simple_example.repository_implementation.memory_repo import (
+    Database,
+    MemoryRepository,
+)
+from simple_example.repository_implementation.sqlalchemy_repo import SQLRepository
+from simple_example.repository_implementation.sqlite_repo import (
+    setup_sqlite_connection,
+)
+
+DATA_TYPES = list(DataTypeEnum)
+QUERIES = {
+    "all": Filters(),
+    "data_type + count range": Filters(
+        data_type=DataTypeEnum.COMPLEX, count_lower_limit=10, count_upper_limit=40
+    ),
+    "search": Filters(search_string="item-1234"),
+}
+REPEAT = 5
+
+
+def items(rows: int):
+    for i in range(rows):
+        yield DataEntity(
+            id=i + 1,
+            name=f"item-{i + 1}",
+            data_type=DATA_TYPES[i % len(DATA_TYPES)],
+            count=i % 100,
+        )
+
+
+async def timed(call) -> float:
+    start = time.perf_counter()
+    for _ in range(REPEAT):
+        await call()
+    return (time.perf_counter() - start) / REPEAT
+
+
+async def compare(engine: str, repository):
+    for name, filters in QUERIES.items():
+
+        async def count_list():
+            listed = await repository.list(filters=filters)
+            totals = {}
+            for item in listed:
+                totals[item.data_type, item.count] = (
+                    totals.get((item.data_type, item.count), 0) + 1
+                )
+
+        listing = await timed(count_list)
+        stats = await timed(lambda: repository.stats(filters=filters))
+        print(
+            f"{engine:<9} {name:<24} list and count {listing * 1000:9.2f} ms, "
+            f"stats {stats * 1000:8.3f} ms"
+        )
+
+
+async def run(rows: int):
+    database = Database()
+    columnar = ColumnarDatabase()
+    for item in items(rows):
+        database.add(item)
+        columnar.add(item)
+    await compare("memory", MemoryRepository(database=database))
+    await compare("columnar", ColumnarRepository(database=columnar))
+
+    with tempfile.TemporaryDirectory() as directory:
+        sql_database = setup_sqlite_connection(os.path.join(directory, "data.db"))
+        await sql_database.connect()
+        repository = SQLRepository(database=sql_database, trusted_rows=True)
+        batch = []
+        for item in items(rows):
+            batch.append(InputModel(**item.model_dump(exclude={"id"})))
+            if len(batch) == 1000:
+                await repository.bulk_create(input_data=batch)
+                batch = []
+        if batch:
+            await repository.bulk_create(input_data=batch)
+        await compare("sqlite", repository)
+        await sql_database.disconnect()
+
+
+if __name__ == "__main__":
+    asyncio.run(run(int(sys.argv[1]) if len(sys.argv) > 1 else 100000))
@@ -0,0 +1,39 @@
+"""Peak memory allocated while exporting the whole table as NDJSON.
+
+Run with ``python -m benchmarks.export_memory [ROWS ...]``.
+"""
+
+import asyncio
+import sys
+import time
+import tracemalloc
+
+from benchmarks.memory_filter import fill
+from simple_example.domain_logic.models import Filters
+from simple_example.web_app_example.endpoints import ndjson_lines
+
+
+async def run(rows: int):
+    repository = fill(rows)
+    tracemalloc.start()
+    start = time.perf_counter()
+    exported = 0
+    async for chunk in ndjson_lines(repository.iter_list(filters=Filters())):
+        exported += len(chunk)
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(
+        f"{rows:>9} rows  {exported / 2**20:8.1f} MiB exported  "
+        f"peak {peak / 2**20:6.2f} MiB  {elapsed:6.2f}s"
+    )
+
+
+def main():
+    sizes = [int(arg) for arg in sys.argv[1:]] or [10_000, 100_000, 1_000_000]
+    for rows in sizes:
+        asyncio.run(run(rows))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+"""First request latency after startup, with and without the warm-up.
+
+Run with ``python -m benchmarks.first_request [ROWS]``.
+Each variant runs in a fresh interpreter so import and validator caches
+start cold. The app is served by ``SQLRepository`` on a temporary SQLite
+file (needs aiosqlite) and requests go straight to the ASGI app.
+"""
+
+import asyncio
+import logging
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+import httpx
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from simple_example.domain_logic.consts import DataTypeEnum
+from simple_example.domain_logic.models import DataEntity
+from simple_example.repository_implementation.sqlalchemy_repo import (
+    Database,
+    EntityDataTable,
+    SQLRepository,
+)
+from simple_example.web_app_example.application_factory import app_setup
+from simple_example.web_app_example.db_initialize import create_manager
+
+
+async def fill(database: Database, rows: int):
+    await database.connect()
+    async with database.engine.begin() as conn:
+        await conn.execute(
+            EntityDataTable.insert(),
+            [
+                {"name": f"item-{i}", "data_type": DataTypeEnum.SIMPLE, "count": 0}
+                for i in range(rows)
+            ],
+        )
+    await database.disconnect()
+
+
+async def measure(database_url: str, warmup: bool):
+    os.environ.update(API_PREFIX="/api", USE_DATABASE="False", WARMUP=str(warmup))
+    app = app_setup()
+    logging.getLogger().setLevel(logging.WARNING)
+    app.state.database = Database(create_async_engine(database_url))
+    app.state.repository = SQLRepository(database=app.state.database)
+    app.state.manager = create_manager(app.state.settings, app.state.repository)
+
+    start = time.perf_counter()
+    async with app.router.lifespan_context(app):
+        startup = time.perf_counter() - start
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(
+            transport=transport, base_url="http://bench"
+        ) as client:
+            timings = []
+            for _ in range(3):
+                start = time.perf_counter()
+                response = await client.get("/api/data/", params={"limit": 100})
+                timings.append(time.perf_counter() - start)
+                DataEntity.model_validate(response.json()[0])
+    print(
+        f"warm-up {'on ' if warmup else 'off'}  startup {startup * 1000:7.1f} ms  "
+        + "  ".join(
+            f"request {i + 1} {timing * 1000:6.1f} ms"
+            for i, timing in enumerate(timings)
+        )
+    )
+
+
+def main():
+    if len(sys.argv) > 2:
+        asyncio.run(measure(sys.argv[1], warmup=sys.argv[2] == "True"))
+        return
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 10000
+    with tempfile.TemporaryDirectory() as directory:
+        database_url = f"sqlite+aiosqlite:///{directory}/bench.db"
+        asyncio.run(fill(Database(create_async_engine(database_url)), rows))
+        for warmup in (False, True, False, True):
+            subprocess.run(
+                [sys.executable, "-m", "benchmarks.first_request", database_url]
+                + [str(warmup)],
+                check=True,
+            )
+
+
+if __name__ == "__main__":
+    main()
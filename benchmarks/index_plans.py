@@ -0,0 +1,131 @@
+"""Query plans and latencies of the filter queries before and after the indexes.
+
+Run with ``python -m benchmarks.index_plans [ROWS] [DATABASE_URL]``.
+Without DATABASE_URL a temporary SQLite file is used (needs aiosqlite).
+The table is filled without its indexes, measured, then ``Database.connect``
+adds the missing indexes and the same queries are measured again.
+"""
+
+import asyncio
+import statistics
+import sys
+import tempfile
+import time
+
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from simple_example.domain_logic.consts import DataTypeEnum
+from simple_example.domain_logic.models import Filters, InputModel
+from simple_example.repository_implementation.sqlalchemy_repo import (
+    Database,
+    EntityDataTable,
+    SQLRepository,
+)
+
+DATA_TYPES = list(DataTypeEnum)
+INSERT_CHUNK = 10000
+REPEAT = 20
+EXISTING = InputModel(name="item-500000", data_type=DATA_TYPES[0], count=0)
+QUERIES = {
+    "exists": lambda repository: repository.exists(input_data=EXISTING),
+    "type + count range": lambda repository: repository.list(
+        filters=Filters(
+            data_type=DataTypeEnum.COMPLEX, count_lower_limit=10, count_upper_limit=11
+        )
+    ),
+    "type + count point, page": lambda repository: repository.list(
+        filters=Filters(
+            data_type=DataTypeEnum.ULTRA_SUPRA_COOL,
+            count_lower_limit=50,
+            count_upper_limit=50,
+            limit=100,
+        )
+    ),
+}
+EXPLAIN = {
+    "sqlite": "EXPLAIN QUERY PLAN ",
+    "postgresql": "EXPLAIN ",
+}
+
+
+async def fill(database: Database, rows: int):
+    async with database.engine.begin() as conn:
+        await conn.run_sync(EntityDataTable.drop, checkfirst=True)
+        await conn.run_sync(EntityDataTable.create)
+        for index in EntityDataTable.indexes:
+            await conn.run_sync(index.drop)
+        for start in range(0, rows, INSERT_CHUNK):
+            await conn.execute(
+                EntityDataTable.insert(),
+                [
+                    {
+                        "name": f"item-{i}",
+                        "data_type": DATA_TYPES[i % len(DATA_TYPES)],
+                        "count": i % 100,
+                    }
+                    for i in range(start, min(start + INSERT_CHUNK, rows))
+                ],
+            )
+
+
+async def explain(database: Database, query) -> list:
+    # the plan of the statement the repository actually sends
+    statements = []
+
+    def capture(conn, cursor, statement, parameters, context, many):
+        statements.append((statement, parameters))
+
+    event.listen(database.engine.sync_engine, "before_cursor_execute", capture)
+    try:
+        await query(SQLRepository(database=database))
+    finally:
+        event.remove(database.engine.sync_engine, "before_cursor_execute", capture)
+    statement, parameters = statements[-1]
+    async with database.engine.connect() as conn:
+        result = await conn.exec_driver_sql(
+            EXPLAIN[database.engine.dialect.name] + statement, parameters
+        )
+        return [row[-1] for row in result]
+
+
+async def measure(database: Database, label: str):
+    repository = SQLRepository(database=database)
+    for name, query in QUERIES.items():
+        plan = await explain(database, query)
+        timings = []
+        for _ in range(REPEAT):
+            start = time.perf_counter()
+            await query(repository)
+            timings.append(time.perf_counter() - start)
+        print(
+            f"{label:<7} {name:<25} median {statistics.median(timings) * 1000:9.3f} ms"
+        )
+        for line in plan:
+            print(f"{'':<8}plan: {line}")
+
+
+async def run(rows: int, database_url: str):
+    database = Database(create_async_engine(database_url))
+    start = time.perf_counter()
+    await fill(database, rows)
+    print(f"filled {rows} rows in {time.perf_counter() - start:.1f} s")
+    await measure(database, "before")
+    start = time.perf_counter()
+    await database.connect()
+    print(f"connect added the indexes in {time.perf_counter() - start:.1f} s")
+    await measure(database, "after")
+    await database.disconnect()
+
+
+def main():
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 1000000
+    if len(sys.argv) > 2:
+        asyncio.run(run(rows, sys.argv[2]))
+        return
+    with tempfile.TemporaryDirectory() as directory:
+        asyncio.run(run(rows, f"sqlite+aiosqlite:///{directory}/bench.db"))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,42 @@
+"""Request overhead of the instrumentation middleware and manager spans.
+
+Run with ``python -m benchmarks.instrumentation_overhead [REQUESTS]``.
+Requests go straight to the ASGI app, see ``request_overhead``.
+"""
+
+import asyncio
+import logging
+import os
+import sys
+
+import httpx
+
+from benchmarks.request_overhead import measure
+from simple_example.web_app_example.application_factory import app_setup
+
+
+async def run(requests: int):
+    os.environ.update(API_PREFIX="/api", USE_DATABASE="False")
+    clients = {}
+    for instrumentation in ("False", "True"):
+        os.environ["INSTRUMENTATION"] = instrumentation
+        app = app_setup()
+        clients[instrumentation] = httpx.AsyncClient(
+            transport=httpx.ASGITransport(app=app), base_url="http://bench"
+        )
+    logging.getLogger().setLevel(logging.WARNING)
+    for _ in range(2):
+        for instrumentation, client in clients.items():
+            print(f"instrumentation {instrumentation:<5}", end=" ")
+            await measure(client, "/api/data/", requests)
+    for client in clients.values():
+        await client.aclose()
+
+
+def main():
+    requests = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+    asyncio.run(run(requests))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,131 @@
+"""Logging throughput across handler configurations.
+
+Run with ``python -m benchmarks.logging_throughput [RECORDS]``.
+Console output goes to /dev/null and files to a temporary folder.
+``legacy`` swaps in the previous formatters, which ran ``re.sub`` on the
+whole formatted line once per handler, and drops the redacting handler filters.
+"""
+
+import contextlib
+import logging
+import os
+import re
+import sys
+import tempfile
+import time
+from typing import List, Tuple
+
+from simple_example.web_app_example.logger import (
+    AppFormatter,
+    Redactor,
+    get_standard_logger,
+    stop_async_logging,
+)
+from simple_example.web_app_example.settings import LoggingConfiguration
+
+CONFIGURATIONS = {
+    "console": {},
+    "level files": {"LOG_TO_FILE": True, "LOG_TO_LEVEL_FILES": True},
+    "level files + json": {
+        "LOG_TO_FILE": True,
+        "LOG_TO_LEVEL_FILES": True,
+        "LOG_JSON": True,
+        "JSON_LOG_FILE": "log.json",
+    },
+    "level files + json, async": {
+        "LOG_TO_FILE": True,
+        "LOG_TO_LEVEL_FILES": True,
+        "LOG_JSON": True,
+        "JSON_LOG_FILE": "log.json",
+        "LOG_ASYNC": True,
+        "LOG_QUEUE_FULL": "block",
+        # room for every record, so the calls are timed without waiting for the listener
+        "LOG_QUEUE_SIZE": 1000000,
+    },
+}
+
+
+class LegacyAppFormatter(logging.Formatter):
+    def format(self, record: logging.LogRecord):
+        return re.sub(
+            r":\/\/(.*?)\@", r":***:***@//", logging.Formatter.format(self, record)
+        )
+
+
+def use_legacy_formatters(logger: logging.Logger):
+    for handler in logger.handlers + logging.getLogger().handlers:
+        for log_filter in handler.filters[:]:
+            if isinstance(log_filter, Redactor):
+                handler.removeFilter(log_filter)
+        if isinstance(handler.formatter, AppFormatter):
+            handler.setFormatter(LegacyAppFormatter(handler.formatter._fmt))
+
+
+def measure(logger: logging.Logger, records: int) -> Tuple[float, float]:
+    # the time the logging calls take, and until every record is written
+    start = time.perf_counter()
+    for i in range(records):
+        if i % 2:
+            logger.info("connected to %s", "postgresql://user:secret@db:5432/app")
+        else:
+            logger.info("data passed: %s", i)
+    calls = time.perf_counter() - start
+    stop_async_logging()
+    return calls, time.perf_counter() - start
+
+
+def run(name: str, options: dict, legacy: bool, records: int, log_path: str) -> str:
+    logger = get_standard_logger(
+        name=f"{name}{' legacy' if legacy else ''}",
+        log_settings=LoggingConfiguration(
+            LOG_PATH=log_path, LOG_SQL=False, MIN_LOG_LEVEL=logging.INFO, **options
+        ),
+    )
+    if legacy:
+        use_legacy_formatters(logger)
+    calls, elapsed = measure(logger, records)
+    for handler in logger.handlers[:]:
+        logger.removeHandler(handler)
+        handler.close()
+    return (
+        f"{name:<26} {'legacy' if legacy else 'current':<8} "
+        f"{records / elapsed:9.0f} records/s, calls {records / calls:9.0f}/s"
+    )
+
+
+def measure_redaction(records: int) -> List[str]:
+    # redaction cost alone, for a plain and a credential carrying line
+    redactor = Redactor(LoggingConfiguration().REDACTION_RULES)
+    redactions = {
+        "legacy": lambda line: re.sub(r":\/\/(.*?)\@", r":***:***@//", line),
+        "current": redactor.redact,
+    }
+    results = []
+    for line in ("data passed: 1", "connected to postgresql://user:secret@db:5432/app"):
+        for name, redact in redactions.items():
+            start = time.perf_counter()
+            for _ in range(records):
+                redact(line)
+            elapsed = time.perf_counter() - start
+            results.append(
+                f"redaction only {'url' if '://' in line else 'plain':<11} {name:<8} "
+                f"{elapsed * 1e9 / records:9.0f} ns/record"
+            )
+    return results
+
+
+def main():
+    records = int(sys.argv[1]) if len(sys.argv) > 1 else 50000
+    results = measure_redaction(records)
+    # console handlers keep the stream they were created with, so all runs write to devnull
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(
+        devnull
+    ), tempfile.TemporaryDirectory() as log_path:
+        for name, options in CONFIGURATIONS.items():
+            for legacy in (True, False):
+                results.append(run(name, options, legacy, records, log_path))
+    print("\n".join(results))
+
+
+if __name__ == "__main__":
+    main()
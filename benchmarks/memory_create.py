@@ -0,0 +1,44 @@
+"""Create throughput of the in-memory repository.
+
+Run with ``python -m benchmarks.memory_create [ROWS ...]``.
+"""
+
+import asyncio
+import sys
+import time
+
+from simple_example.domain_logic.consts import DataTypeEnum
+from simple_example.domain_logic.manager import DomainLogicManager
+from simple_example.domain_logic.models import InputModel
+from simple_example.repository_implementation.memory_repo import (
+    Database,
+    MemoryRepository,
+)
+
+DATA_TYPES = list(DataTypeEnum)
+
+
+def make_input(i: int) -> InputModel:
+    return InputModel(
+        name=f"item-{i}", data_type=DATA_TYPES[i % len(DATA_TYPES)], count=i % 100
+    )
+
+
+async def run(rows: int):
+    manager = DomainLogicManager(repository=MemoryRepository(database=Database()))
+    inputs = [make_input(i) for i in range(rows)]
+    start = time.perf_counter()
+    for input_data in inputs:
+        await manager.create(input_data)
+    elapsed = time.perf_counter() - start
+    print(f"{rows:>9} rows: {elapsed:8.2f}s  {rows / elapsed:>10.0f} creates/s")
+
+
+def main():
+    sizes = [int(arg) for arg in sys.argv[1:]] or [10_000, 100_000, 1_000_000]
+    for rows in sizes:
+        asyncio.run(run(rows))
+
+
+if __name__ == "__main__":
+    main()
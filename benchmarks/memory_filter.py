@@ -0,0 +1,62 @@
+"""Filtered list latency of the in-memory repository.
+
+Run with ``python -m benchmarks.memory_filter [ROWS ...]``.
+"""
+
+import asyncio
+import sys
+import time
+
+from simple_example.domain_logic.consts import DataTypeEnum
+from simple_example.domain_logic.models import DataEntity, Filters
+from simple_example.repository_implementation.memory_repo import (
+    Database,
+    MemoryRepository,
+)
+
+DATA_TYPES = list(DataTypeEnum)
+QUERIES = {
+    "data_type": Filters(data_type=DataTypeEnum.ULTRA_SUPRA_COOL),
+    "count range": Filters(count_lower_limit=10, count_upper_limit=12),
+    "count point + type": Filters(
+        data_type=DataTypeEnum.SIMPLE, count_lower_limit=50, count_upper_limit=50
+    ),
+}
+REPEAT = 5
+
+
+def fill(rows: int) -> MemoryRepository:
+    database = Database()
+    for i in range(rows):
+        database.add(
+            DataEntity(
+                id=i + 1,
+                name=f"item-{i}",
+                data_type=DATA_TYPES[i % len(DATA_TYPES)],
+                count=i % 100,
+            )
+        )
+    return MemoryRepository(database=database)
+
+
+async def run(rows: int):
+    repository = fill(rows)
+    for name, filters in QUERIES.items():
+        start = time.perf_counter()
+        for _ in range(REPEAT):
+            result = await repository.list(filters=filters)
+        elapsed = (time.perf_counter() - start) / REPEAT
+        print(
+            f"{rows:>9} rows  {name:<20} {len(result):>8} results  "
+            f"{elapsed * 1000:9.2f} ms"
+        )
+
+
+def main():
+    sizes = [int(arg) for arg in sys.argv[1:]] or [10_000, 100_000, 1_000_000]
+    for rows in sizes:
+        asyncio.run(run(rows))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,110 @@
+"""Restart time of the persistent memory backend.
+
+Run with ``python -m benchmarks.memory_restart [ROWS] [FOLDER]``.
+Rows are written through the write log, then the database is opened again
+three times: from the log alone (a crash before any snapshot), from a snapshot
+plus a log tail of 1% of the rows, and from a snapshot written at shutdown.
+Reading the files and building the models and indexes are timed separately,
+as is the copy of the rows a background snapshot takes on the event loop.
+"""
+
+import asyncio
+import os
+import sys
+import tempfile
+import time
+
+from simple_example.domain_logic.consts import DataTypeEnum
+from simple_example.domain_logic.models import DataEntity
+from simple_example.repository_implementation.memory_persistence import (
+    LOG_FILE,
+    SNAPSHOT_FILE,
+    PersistentDatabase,
+    read_snapshot,
+    replay,
+)
+
+DATA_TYPES = list(DataTypeEnum)
+
+
+def entity(i: int) -> DataEntity:
+    return DataEntity(
+        id=i + 1,
+        name=f"item-{i}",
+        data_type=DATA_TYPES[i % len(DATA_TYPES)],
+        count=i % 100,
+    )
+
+
+def files(folder: str) -> str:
+    sizes = [
+        f"{name} {os.path.getsize(os.path.join(folder, name)) / 2**20:.1f} MiB"
+        for name in (SNAPSHOT_FILE, LOG_FILE)
+        if os.path.exists(os.path.join(folder, name))
+    ]
+    return ", ".join(sizes)
+
+
+async def restart(folder: str, label: str) -> PersistentDatabase:
+    start = time.perf_counter()
+    rows = {}
+    read_snapshot(os.path.join(folder, SNAPSHOT_FILE), rows)
+    with open(os.path.join(folder, LOG_FILE), "rb") as file:
+        replay(file.read(), rows)
+    read = time.perf_counter() - start
+
+    database = PersistentDatabase(folder, snapshot_every=10**9)
+    start = time.perf_counter()
+    await database.connect()
+    elapsed = time.perf_counter() - start
+    print(
+        f"{label:<26} {len(database.storage):>8} rows  restart {elapsed:6.2f} s  "
+        f"(reading the files {read:5.2f} s)  {files(folder)}"
+    )
+    return database
+
+
+async def run(rows: int, folder: str):
+    database = PersistentDatabase(folder, snapshot_every=10**9)
+    await database.connect()
+    start = time.perf_counter()
+    for i in range(rows):
+        database.add(entity(i))
+    print(f"wrote {rows} rows through the log in {time.perf_counter() - start:.1f} s")
+    database.close()
+    # the closed database is freed first, its objects would slow the next start down
+    database = None
+
+    database = await restart(folder, "log only")
+    start = time.perf_counter()
+    database.rows()
+    print(
+        "copying the rows for a background snapshot pauses the loop for "
+        f"{(time.perf_counter() - start) * 1000:.0f} ms"
+    )
+    start = time.perf_counter()
+    database.snapshot()
+    print(f"snapshot written in {time.perf_counter() - start:.2f} s")
+    for i in range(rows // 100):
+        database.change(database.storage[i + 1], {"count": (i + 1) % 100})
+    database.close()
+    database = None
+
+    database = await restart(folder, "snapshot + 1% log tail")
+    await database.disconnect()
+    database = None
+    database = await restart(folder, "snapshot after shutdown")
+    database.close()
+
+
+def main():
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    if len(sys.argv) > 2:
+        asyncio.run(run(rows, sys.argv[2]))
+        return
+    with tempfile.TemporaryDirectory() as folder:
+        asyncio.run(run(rows, folder))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+"""Name search latency of the in-memory repository against dataset size.
+
+Run with ``python -m benchmarks.memory_search [ROWS ...]``.
+"""
+
+import asyncio
+import random
+import string
+import sys
+import time
+
+from simple_example.domain_logic.consts import DataTypeEnum
+from simple_example.domain_logic.models import DataEntity, Filters
+from simple_example.repository_implementation.memory_repo import (
+    Database,
+    MemoryRepository,
+)
+
+DATA_TYPES = list(DataTypeEnum)
+SEARCHES = 50
+
+
+def fill(rows: int, rng: random.Random) -> MemoryRepository:
+    database = Database()
+    for i in range(rows):
+        database.add(
+            DataEntity(
+                id=i + 1,
+                name="".join(rng.choices(string.ascii_letters, k=12)),
+                data_type=DATA_TYPES[i % len(DATA_TYPES)],
+                count=i % 100,
+            )
+        )
+    return MemoryRepository(database=database)
+
+
+async def run(rows: int):
+    rng = random.Random(rows)
+    repository = fill(rows, rng)
+    names = [item.name for item in repository.database.storage.values()]
+    searches = []
+    for name in rng.sample(names, SEARCHES):
+        start = rng.randrange(len(name) - 4)
+        searches.append(name[start : start + 4])
+
+    start = time.perf_counter()
+    found = 0
+    for search_string in searches:
+        found += len(await repository.list(Filters(search_string=search_string)))
+    indexed = (time.perf_counter() - start) / SEARCHES
+
+    start = time.perf_counter()
+    for search_string in searches:
+        search_string = search_string.lower()
+        [name for name in names if search_string in name.lower()]
+    scan = (time.perf_counter() - start) / SEARCHES
+
+    print(
+        f"{rows:>9} rows  {found / SEARCHES:8.1f} results/search  "
+        f"trigram {indexed * 1000:8.3f} ms  scan {scan * 1000:8.3f} ms"
+    )
+
+
+def main():
+    sizes = [int(arg) for arg in sys.argv[1:]] or [10_000, 100_000, 1_000_000]
+    for rows in sizes:
+        asyncio.run(run(rows))
+
+
+if __name__ == "__main__":
+    main()
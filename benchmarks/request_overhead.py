@@ -0,0 +1,101 @@
+"""Request overhead of the empty-result ``GET /data/`` path.
+
+Run with ``python -m benchmarks.request_overhead [REQUESTS]``.
+Requests go straight to the ASGI app, so the numbers are framework,
+dependency and endpoint cost without network or server overhead.
+``/legacy/data/`` replays the per-request dependency chain that built a
+repository and manager for every request.
+"""
+
+import asyncio
+import logging
+import os
+import sys
+import time
+
+import httpx
+from fastapi import Depends, FastAPI, Request, Response
+
+from simple_example.domain_logic.manager import DomainLogicManager
+from simple_example.domain_logic.models import Filters
+from simple_example.repository_implementation.memory_repo import MemoryRepository
+from simple_example.web_app_example.application_factory import app_setup
+from simple_example.web_app_example.dependencies import search_parameters
+from simple_example.web_app_example.endpoints import list_data
+from simple_example.web_app_example.settings import get_settings
+
+
+def add_legacy_route(app: FastAPI):
+    def legacy_get_repository(settings=Depends(get_settings)):
+        from simple_example.web_app_example.db_initialize import (  # noqa
+            create_database,
+        )
+
+        database = app.state.database
+
+        def inner_get_repository():
+            return MemoryRepository(database)
+
+        return inner_get_repository()
+
+    def legacy_get_single_flight():
+        from simple_example.web_app_example.db_initialize import (  # noqa
+            create_manager,
+        )
+
+        return app.state.manager.single_flight
+
+    def legacy_get_manager(
+        repository=Depends(legacy_get_repository),
+        single_flight=Depends(legacy_get_single_flight),
+    ):
+        return DomainLogicManager(repository=repository, single_flight=single_flight)
+
+    async def legacy_list_data(
+        request: Request,
+        response: Response,
+        filters: Filters = Depends(search_parameters),
+        manager: DomainLogicManager = Depends(legacy_get_manager),
+    ):
+        return await list_data(
+            request, response, filters=filters, if_none_match=None, manager=manager
+        )
+
+    app.add_api_route("/legacy/data/", legacy_list_data, methods=["GET"])
+
+
+async def measure(client: httpx.AsyncClient, path: str, requests: int):
+    for _ in range(100):
+        await client.get(path)
+    start = time.perf_counter()
+    for _ in range(requests):
+        response = await client.get(path)
+    elapsed = time.perf_counter() - start
+    assert response.json() == [], response.text
+    print(
+        f"{path:<14} {requests} requests  {elapsed / requests * 1e6:8.1f} us/request  "
+        f"{requests / elapsed:8.0f} requests/s"
+    )
+
+
+async def run(requests: int):
+    os.environ.update(API_PREFIX="/api", USE_DATABASE="False")
+    app = app_setup()
+    add_legacy_route(app)
+    logging.getLogger().setLevel(logging.WARNING)
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(
+        transport=transport, base_url="http://bench"
+    ) as client:
+        for _ in range(2):
+            await measure(client, "/legacy/data/", requests)
+            await measure(client, "/api/data/", requests)
+
+
+def main():
+    requests = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+    asyncio.run(run(requests))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,65 @@
+"""Cost per row of turning SQL rows into ``DataEntity`` objects.
+
+Run with ``python -m benchmarks.row_hydration [ROWS]``.
+Rows are read once from an in-memory SQLite table, only the hydration
+is timed. ``kwargs`` is the previous ``DataEntity(**row._mapping)``,
+``trusted`` is the cached ``TypeAdapter`` the in-memory backends use.
+"""
+
+import sys
+import time
+
+from sqlalchemy import create_engine, select
+
+from simple_example.domain_logic.consts import DataTypeEnum
+from simple_example.domain_logic.models import (
+    ENTITY_FIELDS,
+    DataEntity,
+    trusted_entity,
+    validated_entity,
+)
+from simple_example.repository_implementation.sqlalchemy_repo import (
+    ENTITY_COLUMNS,
+    EntityDataTable,
+)
+
+HYDRATORS = {
+    "kwargs": lambda row: DataEntity(**row._mapping),
+    "model_construct": lambda row: DataEntity.model_construct(
+        **dict(zip(ENTITY_FIELDS, row))
+    ),
+    "strict": validated_entity,
+    "trusted": trusted_entity,
+}
+REPEAT = 5
+
+
+def main():
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    engine = create_engine("sqlite://")
+    EntityDataTable.metadata.create_all(engine)
+    with engine.begin() as conn:
+        conn.execute(
+            EntityDataTable.insert(),
+            [
+                {
+                    "name": f"item-{i}",
+                    "data_type": DataTypeEnum.SIMPLE,
+                    "count": i % 100,
+                }
+                for i in range(rows)
+            ],
+        )
+        result = conn.execute(select(*ENTITY_COLUMNS)).all()
+    for name, to_entity in HYDRATORS.items():
+        best = float("inf")
+        for _ in range(REPEAT):
+            start = time.perf_counter()
+            items = [to_entity(row) for row in result]
+            best = min(best, time.perf_counter() - start)
+        assert items[-1] == validated_entity(result[-1])
+        print(f"{name:<16} {best * 1e9 / rows:8.0f} ns/row")
+
+
+if __name__ == "__main__":
+    main()
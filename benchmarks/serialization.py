@@ -0,0 +1,44 @@
+"""List response serialization throughput.
+
+Run with ``python -m benchmarks.serialization [ROWS ...]``.
+``default`` is what FastAPI does for a plain list return value
+(``jsonable_encoder`` and ``JSONResponse``), ``fast`` is the
+``FAST_JSON_RESPONSES`` path.
+"""
+
+import sys
+import time
+
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+
+from benchmarks.memory_filter import fill
+from simple_example.web_app_example.endpoints import DATA_ENTITY_LIST
+
+ENCODERS = {
+    "default": lambda items: JSONResponse(jsonable_encoder(items)).body,
+    "fast": lambda items: DATA_ENTITY_LIST.dump_json(items),
+}
+REPEAT = 3
+
+
+def main():
+    sizes = [int(arg) for arg in sys.argv[1:]] or [1000, 10000, 100000]
+    for rows in sizes:
+        items = list(fill(rows).database.storage.values())
+        bodies = {}
+        for name, encode in ENCODERS.items():
+            best = float("inf")
+            for _ in range(REPEAT):
+                start = time.perf_counter()
+                bodies[name] = encode(items)
+                best = min(best, time.perf_counter() - start)
+            print(
+                f"{rows:>7} rows  {name:<8} {best * 1000:9.2f} ms  "
+                f"{rows / best:12.0f} rows/s  {len(bodies[name]) / 1e6:6.2f} MB"
+            )
+        assert len({len(body) for body in bodies.values()}) == 1
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,141 @@
+"""Read throughput of the shared memory engine with several worker processes.
+
+Run with ``python -m benchmarks.shared_memory_reads [ROWS] [SECONDS] [PROCESSES]``.
+One segment is filled once, then 1, 2, 4 ... PROCESSES processes attach to it and
+read for SECONDS each: a get by a random id and a filtered page of 100 per loop.
+Each run is repeated with one more process updating rows the whole time, so the
+readers retry reads that overlap a write. Scaling needs as many free cores as
+processes; PROCESSES defaults to the number of CPUs.
+"""
+
+import asyncio
+import multiprocessing
+import os
+import random
+import sys
+import time
+import uuid
+
+from simple_example.domain_logic.consts import DataTypeEnum
+from simple_example.domain_logic.models import DataEntity, Filters, InputModel
+from simple_example.repository_implementation.columnar_repo import ColumnarRepository
+from simple_example.repository_implementation.shared_repo import SharedMemoryDatabase
+
+DATA_TYPES = list(DataTypeEnum)
+PAGE = Filters(data_type=DataTypeEnum.COMPLEX, count_lower_limit=10, limit=100)
+
+
+def open_database(name: str, rows: int) -> SharedMemoryDatabase:
+    database = SharedMemoryDatabase(name, capacity=rows, name_capacity=16 * rows)
+    database.open()
+    return database
+
+
+def read(name: str, rows: int, seconds: float, start, results):
+    async def loop() -> int:
+        database = open_database(name, rows)
+        repository = ColumnarRepository(database=database)
+        rng = random.Random(os.getpid())
+        start.wait()
+        reads = 0
+        deadline = time.perf_counter() + seconds
+        while time.perf_counter() < deadline:
+            await repository.get(item_id=rng.randrange(1, rows + 1))
+            await repository.list(filters=PAGE)
+            reads += 2
+        database.close()
+        return reads
+
+    results.put(asyncio.run(loop()))
+
+
+def write(name: str, rows: int, start, stop, results):
+    async def loop() -> int:
+        database = open_database(name, rows)
+        repository = ColumnarRepository(database=database)
+        rng = random.Random(0)
+        start.wait()
+        writes = 0
+        while not stop.is_set():
+            item_id = rng.randrange(1, rows + 1)
+            await repository.update(
+                item_id=item_id,
+                update_data=InputModel(
+                    name=f"item-{item_id}",
+                    data_type=DATA_TYPES[item_id % len(DATA_TYPES)],
+                    count=rng.randrange(100),
+                ),
+            )
+            writes += 1
+        database.close()
+        return writes
+
+    results.put(asyncio.run(loop()))
+
+
+def measure(name: str, rows: int, seconds: float, processes: int, writer: bool):
+    context = multiprocessing.get_context("spawn")
+    start, stop, results = context.Event(), context.Event(), context.Queue()
+    readers = [
+        context.Process(target=read, args=(name, rows, seconds, start, results))
+        for _ in range(processes)
+    ]
+    writers = (
+        [context.Process(target=write, args=(name, rows, start, stop, results))]
+        if writer
+        else []
+    )
+    for process in readers + writers:
+        process.start()
+    # let every process attach before the clock starts
+    time.sleep(1 + 0.2 * processes)
+    start.set()
+    reads = sum(results.get() for _ in readers)
+    stop.set()
+    writes = sum(results.get() for _ in writers)
+    for process in readers + writers:
+        process.join()
+    return reads / seconds, writes / seconds
+
+
+async def fill(database: SharedMemoryDatabase, rows: int):
+    async with database.writing():
+        for i in range(rows):
+            database.add(
+                DataEntity(
+                    id=i + 1,
+                    name=f"item-{i + 1}",
+                    data_type=DATA_TYPES[i % len(DATA_TYPES)],
+                    count=i % 100,
+                )
+            )
+
+
+def run(rows: int, seconds: float, max_processes: int):
+    name = f"benchmark-{uuid.uuid4().hex[:12]}"
+    database = open_database(name, rows)
+    started = time.perf_counter()
+    asyncio.run(fill(database, rows))
+    print(f"{rows} rows filled in {time.perf_counter() - started:.1f} s")
+    started = time.perf_counter()
+    open_database(name, rows).close()
+    print(f"attaching takes {(time.perf_counter() - started) * 1000:.2f} ms")
+
+    processes = 1
+    while processes <= max_processes:
+        for writer in (False, True):
+            reads, writes = measure(name, rows, seconds, processes, writer)
+            label = "+ writer" if writer else ""
+            print(
+                f"{processes:>3} readers {label:<8} {reads:>10.0f} reads/s, "
+                f"{reads / processes:>9.0f} per reader, {writes:>8.0f} writes/s"
+            )
+        processes *= 2
+    database.close()
+
+
+if __name__ == "__main__":
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    seconds = float(sys.argv[2]) if len(sys.argv) > 2 else 3
+    max_processes = int(sys.argv[3]) if len(sys.argv) > 3 else os.cpu_count()
+    run(rows, seconds, max_processes)
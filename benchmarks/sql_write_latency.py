@@ -0,0 +1,80 @@
+"""Create and update latency through DomainLogicManager and SQLRepository.
+
+Run with ``python -m benchmarks.sql_write_latency [OPERATIONS] [DATABASE_URL]``.
+Without DATABASE_URL a temporary SQLite file is used through the sqlite backend,
+with its pragmas and write lock (needs aiosqlite).
+"""
+
+import asyncio
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from simple_example.domain_logic.consts import DataTypeEnum
+from simple_example.domain_logic.manager import DomainLogicManager
+from simple_example.domain_logic.models import InputModel
+from simple_example.repository_implementation.sqlalchemy_repo import (
+    Database,
+    EntityDataTable,
+    SQLRepository,
+)
+from simple_example.repository_implementation.sqlite_repo import (
+    setup_sqlite_connection,
+)
+
+
+def report(name: str, timings: list):
+    timings = sorted(timings)
+    print(
+        f"{name:<7} mean {statistics.mean(timings) * 1000:7.3f} ms  "
+        f"p50 {timings[len(timings) // 2] * 1000:7.3f} ms  "
+        f"p99 {timings[int(len(timings) * 0.99)] * 1000:7.3f} ms"
+    )
+
+
+async def run(operations: int, database: Database):
+    await database.connect()
+    async with database.engine.begin() as conn:
+        await conn.execute(EntityDataTable.delete())
+    manager = DomainLogicManager(repository=SQLRepository(database=database))
+
+    create_timings = []
+    items = []
+    for i in range(operations):
+        input_data = InputModel(
+            name=f"item-{i}", data_type=DataTypeEnum.SIMPLE, count=0
+        )
+        start = time.perf_counter()
+        items.append(await manager.create(input_data))
+        create_timings.append(time.perf_counter() - start)
+
+    update_timings = []
+    for item in items:
+        update_data = InputModel(
+            name=item.name, data_type=DataTypeEnum.COMPLEX, count=1
+        )
+        start = time.perf_counter()
+        await manager.update(item_id=item.id, update_data=update_data)
+        update_timings.append(time.perf_counter() - start)
+
+    report("create", create_timings)
+    report("update", update_timings)
+    await database.disconnect()
+
+
+def main():
+    operations = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    if len(sys.argv) > 2:
+        asyncio.run(run(operations, Database(create_async_engine(sys.argv[2]))))
+        return
+    with tempfile.TemporaryDirectory() as folder:
+        path = os.path.join(folder, "benchmark.db")
+        asyncio.run(run(operations, setup_sqlite_connection(path)))
+
+
+if __name__ == "__main__":
+    main()
@@ -16,7 +16,22 @@ class DataCounterLimits(IntEnum):
     STEP = 2
 
 
+class PageLimits(IntEnum):
+    MIN = 1
+    MAX = 1000
+
+
+class BulkCreateLimits(IntEnum):
+    MIN = 1
+    MAX = 1000
+
+
 CountLimit = Annotated[
     int,
     Field(strict=True, ge=DataCounterLimits.MIN.value, le=DataCounterLimits.MAX.value),
 ]
+
+PageLimit = Annotated[
+    int,
+    Field(strict=True, ge=PageLimits.MIN.value, le=PageLimits.MAX.value),
+]
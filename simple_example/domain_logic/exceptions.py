@@ -4,3 +4,11 @@ class DuplicateDataException(Exception):
 
 class ObjectNotFound(Exception):
     message = "Object not found"
+
+
+class StorageFull(Exception):
+    message = "Storage is full"
+
+
+class PreconditionFailed(Exception):
+    message = "Precondition failed"
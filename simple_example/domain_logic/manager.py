@@ -1,34 +1,94 @@
-from typing import List, Optional
+from typing import AsyncIterator, List, Optional
 
 from pydantic import PositiveInt
 
-from simple_example.domain_logic.consts import CountLimit
-from simple_example.domain_logic.exceptions import DuplicateDataException
-from simple_example.domain_logic.models import DataEntity, Filters, InputModel
+from simple_example.domain_logic.consts import CountLimit, PageLimit
+from simple_example.domain_logic.models import (
+    BulkCreateResult,
+    DataEntity,
+    DataStats,
+    Filters,
+    InputModel,
+)
 from simple_example.domain_logic.repository import AbstractRepository
+from simple_example.domain_logic.single_flight import SingleFlight
 
 
 class DomainLogicManager:
-    def __init__(self, repository: AbstractRepository):
+    def __init__(
+        self,
+        repository: AbstractRepository,
+        single_flight: Optional[SingleFlight] = None,
+    ):
         self.repository = repository
+        self.single_flight = single_flight
 
     async def list(self, filters: Filters) -> List[Optional[DataEntity]]:
-        return await self.repository.list(filters=filters)
+        if self.single_flight is None:
+            return await self.repository.list(filters=filters)
+        return await self.single_flight.do(
+            ("list", filters.normalized_key()),
+            lambda: self.repository.list(filters=filters),
+        )
+
+    def iter_list(self, filters: Filters) -> AsyncIterator[DataEntity]:
+        return self.repository.iter_list(filters=filters)
+
+    async def stats(self, filters: Filters) -> DataStats:
+        if self.single_flight is None:
+            return await self.repository.stats(filters=filters)
+        return await self.single_flight.do(
+            ("stats", filters.normalized_key()),
+            lambda: self.repository.stats(filters=filters),
+        )
 
     async def get(self, item_id: PositiveInt) -> DataEntity:
-        return await self.repository.get(item_id=item_id)
+        if self.single_flight is None:
+            return await self.repository.get(item_id=item_id)
+        return await self.single_flight.do(
+            ("get", item_id), lambda: self.repository.get(item_id=item_id)
+        )
+
+    def _written(self):
+        if self.single_flight is not None:
+            self.single_flight.invalidate()
 
     async def create(self, input_data: InputModel) -> DataEntity:
-        is_duplicate = await self.repository.exists(input_data=input_data)
-        if is_duplicate:
-            raise DuplicateDataException()
-        return await self.repository.create(input_data=input_data)
+        # repositories raise DuplicateDataException, so the check is atomic with the insert
+        try:
+            return await self.repository.create(input_data=input_data)
+        finally:
+            self._written()
+
+    async def bulk_create(self, input_data: List[InputModel]) -> BulkCreateResult:
+        try:
+            return await self.repository.bulk_create(input_data=input_data)
+        finally:
+            self._written()
+
+    async def update(
+        self,
+        item_id: PositiveInt,
+        update_data: InputModel,
+        expected: Optional[DataEntity] = None,
+    ) -> DataEntity:
+        try:
+            return await self.repository.update(
+                item_id=item_id, update_data=update_data, expected=expected
+            )
+        finally:
+            self._written()
 
-    async def update(self, item_id: PositiveInt, update_data: InputModel) -> DataEntity:
-        return await self.repository.update(item_id=item_id, update_data=update_data)
+    async def delete(
+        self, item_id: PositiveInt, expected: Optional[DataEntity] = None
+    ) -> bool:
+        try:
+            return await self.repository.delete(item_id=item_id, expected=expected)
+        finally:
+            self._written()
 
-    async def delete(self, item_id: PositiveInt) -> bool:
-        return await self.repository.delete(item_id=item_id)
+    async def dataset_version(self) -> Optional[str]:
+        return await self.repository.dataset_version()
 
     async def search_list(
         self,
@@ -36,12 +96,16 @@ class DomainLogicManager:
         data_type: None,
         count_upper_limit: None,
         count_lower_limit: Optional[CountLimit] = None,
+        limit: Optional[PageLimit] = None,
+        after_id: Optional[PositiveInt] = None,
     ):
-        return await self.repository.list(
+        return await self.list(
             filters=Filters(
                 search_string=search_string,
                 data_type=data_type,
                 count_lower_limit=count_lower_limit,
                 count_upper_limit=count_upper_limit,
+                limit=limit,
+                after_id=after_id,
             )
         )
@@ -1,11 +1,20 @@
-from typing import Optional
+from typing import Dict, Hashable, Iterable, List, Optional, Sequence, Tuple
 
-from pydantic import BaseModel, ConfigDict, PositiveInt
+from pydantic import BaseModel, ConfigDict, PositiveInt, TypeAdapter
 
-from simple_example.domain_logic.consts import CountLimit, DataTypeEnum
+from simple_example.domain_logic.consts import (
+    CountLimit,
+    DataCounterLimits,
+    DataTypeEnum,
+    PageLimit,
+)
 
 # These are models you expose to outside world
 
+ContentKey = Tuple[str, int, int]
+# items per count, indexed by count, for each data type
+Histograms = Dict[int, Sequence[int]]
+
 
 class InputModel(BaseModel):
     name: str
@@ -13,15 +22,111 @@ class InputModel(BaseModel):
     count: CountLimit
     model_config = ConfigDict(use_enum_values=True)
 
+    def content_key(self) -> ContentKey:
+        # items with the same content key are duplicates
+        return self.name, self.data_type, self.count
+
 
 class DataEntity(InputModel):
     id: PositiveInt
     model_config = ConfigDict(use_enum_values=True)
 
 
+# the order in which backends hand over the values of a stored row
+ENTITY_FIELDS = tuple(DataEntity.model_fields)
+
+
+def validated_entity(row: Sequence) -> DataEntity:
+    return DataEntity.model_validate(dict(zip(ENTITY_FIELDS, row)))
+
+
+# model_construct fills the fields in Python and ends up slower than the compiled
+# validator, so rows of our own storage go through it as well
+entity_validator = TypeAdapter(DataEntity)
+
+
+def trusted_entity(row: Sequence) -> DataEntity:
+    return entity_validator.validate_python(dict(zip(ENTITY_FIELDS, row)))
+
+
+class BulkCreateResult(BaseModel):
+    created: List[DataEntity]
+    duplicates: List[InputModel]
+
+
 class Filters(BaseModel):
     search_string: Optional[str] = None
     data_type: Optional[DataTypeEnum] = None
     count_upper_limit: Optional[CountLimit] = None
     count_lower_limit: Optional[CountLimit] = None
+    # keyset pagination, results are ordered by id
+    limit: Optional[PageLimit] = None
+    after_id: Optional[PositiveInt] = None
     model_config = ConfigDict(use_enum_values=True)
+
+    def normalized_key(self) -> Hashable:
+        # search is case-insensitive, so differently cased searches give the same result
+        values = self.model_dump()
+        if values["search_string"] is not None:
+            values["search_string"] = values["search_string"].lower()
+        return tuple(sorted(values.items()))
+
+    def unpaged(self) -> "Filters":
+        return self.model_copy(update={"limit": None, "after_id": None})
+
+    def count_bounds(self) -> Tuple[int, int]:
+        lower, upper = self.count_lower_limit, self.count_upper_limit
+        lower = DataCounterLimits.MIN if lower is None else lower
+        upper = DataCounterLimits.MAX if upper is None else upper
+        return lower, upper
+
+    def matches(self, item: InputModel) -> bool:
+        # pagination is not a predicate, limit and after_id are not checked
+        if (
+            self.search_string is not None
+            and self.search_string.lower() not in item.name.lower()
+        ):
+            return False
+        if self.count_lower_limit is not None and item.count < self.count_lower_limit:
+            return False
+        if self.count_upper_limit is not None and item.count > self.count_upper_limit:
+            return False
+        if self.data_type is not None and item.data_type != self.data_type:
+            return False
+        return True
+
+
+class DataStats(BaseModel):
+    total: int
+    # every data type, also those without items
+    data_types: Dict[int, int]
+    # items per count, the index is the count
+    counts: List[int]
+
+    @classmethod
+    def from_histograms(cls, histograms: Histograms, filters: Filters) -> "DataStats":
+        # pagination does not apply, neither does search; callers pass histograms of
+        # the searched items
+        lower, upper = filters.count_bounds()
+        data_types = {data_type.value: 0 for data_type in DataTypeEnum}
+        counts = [0] * (DataCounterLimits.MAX + 1)
+        for data_type, histogram in histograms.items():
+            if filters.data_type is not None and data_type != filters.data_type:
+                continue
+            for count in range(lower, upper + 1):
+                counts[count] += histogram[count]
+            data_types[data_type] = sum(histogram[lower : upper + 1])
+        return cls(total=sum(counts), data_types=data_types, counts=counts)
+
+    @classmethod
+    def from_rows(
+        cls, rows: Iterable[Tuple[int, int, int]], filters: Filters
+    ) -> "DataStats":
+        # (data_type, count, items) rows, as grouped by the SQL backends
+        histograms: Dict[int, List[int]] = {}
+        for data_type, count, items in rows:
+            histogram = histograms.get(data_type)
+            if histogram is None:
+                histogram = histograms[data_type] = [0] * (DataCounterLimits.MAX + 1)
+            histogram[count] += items
+        return cls.from_histograms(histograms, filters)
@@ -1,9 +1,15 @@
 from abc import ABC, abstractmethod
-from typing import List, Optional
+from typing import AsyncIterator, List, Optional
 
 from pydantic import PositiveInt
 
-from simple_example.domain_logic.models import DataEntity, Filters, InputModel
+from simple_example.domain_logic.models import (
+    BulkCreateResult,
+    DataEntity,
+    DataStats,
+    Filters,
+    InputModel,
+)
 
 
 class AbstractRepository(ABC):
@@ -15,18 +21,43 @@ class AbstractRepository(ABC):
     async def create(self, input_data: InputModel) -> DataEntity:
         raise NotImplementedError
 
+    @abstractmethod
+    async def bulk_create(self, input_data: List[InputModel]) -> BulkCreateResult:
+        raise NotImplementedError
+
     @abstractmethod
     async def exists(self, input_data: InputModel) -> bool:
         raise NotImplementedError
 
     @abstractmethod
-    async def update(self, item_id: PositiveInt, update_data: InputModel) -> DataEntity:
+    async def update(
+        self,
+        item_id: PositiveInt,
+        update_data: InputModel,
+        expected: Optional[DataEntity] = None,
+    ) -> DataEntity:
+        # with expected, the write is applied only if the stored item still equals it,
+        # otherwise PreconditionFailed is raised
         raise NotImplementedError
 
     @abstractmethod
-    async def delete(self, item_id: PositiveInt) -> bool:
+    async def delete(
+        self, item_id: PositiveInt, expected: Optional[DataEntity] = None
+    ) -> bool:
         raise NotImplementedError
 
     @abstractmethod
     async def list(self, filters: Filters) -> List[Optional[DataEntity]]:
         raise NotImplementedError
+
+    @abstractmethod
+    def iter_list(self, filters: Filters) -> AsyncIterator[DataEntity]:
+        raise NotImplementedError
+
+    @abstractmethod
+    async def stats(self, filters: Filters) -> DataStats:
+        raise NotImplementedError
+
+    async def dataset_version(self) -> Optional[str]:
+        # changes with every write; None when the backend cannot tell
+        return None
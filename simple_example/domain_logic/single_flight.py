@@ -0,0 +1,57 @@
+import asyncio
+from typing import Awaitable, Callable, Dict, Hashable, TypeVar
+
+T = TypeVar("T")
+
+
+class Call:
+    def __init__(self, task: asyncio.Future):
+        self.task = task
+        self.waiters = 0
+
+
+# concurrent calls with the same key share one in-flight awaitable
+class SingleFlight:
+    def __init__(self):
+        self.calls: Dict[Hashable, Call] = {}
+        # bumped on writes, reads started before a write are not joined after it
+        self.generation = 0
+        self.executed = 0
+        self.shared = 0
+
+    def invalidate(self):
+        self.generation += 1
+
+    async def do(self, key: Hashable, function: Callable[[], Awaitable[T]]) -> T:
+        key = (self.generation, key)
+        call = self.calls.get(key)
+        if call is None:
+            call = Call(asyncio.ensure_future(function()))
+            self.calls[key] = call
+            call.task.add_done_callback(lambda _: self._forget(key, call))
+            self.executed += 1
+        else:
+            self.shared += 1
+        call.waiters += 1
+        try:
+            return await asyncio.shield(call.task)
+        finally:
+            call.waiters -= 1
+            if call.waiters == 0 and not call.task.done():
+                # every caller was cancelled, nobody is left to use the result
+                self._forget(key, call)
+                call.task.cancel()
+
+    def _forget(self, key: Hashable, call: Call):
+        if self.calls.get(key) is call:
+            del self.calls[key]
+        if call.task.done() and not call.task.cancelled():
+            # mark the exception as retrieved, waiters already received it
+            call.task.exception()
+
+    def statistics(self) -> dict:
+        return {
+            "executed": self.executed,
+            "shared": self.shared,
+            "in_flight": len(self.calls),
+        }
@@ -0,0 +1,218 @@
+from collections import OrderedDict
+from time import monotonic
+from typing import AsyncIterator, FrozenSet, Hashable, List, NamedTuple, Optional
+
+from pydantic import PositiveInt
+
+from simple_example.domain_logic.exceptions import PreconditionFailed
+from simple_example.domain_logic.models import (
+    BulkCreateResult,
+    DataEntity,
+    DataStats,
+    Filters,
+    InputModel,
+)
+from simple_example.domain_logic.repository import AbstractRepository
+
+MISSING = object()
+
+
+class LRUCache:
+    def __init__(self, max_size: int, ttl: float):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.entries: OrderedDict = OrderedDict()
+
+    def get(self, key: Hashable):
+        entry = self.entries.get(key)
+        if entry is None:
+            return MISSING
+        expires_at, value = entry
+        if expires_at < monotonic():
+            del self.entries[key]
+            return MISSING
+        self.entries.move_to_end(key)
+        return value
+
+    def put(self, key: Hashable, value):
+        self.entries[key] = (monotonic() + self.ttl, value)
+        self.entries.move_to_end(key)
+        if len(self.entries) > self.max_size:
+            self.entries.popitem(last=False)
+
+    def pop(self, key: Hashable):
+        self.entries.pop(key, None)
+
+    def clear(self):
+        self.entries.clear()
+
+    def items(self):
+        return [(key, value) for key, (_, value) in self.entries.items()]
+
+
+class CachedList(NamedTuple):
+    filters: Filters
+    items: List[DataEntity]
+    ids: FrozenSet[int]
+
+    def affected_by(self, item: DataEntity) -> bool:
+        # would the item appear in this result if the query ran again
+        if item.id in self.ids:
+            return True
+        if not self.filters.matches(item):
+            return False
+        if self.filters.after_id is not None and item.id <= self.filters.after_id:
+            return False
+        limit = self.filters.limit
+        return limit is None or len(self.items) < limit or item.id < self.items[-1].id
+
+
+class RepositoryCache:
+    def __init__(self, max_entities: int, max_lists: int, ttl: float):
+        self.entities = LRUCache(max_size=max_entities, ttl=ttl)
+        self.lists = LRUCache(max_size=max_lists, ttl=ttl)
+        self.stats = LRUCache(max_size=max_lists, ttl=ttl)
+        self.hits = 0
+        self.misses = 0
+        # bumped on every write, reads that overlap a write do not fill the cache
+        self.version = 0
+        # the backend dataset version the cached lists and stats were read at
+        self.backend_version: Optional[str] = None
+
+    def lookup(self, cache: LRUCache, key: Hashable):
+        value = cache.get(key)
+        if value is MISSING:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return value
+
+    def invalidate(self, item_id: int, item: Optional[DataEntity] = None):
+        self.version += 1
+        self.entities.pop(item_id)
+        # without the old values of an update there is no telling which counts moved
+        self.stats.clear()
+        for key, cached in self.lists.items():
+            if item_id in cached.ids or (item is not None and cached.affected_by(item)):
+                self.lists.pop(key)
+
+    def follow(self, backend_version: Optional[str]):
+        # moved by a write of another worker, any cached list or count may miss it
+        if backend_version != self.backend_version:
+            self.backend_version = backend_version
+            self.version += 1
+            self.lists.clear()
+            self.stats.clear()
+
+    def statistics(self) -> dict:
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "entities": len(self.entities.entries),
+            "lists": len(self.lists.entries),
+            "stats": len(self.stats.entries),
+        }
+
+
+class CachingRepository(AbstractRepository):
+    def __init__(
+        self,
+        repository: AbstractRepository,
+        cache: RepositoryCache,
+        other_writers: bool = False,
+    ):
+        self.repository = repository
+        self.cache = cache
+        # whether other workers write to the backend too, the writes of this one
+        # already invalidate what they change
+        self.other_writers = other_writers
+
+    async def get(self, item_id: PositiveInt) -> Optional[DataEntity]:
+        item = self.cache.lookup(self.cache.entities, item_id)
+        if item is MISSING:
+            version = self.cache.version
+            item = await self.repository.get(item_id=item_id)
+            if version == self.cache.version:
+                self.cache.entities.put(item_id, item)
+        return item
+
+    async def create(self, input_data: InputModel) -> DataEntity:
+        item = await self.repository.create(input_data=input_data)
+        self.cache.invalidate(item.id, item)
+        return item
+
+    async def bulk_create(self, input_data: List[InputModel]) -> BulkCreateResult:
+        result = await self.repository.bulk_create(input_data=input_data)
+        for item in result.created:
+            self.cache.invalidate(item.id, item)
+        return result
+
+    async def exists(self, input_data: InputModel) -> bool:
+        return await self.repository.exists(input_data=input_data)
+
+    async def update(
+        self,
+        item_id: PositiveInt,
+        update_data: InputModel,
+        expected: Optional[DataEntity] = None,
+    ) -> DataEntity:
+        try:
+            item = await self.repository.update(
+                item_id=item_id, update_data=update_data, expected=expected
+            )
+        except PreconditionFailed:
+            # the expected item may have come from a stale entry
+            self.cache.entities.pop(item_id)
+            raise
+        self.cache.invalidate(item_id, item)
+        return item
+
+    async def delete(
+        self, item_id: PositiveInt, expected: Optional[DataEntity] = None
+    ) -> bool:
+        try:
+            is_deleted = await self.repository.delete(
+                item_id=item_id, expected=expected
+            )
+        except PreconditionFailed:
+            self.cache.entities.pop(item_id)
+            raise
+        self.cache.invalidate(item_id)
+        return is_deleted
+
+    async def dataset_version(self) -> Optional[str]:
+        version = await self.repository.dataset_version()
+        if self.other_writers:
+            self.cache.follow(version)
+        return version
+
+    async def list(self, filters: Filters) -> List[Optional[DataEntity]]:
+        if self.other_writers:
+            await self.dataset_version()
+        key = filters.normalized_key()
+        cached = self.cache.lookup(self.cache.lists, key)
+        if cached is MISSING:
+            version = self.cache.version
+            items = await self.repository.list(filters=filters)
+            cached = CachedList(
+                filters=filters, items=items, ids=frozenset(item.id for item in items)
+            )
+            if version == self.cache.version:
+                self.cache.lists.put(key, cached)
+        return cached.items
+
+    def iter_list(self, filters: Filters) -> AsyncIterator[DataEntity]:
+        # exports stream past the cache
+        return self.repository.iter_list(filters=filters)
+
+    async def stats(self, filters: Filters) -> DataStats:
+        if self.other_writers:
+            await self.dataset_version()
+        key = filters.unpaged().normalized_key()
+        stats = self.cache.lookup(self.cache.stats, key)
+        if stats is MISSING:
+            version = self.cache.version
+            stats = await self.repository.stats(filters=filters)
+            if version == self.cache.version:
+                self.cache.stats.put(key, stats)
+        return stats
@@ -0,0 +1,568 @@
+import secrets
+import zlib
+from array import array
+from bisect import bisect_left, bisect_right
+from contextlib import nullcontext
+from functools import partial
+from itertools import islice
+from typing import (
+    AsyncIterator,
+    Callable,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    Optional,
+    Sequence,
+    Tuple,
+    TypeVar,
+    Union,
+)
+
+from pydantic import PositiveInt
+
+from simple_example.domain_logic.consts import DataCounterLimits
+from simple_example.domain_logic.exceptions import (
+    DuplicateDataException,
+    ObjectNotFound,
+    PreconditionFailed,
+)
+from simple_example.domain_logic.models import (
+    BulkCreateResult,
+    ContentKey,
+    DataEntity,
+    DataStats,
+    Filters,
+    InputModel,
+    trusted_entity,
+)
+from simple_example.domain_logic.repository import AbstractRepository
+
+# content table slots, ids are positive
+EMPTY = 0
+DELETED = -1
+MIN_SLOTS = 8
+STREAM_CHUNK_SIZE = 1000
+
+T = TypeVar("T")
+
+
+def content_hash(name: bytes, data_type: int, count: int) -> int:
+    return zlib.crc32(name, data_type << 8 | count)
+
+
+def positions_in(mask: bytes, start: int, end: int) -> Iterator[int]:
+    position = mask.find(1, start, end)
+    while position != -1:
+        yield position
+        position = mask.find(1, position + 1, end)
+
+
+def predicate_tables(
+    filters: Filters, data_type_codes: Dict[int, int]
+) -> Tuple[Optional[bytes], Optional[bytes]]:
+    # byte translation tables, 1 for the codes and counts that pass the filters
+    type_table = None
+    if filters.data_type is not None:
+        type_table = bytearray(256)
+        code = data_type_codes.get(filters.data_type)
+        if code is not None:
+            type_table[code] = 1
+    count_table = None
+    if filters.count_lower_limit is not None or filters.count_upper_limit is not None:
+        lower, upper = filters.count_bounds()
+        count_table = bytearray(256)
+        count_table[lower : upper + 1] = b"\x01" * len(range(lower, upper + 1))
+    return type_table, count_table
+
+
+def combine_masks(masks: Sequence[Union[bytes, memoryview]], length: int) -> bytes:
+    # rows set in every mask, as one AND of big integers
+    if len(masks) == 1:
+        return bytes(masks[0])
+    combined = int.from_bytes(masks[0], "little")
+    for mask in masks[1:]:
+        combined &= int.from_bytes(mask, "little")
+    return combined.to_bytes(length, "little")
+
+
+class ColumnarDatabase:
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        # one entry per row, rows are ordered by id; removed rows are only marked
+        # until the columns are compacted, so a delete moves no other row
+        self.ids = array("q")
+        self.alive = bytearray()
+        self.dead_rows = 0
+        self.type_codes = bytearray()
+        self.counts = bytearray()
+        self.hashes = array("I")
+        self.segments = array("q")
+        # names are appended to packed UTF-8 tables, a row points at its segment;
+        # segments of renamed or removed rows stay until the tables are compacted
+        self.names = bytearray()
+        self.folded_names = bytearray()
+        self.segment_names = array("q")
+        self.segment_folded = array("q")
+        self.segment_owners = array("q")
+        self.stale_segments = 0
+        # data types are dictionary encoded, rows store a one byte code
+        self.data_types: List[int] = []
+        self.data_type_codes: Dict[int, int] = {}
+        # items per data type and count, kept by every write so stats need no scan
+        self.histograms: Dict[int, List[int]] = {}
+        # open addressing table of ids by content hash, for duplicate checks
+        self.slots = array("q", bytes(8 * MIN_SLOTS))
+        self.used_slots = 0
+        self.last_id = 0
+        # writes since the reset, the epoch tells versions of earlier resets apart
+        self.epoch = secrets.token_hex(4)
+        self.writes = 0
+
+    async def connect(self):
+        self.reset()
+
+    async def disconnect(self):
+        self.reset()
+
+    def pool_status(self) -> dict:
+        # no connections to pool
+        return {}
+
+    def query_statistics(self) -> List[dict]:
+        # no queries to time
+        return []
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    # one process owns the columns, reads and writes need no coordination
+    async def read(self, function: Callable[[], T]) -> T:
+        return function()
+
+    def writing(self):
+        return nullcontext()
+
+    def next_id(self) -> int:
+        self.last_id += 1
+        return self.last_id
+
+    def dataset_version(self) -> str:
+        return f"{self.epoch}-{self.writes}"
+
+    def position(self, item_id: int) -> Optional[int]:
+        # a row added again goes in front of its removed one
+        ids = self.ids
+        position = bisect_left(ids, item_id)
+        if position < len(ids) and ids[position] == item_id and self.alive[position]:
+            return position
+        return None
+
+    def entity(self, position: int) -> DataEntity:
+        return self.entities((position,))[0]
+
+    def entities(self, positions: Iterable[int]) -> List[DataEntity]:
+        # models are only built for the rows returned, from columns of validated values
+        ids, type_codes, counts, segments = (
+            self.ids,
+            self.type_codes,
+            self.counts,
+            self.segments,
+        )
+        names, starts, data_types = self.names, self.segment_names, self.data_types
+        last_segment = len(starts) - 1
+        items = []
+        for position in positions:
+            segment = segments[position]
+            end = starts[segment + 1] if segment < last_segment else len(names)
+            # fields in ENTITY_FIELDS order
+            items.append(
+                trusted_entity(
+                    (
+                        names[starts[segment] : end].decode(),
+                        data_types[type_codes[position]],
+                        counts[position],
+                        ids[position],
+                    )
+                )
+            )
+        return items
+
+    def name(self, position: int) -> str:
+        return self.encoded_name(position).decode()
+
+    def encoded_name(self, position: int) -> bytes:
+        segment = self.segments[position]
+        start, end = self._bounds(self.segment_names, self.names, segment)
+        return self.names[start:end]
+
+    def find(self, key: ContentKey) -> Optional[int]:
+        name, data_type, count = key
+        code = self.data_type_codes.get(data_type)
+        if code is None:
+            return None
+        encoded = name.encode()
+        content = content_hash(encoded, data_type, count)
+        slots = self.slots
+        mask = len(slots) - 1
+        slot = content & mask
+        while True:
+            item_id = slots[slot]
+            if item_id == EMPTY:
+                return None
+            if item_id != DELETED:
+                position = self.position(item_id)
+                if (
+                    self.hashes[position] == content
+                    and self.counts[position] == count
+                    and self.type_codes[position] == code
+                    and self.encoded_name(position) == encoded
+                ):
+                    return item_id
+            slot = (slot + 1) & mask
+
+    def add(self, item: DataEntity):
+        if self.position(item.id) is not None:
+            self.remove(item.id)
+        position = bisect_left(self.ids, item.id)
+        content = content_hash(item.name.encode(), item.data_type, item.count)
+        self.ids.insert(position, item.id)
+        self.alive.insert(position, 1)
+        self.type_codes.insert(position, self._type_code(item.data_type))
+        self.counts.insert(position, item.count)
+        self.hashes.insert(position, content)
+        self.segments.insert(position, self._add_segment(item.id, item.name))
+        self._insert_slot(item.id, content)
+        self._tally(item.data_type, item.count, 1)
+        self.last_id = max(self.last_id, item.id)
+        self.writes += 1
+
+    def remove(self, item_id: int) -> bool:
+        position = self.position(item_id)
+        if position is None:
+            return False
+        self._remove_slot(item_id, self.hashes[position])
+        self._tally(
+            self.data_types[self.type_codes[position]], self.counts[position], -1
+        )
+        self.alive[position] = 0
+        self.dead_rows += 1
+        self._drop_segment(self.segments[position])
+        self.writes += 1
+        return True
+
+    def change(self, item_id: int, values: dict):
+        position = self.position(item_id)
+        name = values.get("name", self.name(position))
+        data_type = values.get("data_type", self.data_types[self.type_codes[position]])
+        count = values.get("count", self.counts[position])
+        content = content_hash(name.encode(), data_type, count)
+        self._remove_slot(item_id, self.hashes[position])
+        self._tally(
+            self.data_types[self.type_codes[position]], self.counts[position], -1
+        )
+        self._tally(data_type, count, 1)
+        self.type_codes[position] = self._type_code(data_type)
+        self.counts[position] = count
+        self.hashes[position] = content
+        if name != self.name(position):
+            segment = self.segments[position]
+            self.segments[position] = self._add_segment(item_id, name)
+            self._drop_segment(segment)
+        self._insert_slot(item_id, content)
+        self.writes += 1
+
+    def search(self, text: str) -> List[int]:
+        # substring search over all names at once, hits are mapped back to rows
+        needle = text.lower().encode()
+        folded, starts, owners = (
+            self.folded_names,
+            self.segment_folded,
+            self.segment_owners,
+        )
+        positions = []
+        hit = folded.find(needle)
+        while hit != -1:
+            segment = bisect_right(starts, hit) - 1
+            _, end = self._bounds(starts, folded, segment)
+            owner = owners[segment]
+            if owner != EMPTY and hit + len(needle) <= end:
+                positions.append(self.position(owner))
+            hit = folded.find(needle, end)
+        positions.sort()
+        return positions
+
+    def predicate_tables(
+        self, filters: Filters
+    ) -> Tuple[Optional[bytes], Optional[bytes]]:
+        return predicate_tables(filters, self.data_type_codes)
+
+    def mask(
+        self, type_table: Optional[bytes], count_table: Optional[bytes]
+    ) -> Optional[bytes]:
+        # one byte per row, whole columns are translated and combined in C
+        masks = [
+            column.translate(table)
+            for column, table in (
+                (self.type_codes, type_table),
+                (self.counts, count_table),
+            )
+            if table is not None
+        ]
+        if self.dead_rows:
+            masks.append(self.alive)
+        if not masks:
+            return None
+        return combine_masks(masks, len(self.ids))
+
+    def _type_code(self, data_type: int) -> int:
+        code = self.data_type_codes.get(data_type)
+        if code is None:
+            code = self.data_type_codes[data_type] = len(self.data_types)
+            self.data_types.append(data_type)
+        return code
+
+    def _tally(self, data_type: int, count: int, change: int):
+        histogram = self.histograms.get(data_type)
+        if histogram is None:
+            histogram = self.histograms[data_type] = [0] * (DataCounterLimits.MAX + 1)
+        histogram[count] += change
+
+    @staticmethod
+    def _bounds(starts: array, table: bytearray, segment: int) -> Tuple[int, int]:
+        end = starts[segment + 1] if segment + 1 < len(starts) else len(table)
+        return starts[segment], end
+
+    def _add_segment(self, owner: int, name: str) -> int:
+        self.segment_owners.append(owner)
+        self.segment_names.append(len(self.names))
+        self.segment_folded.append(len(self.folded_names))
+        self.names += name.encode()
+        self.folded_names += name.lower().encode()
+        return len(self.segment_owners) - 1
+
+    def _drop_segment(self, segment: int):
+        self.segment_owners[segment] = EMPTY
+        self.stale_segments += 1
+        if self.stale_segments > len(self.ids) - self.dead_rows:
+            self._compact()
+
+    def _compact(self):
+        # live rows are moved to the front and their names packed again
+        live = [position for position in range(len(self.ids)) if self.alive[position]]
+        names = [self.name(position) for position in live]
+        ids, type_codes, counts, hashes = (
+            self.ids,
+            self.type_codes,
+            self.counts,
+            self.hashes,
+        )
+        self.ids = array("q", (ids[position] for position in live))
+        self.type_codes = bytearray(type_codes[position] for position in live)
+        self.counts = bytearray(counts[position] for position in live)
+        self.hashes = array("I", (hashes[position] for position in live))
+        self.segments = array("q", bytes(8 * len(live)))
+        self.alive = bytearray(b"\x01") * len(live)
+        self.dead_rows = 0
+        self.names = bytearray()
+        self.folded_names = bytearray()
+        self.segment_names = array("q")
+        self.segment_folded = array("q")
+        self.segment_owners = array("q")
+        self.stale_segments = 0
+        for position, name in enumerate(names):
+            self.segments[position] = self._add_segment(self.ids[position], name)
+
+    def _insert_slot(self, item_id: int, content: int):
+        if (self.used_slots + 1) * 2 > len(self.slots):
+            # rebuilt from the columns, which already hold this row
+            self._rehash()
+            return
+        slots = self.slots
+        mask = len(slots) - 1
+        slot = content & mask
+        while slots[slot] > 0:
+            slot = (slot + 1) & mask
+        if slots[slot] == EMPTY:
+            self.used_slots += 1
+        slots[slot] = item_id
+
+    def _remove_slot(self, item_id: int, content: int):
+        slots = self.slots
+        mask = len(slots) - 1
+        slot = content & mask
+        while slots[slot] != item_id:
+            slot = (slot + 1) & mask
+        slots[slot] = DELETED
+
+    def _rehash(self):
+        # room for twice the live rows, deleted slots are dropped
+        size = MIN_SLOTS
+        while size < 4 * (len(self.ids) - self.dead_rows + 1):
+            size *= 2
+        self.slots = array("q", bytes(8 * size))
+        self.used_slots = 0
+        mask = size - 1
+        slots = self.slots
+        for item_id, content, alive in zip(self.ids, self.hashes, self.alive):
+            if not alive:
+                continue
+            slot = content & mask
+            while slots[slot] != EMPTY:
+                slot = (slot + 1) & mask
+            slots[slot] = item_id
+            self.used_slots += 1
+
+
+class ColumnarRepository(AbstractRepository):
+    # reads run through database.read and writes inside database.writing, so the
+    # same repository serves columns shared between processes
+    def __init__(self, database: ColumnarDatabase):
+        self.database = database
+
+    async def get(self, item_id: PositiveInt) -> Optional[DataEntity]:
+        return await self.database.read(partial(self.__get, item_id))
+
+    def __get(self, item_id: int) -> Optional[DataEntity]:
+        position = self.database.position(item_id)
+        if position is None:
+            return None
+        return self.database.entity(position)
+
+    async def create(self, input_data: InputModel) -> DataEntity:
+        database = self.database
+        async with database.writing():
+            if database.find(input_data.content_key()) is not None:
+                raise DuplicateDataException()
+            data = DataEntity(**input_data.model_dump(), id=database.next_id())
+            database.add(data)
+        return data
+
+    async def exists(self, input_data: InputModel) -> bool:
+        key = input_data.content_key()
+        return await self.database.read(lambda: self.database.find(key) is not None)
+
+    async def bulk_create(self, input_data: List[InputModel]) -> BulkCreateResult:
+        result = BulkCreateResult(created=[], duplicates=[])
+        for data in input_data:
+            try:
+                result.created.append(await self.create(input_data=data))
+            except DuplicateDataException:
+                result.duplicates.append(data)
+        return result
+
+    async def update(
+        self,
+        item_id: PositiveInt,
+        update_data: InputModel,
+        expected: Optional[DataEntity] = None,
+    ) -> DataEntity:
+        database = self.database
+        async with database.writing():
+            if expected is not None and self.__get(item_id) != expected:
+                raise PreconditionFailed()
+            if database.position(item_id) is None:
+                raise ObjectNotFound()
+            duplicate_id = database.find(update_data.content_key())
+            if duplicate_id is not None and duplicate_id != item_id:
+                raise DuplicateDataException()
+            database.change(item_id, update_data.model_dump(exclude_unset=True))
+            return database.entity(database.position(item_id))
+
+    async def delete(
+        self, item_id: PositiveInt, expected: Optional[DataEntity] = None
+    ) -> bool:
+        async with self.database.writing():
+            if expected is not None and self.__get(item_id) != expected:
+                raise PreconditionFailed()
+            return self.database.remove(item_id)
+
+    async def dataset_version(self) -> Optional[str]:
+        return self.database.dataset_version()
+
+    def __positions(
+        self,
+        filters: Filters,
+        after_id: Optional[int],
+        until_id: Optional[int] = None,
+    ) -> Iterable[int]:
+        database = self.database
+        start = 0 if after_id is None else bisect_right(database.ids, after_id)
+        end = (
+            len(database) if until_id is None else bisect_right(database.ids, until_id)
+        )
+        type_table, count_table = database.predicate_tables(filters)
+        if filters.search_string:
+            # few rows match a search, the other predicates are checked per row
+            return (
+                position
+                for position in database.search(filters.search_string)
+                if start <= position < end
+                and (type_table is None or type_table[database.type_codes[position]])
+                and (count_table is None or count_table[database.counts[position]])
+            )
+        mask = database.mask(type_table, count_table)
+        if mask is None:
+            return range(start, end)
+        return positions_in(mask, start, end)
+
+    async def list(self, filters: Filters) -> List[Optional[DataEntity]]:
+        return await self.database.read(
+            lambda: self.database.entities(
+                islice(self.__positions(filters, filters.after_id), filters.limit)
+            )
+        )
+
+    def __page(
+        self, filters: Filters, after_id: Optional[int], until_id: int
+    ) -> List[int]:
+        ids = self.database.ids
+        return [
+            ids[position]
+            for position in islice(
+                self.__positions(filters, after_id, until_id), STREAM_CHUNK_SIZE
+            )
+        ]
+
+    async def iter_list(self, filters: Filters) -> AsyncIterator[DataEntity]:
+        # pages of ids, rows are read when yielded since they can change while the
+        # consumer is suspended; like a database cursor, later rows are left out
+        database = self.database
+        until_id = database.last_id
+        after_id = filters.after_id
+        yielded = 0
+        while True:
+            ids = await database.read(partial(self.__page, filters, after_id, until_id))
+            for item_id in ids:
+                item = await database.read(partial(self.__get, item_id))
+                if item is None or not filters.matches(item):
+                    continue
+                yield item
+                yielded += 1
+                if yielded == filters.limit:
+                    return
+            if len(ids) < STREAM_CHUNK_SIZE:
+                return
+            after_id = ids[-1]
+
+    def __stats(self, filters: Filters) -> DataStats:
+        database = self.database
+        if not filters.search_string:
+            return DataStats.from_histograms(database.histograms, filters)
+        data_types, type_codes, counts = (
+            database.data_types,
+            database.type_codes,
+            database.counts,
+        )
+        return DataStats.from_rows(
+            (
+                (data_types[type_codes[position]], counts[position], 1)
+                for position in self.__positions(filters, after_id=None)
+            ),
+            filters,
+        )
+
+    async def stats(self, filters: Filters) -> DataStats:
+        return await self.database.read(partial(self.__stats, filters))
@@ -0,0 +1,369 @@
+import fcntl
+import gc
+import logging
+import mmap
+import os
+import struct
+import threading
+import zlib
+from array import array
+from contextlib import contextmanager
+from typing import Dict, Iterator, Optional, Tuple
+
+from simple_example.domain_logic.models import DataEntity, trusted_entity
+from simple_example.repository_implementation.memory_repo import Database
+
+SNAPSHOT_FILE = "snapshot"
+LOG_FILE = "log"
+# the log a snapshot being written covers, removed once the snapshot is in place
+PREVIOUS_LOG_FILE = "log.previous"
+LOCK_FILE = "lock"
+
+SNAPSHOT_MAGIC = b"MEMSNAP1"
+# magic, last id, rows, crc32 of everything after the header
+SNAPSHOT_HEADER = struct.Struct("<8sqqI")
+# a record is the crc32 of the rest, the header and the UTF-8 name
+CHECKSUM = struct.Struct("<I")
+# operation, id, data type, count, name length
+RECORD_HEADER = struct.Struct("<BqHBI")
+PUT = 1
+DELETE = 2
+
+# id -> (name, data_type, count)
+Rows = Dict[int, Tuple[str, int, int]]
+
+logger = logging.getLogger(__name__)
+
+
+def encode_record(
+    operation: int, item_id: int, name: str = "", data_type: int = 0, count: int = 0
+) -> bytes:
+    encoded = name.encode()
+    body = (
+        RECORD_HEADER.pack(operation, item_id, data_type, count, len(encoded)) + encoded
+    )
+    return CHECKSUM.pack(zlib.crc32(body)) + body
+
+
+def put_record(item: DataEntity) -> bytes:
+    return encode_record(PUT, item.id, item.name, item.data_type, item.count)
+
+
+def replay(data: bytes, rows: Rows) -> Tuple[int, int, int]:
+    # applies complete records, returns where the last one ends, the records and the top id
+    offset = records = last_id = 0
+    while offset + CHECKSUM.size + RECORD_HEADER.size <= len(data):
+        (checksum,) = CHECKSUM.unpack_from(data, offset)
+        start = offset + CHECKSUM.size
+        operation, item_id, data_type, count, length = RECORD_HEADER.unpack_from(
+            data, start
+        )
+        end = start + RECORD_HEADER.size + length
+        if end > len(data) or zlib.crc32(data[start:end]) != checksum:
+            break
+        if operation == PUT:
+            rows[item_id] = (data[end - length : end].decode(), data_type, count)
+        else:
+            rows.pop(item_id, None)
+        last_id = max(last_id, item_id)
+        records += 1
+        offset = end
+    return offset, records, last_id
+
+
+class WriteLog:
+    def __init__(self, path: str, fsync_interval: float):
+        # kept open until close()
+        self.file = open(path, "ab", buffering=0)  # noqa: SIM115
+        self.fsync_interval = fsync_interval
+        self.records = 0
+        # appends only extend the buffer, the syncer writes it out; the file
+        # lock keeps a batch in flight from landing after a truncate
+        self.pending = bytearray()
+        self.pending_lock = threading.Lock()
+        self.file_lock = threading.Lock()
+        self.closed = threading.Event()
+        self.syncer = None
+        if fsync_interval > 0:
+            # one write and one fsync per interval cover every append made during it
+            self.syncer = threading.Thread(target=self.sync_periodically, daemon=True)
+            self.syncer.start()
+
+    def append(self, record: bytes):
+        self.records += 1
+        if self.syncer is None:
+            self.file.write(record)
+            os.fsync(self.file.fileno())
+            return
+        with self.pending_lock:
+            self.pending += record
+
+    def flush(self) -> bool:
+        with self.file_lock:
+            with self.pending_lock:
+                batch, self.pending = self.pending, bytearray()
+            if batch:
+                self.file.write(batch)
+        return bool(batch)
+
+    def sync_periodically(self):
+        while not self.closed.wait(self.fsync_interval):
+            if self.flush():
+                os.fsync(self.file.fileno())
+
+    def truncate(self):
+        # the caller's snapshot covers the buffered records, they are dropped;
+        # appends continue at the new end of the file
+        with self.file_lock:
+            with self.pending_lock:
+                self.pending = bytearray()
+            os.ftruncate(self.file.fileno(), 0)
+            os.fsync(self.file.fileno())
+        self.records = 0
+
+    def close(self):
+        self.closed.set()
+        if self.syncer is not None:
+            self.syncer.join()
+        self.flush()
+        os.fsync(self.file.fileno())
+        self.file.close()
+
+
+def write_snapshot(path: str, last_id: int, rows: Rows):
+    ids, data_types, counts, lengths = array("q"), array("H"), bytearray(), array("I")
+    names = []
+    for item_id, (name, data_type, count) in rows.items():
+        encoded = name.encode()
+        ids.append(item_id)
+        data_types.append(data_type)
+        counts.append(count)
+        lengths.append(len(encoded))
+        names.append(encoded)
+    # columns in native byte order, snapshots are read back on the same host
+    body = b"".join(
+        (ids.tobytes(), data_types.tobytes(), counts, lengths.tobytes(), *names)
+    )
+    header = SNAPSHOT_HEADER.pack(SNAPSHOT_MAGIC, last_id, len(ids), zlib.crc32(body))
+    temporary = f"{path}.tmp"
+    with open(temporary, "wb") as file:
+        file.write(header)
+        file.write(body)
+        file.flush()
+        os.fsync(file.fileno())
+    os.replace(temporary, path)
+    sync_directory(os.path.dirname(path))
+
+
+def sync_directory(path: str):
+    directory = os.open(path or ".", os.O_RDONLY)
+    try:
+        os.fsync(directory)
+    finally:
+        os.close(directory)
+
+
+def replay_log(path: str, rows: Rows) -> Tuple[int, int]:
+    # applies the complete records of the log, returns the records and the top id
+    if not os.path.exists(path):
+        return 0, 0
+    with open(path, "rb") as file:
+        data = file.read()
+    end, records, last_id = replay(data, rows)
+    if end < len(data):
+        # the tail of a write interrupted by a crash
+        logger.warning(
+            "memory log %s: dropped %s bytes after the last complete record",
+            path,
+            len(data) - end,
+        )
+        os.truncate(path, end)
+    return records, last_id
+
+
+def read_snapshot(path: str, rows: Rows) -> int:
+    # fills rows from the snapshot, returns the last id handed out when it was taken
+    if not os.path.exists(path) or not os.path.getsize(path):
+        return 0
+    with open(path, "rb") as file, mmap.mmap(
+        file.fileno(), 0, access=mmap.ACCESS_READ
+    ) as data, memoryview(data)[SNAPSHOT_HEADER.size :] as body:
+        magic, last_id, size, checksum = SNAPSHOT_HEADER.unpack_from(data)
+        if magic != SNAPSHOT_MAGIC or zlib.crc32(body) != checksum:
+            raise ValueError(f"'{path}' is not a valid snapshot")
+        columns = []
+        offset = 0
+        for typecode in ("q", "H", "B", "I"):
+            column = array(typecode)
+            end = offset + column.itemsize * size
+            column.frombytes(body[offset:end])
+            columns.append(column)
+            offset = end
+        ids, data_types, counts, lengths = columns
+        names = bytes(body[offset:])
+    offset = 0
+    for item_id, data_type, count, length in zip(ids, data_types, counts, lengths):
+        rows[item_id] = (names[offset : offset + length].decode(), data_type, count)
+        offset += length
+    return last_id
+
+
+def entities(rows: Rows) -> Iterator[DataEntity]:
+    # fields in ENTITY_FIELDS order, rows were validated before they were written
+    for item_id in sorted(rows):
+        name, data_type, count = rows[item_id]
+        yield trusted_entity((name, data_type, count, item_id))
+
+
+@contextmanager
+def paused_gc():
+    # collections triggered by many new objects would scan them and free nothing
+    enabled = gc.isenabled()
+    gc.disable()
+    try:
+        yield
+    finally:
+        if enabled:
+            gc.enable()
+
+
+class PersistentDatabase(Database):
+    # the memory database, kept across restarts by a snapshot and a log of later writes
+    def __init__(
+        self, path: str, fsync_interval: float = 0.1, snapshot_every: int = 100000
+    ):
+        self.path = path
+        self.fsync_interval = fsync_interval
+        self.snapshot_every = snapshot_every
+        self.log: Optional[WriteLog] = None
+        self.lock = None
+        self.snapshotter: Optional[threading.Thread] = None
+        super().__init__()
+
+    async def connect(self):
+        self.open()
+
+    async def disconnect(self):
+        if self.log is not None:
+            self.snapshot()
+        self.close()
+        self.reset()
+
+    def open(self):
+        self.reset()
+        # held open for the flock until close()
+        self.lock = open(os.path.join(self.path, LOCK_FILE), "w")  # noqa: SIM115
+        try:
+            fcntl.flock(self.lock, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            self.lock.close()
+            self.lock = None
+            raise RuntimeError(f"'{self.path}' is used by another process")
+        rows: Rows = {}
+        last_id = read_snapshot(os.path.join(self.path, SNAPSHOT_FILE), rows)
+        log_path = os.path.join(self.path, LOG_FILE)
+        _, previous_last_id = replay_log(self.previous_log_path, rows)
+        records, log_last_id = replay_log(log_path, rows)
+        last_id = max(last_id, previous_last_id, log_last_id)
+        with paused_gc():
+            for item in entities(rows):
+                super().add(item)
+        self.last_id = max(self.last_id, last_id)
+        self.log = WriteLog(log_path, self.fsync_interval)
+        self.log.records = records
+        if os.path.exists(self.previous_log_path):
+            # a background snapshot did not finish, fold both logs into one
+            self.snapshot()
+
+    def close(self):
+        # without a snapshot, the next start replays the log like after a crash
+        self.wait_for_snapshot()
+        if self.log is not None:
+            self.log.close()
+            self.log = None
+        if self.lock is not None:
+            self.lock.close()
+            self.lock = None
+
+    def rows(self) -> Rows:
+        # field values, items are changed in place after the copy is taken
+        with paused_gc():
+            return {
+                item.id: (item.name, item.data_type, item.count)
+                for item in self.storage.values()
+            }
+
+    @property
+    def previous_log_path(self) -> str:
+        return os.path.join(self.path, PREVIOUS_LOG_FILE)
+
+    def snapshot(self):
+        self.wait_for_snapshot()
+        write_snapshot(
+            os.path.join(self.path, SNAPSHOT_FILE), self.last_id, self.rows()
+        )
+        # replaying records the snapshot already has gives the same rows, so a crash
+        # between the snapshot and the truncate is safe; the previous log is replayed
+        # first, so it has to go before the log that follows it is emptied
+        self.remove_previous_log()
+        self.log.truncate()
+
+    def remove_previous_log(self):
+        if os.path.exists(self.previous_log_path):
+            os.remove(self.previous_log_path)
+            sync_directory(self.path)
+
+    def snapshot_in_background(self):
+        # writes continue in a new log while a thread writes the snapshot from a
+        # copy of the rows, then drops the log the snapshot covers
+        if os.path.exists(self.previous_log_path):
+            # the last background snapshot failed, the next start folds the logs
+            return
+        log_path = os.path.join(self.path, LOG_FILE)
+        previous_log = self.log
+        os.replace(log_path, self.previous_log_path)
+        self.log = WriteLog(log_path, self.fsync_interval)
+        self.snapshotter = threading.Thread(
+            target=self.write_background_snapshot,
+            args=(previous_log, self.last_id, self.rows()),
+            daemon=True,
+        )
+        self.snapshotter.start()
+
+    def write_background_snapshot(
+        self, previous_log: WriteLog, last_id: int, rows: Rows
+    ):
+        try:
+            # makes the rename and the new log durable
+            sync_directory(self.path)
+            previous_log.close()
+            write_snapshot(os.path.join(self.path, SNAPSHOT_FILE), last_id, rows)
+            self.remove_previous_log()
+        except Exception:
+            logger.exception("memory snapshot failed, the logs are kept")
+
+    def wait_for_snapshot(self):
+        if self.snapshotter is not None:
+            self.snapshotter.join()
+            self.snapshotter = None
+
+    def add(self, item: DataEntity):
+        super().add(item)
+        self._record(put_record(item))
+
+    def remove(self, item_id: int) -> Optional[DataEntity]:
+        item = super().remove(item_id)
+        if item is not None:
+            self._record(encode_record(DELETE, item_id))
+        return item
+
+    def change(self, item: DataEntity, values: dict):
+        super().change(item, values)
+        self._record(put_record(item))
+
+    def _record(self, record: bytes):
+        self.log.append(record)
+        if self.log.records >= self.snapshot_every and not (
+            self.snapshotter is not None and self.snapshotter.is_alive()
+        ):
+            self.snapshot_in_background()
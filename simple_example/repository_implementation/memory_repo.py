@@ -1,21 +1,131 @@
-from typing import List, Optional
+import secrets
+from bisect import bisect_right
+from itertools import chain, islice
+from typing import (
+    AsyncIterator,
+    Callable,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    Optional,
+    Set,
+    Tuple,
+)
 
 from pydantic import PositiveInt
 
-from simple_example.domain_logic.exceptions import ObjectNotFound
-from simple_example.domain_logic.models import DataEntity, Filters, InputModel
+from simple_example.domain_logic.consts import DataCounterLimits
+from simple_example.domain_logic.exceptions import (
+    DuplicateDataException,
+    ObjectNotFound,
+    PreconditionFailed,
+)
+from simple_example.domain_logic.models import (
+    BulkCreateResult,
+    ContentKey,
+    DataEntity,
+    DataStats,
+    Filters,
+    InputModel,
+)
 from simple_example.domain_logic.repository import AbstractRepository
 
 
+def trigrams(value: str) -> Set[str]:
+    value = value.lower()
+    return {value[i : i + 3] for i in range(len(value) - 2)}
+
+
 class Database:
     def __init__(self):
-        self.storage = {}
+        self.reset()
+
+    def reset(self):
+        self.storage: Dict[int, DataEntity] = {}
+        self.content_index: Dict[ContentKey, Set[int]] = {}
+        self.data_type_index: Dict[int, Set[int]] = {}
+        # count is bounded, so a list of buckets indexed by count is already sorted
+        self.count_index: List[Set[int]] = [
+            set() for _ in range(DataCounterLimits.MAX + 1)
+        ]
+        self.name_index: Dict[str, Set[int]] = {}
+        # items per data type and count, kept by every write so stats need no scan
+        self.histograms: Dict[int, List[int]] = {}
+        self.last_id = 0
+        # writes since the reset, the epoch tells versions of earlier resets apart
+        self.epoch = secrets.token_hex(4)
+        self.writes = 0
 
     async def connect(self):
-        self.storage = {}
+        self.reset()
 
     async def disconnect(self):
-        self.storage = {}
+        self.reset()
+
+    def pool_status(self) -> dict:
+        # no connections to pool
+        return {}
+
+    def query_statistics(self) -> List[dict]:
+        # no queries to time
+        return []
+
+    def next_id(self) -> int:
+        self.last_id += 1
+        return self.last_id
+
+    def dataset_version(self) -> str:
+        return f"{self.epoch}-{self.writes}"
+
+    def add(self, item: DataEntity):
+        self.storage[item.id] = item
+        self.last_id = max(self.last_id, item.id)
+        self._index(item)
+        self.writes += 1
+
+    def remove(self, item_id: int) -> Optional[DataEntity]:
+        item = self.storage.pop(item_id, None)
+        if item is not None:
+            self._unindex(item)
+            self.writes += 1
+        return item
+
+    def change(self, item: DataEntity, values: dict):
+        self._unindex(item)
+        for k in values:
+            setattr(item, k, values[k])
+        self._index(item)
+        self.writes += 1
+
+    def _index(self, item: DataEntity):
+        self.content_index.setdefault(item.content_key(), set()).add(item.id)
+        self.data_type_index.setdefault(item.data_type, set()).add(item.id)
+        self.count_index[item.count].add(item.id)
+        histogram = self.histograms.get(item.data_type)
+        if histogram is None:
+            histogram = self.histograms[item.data_type] = [0] * (
+                DataCounterLimits.MAX + 1
+            )
+        histogram[item.count] += 1
+        for trigram in trigrams(item.name):
+            self.name_index.setdefault(trigram, set()).add(item.id)
+
+    def _unindex(self, item: DataEntity):
+        self._discard(self.content_index, item.content_key(), item.id)
+        self._discard(self.data_type_index, item.data_type, item.id)
+        self.count_index[item.count].discard(item.id)
+        self.histograms[item.data_type][item.count] -= 1
+        for trigram in trigrams(item.name):
+            self._discard(self.name_index, trigram, item.id)
+
+    @staticmethod
+    def _discard(index: dict, key, item_id: int):
+        ids = index.get(key)
+        if ids is not None:
+            ids.discard(item_id)
+            if not ids:
+                del index[key]
 
 
 class MemoryRepository(AbstractRepository):
@@ -26,55 +136,118 @@ class MemoryRepository(AbstractRepository):
         return self.database.storage.get(item_id)
 
     async def create(self, input_data: InputModel) -> DataEntity:
-        data_id = len(self.database.storage.keys()) + 1
-        data = DataEntity(**input_data.model_dump(), id=data_id)
-        self.database.storage[data_id] = data
+        if await self.exists(input_data=input_data):
+            raise DuplicateDataException()
+        data = DataEntity(**input_data.model_dump(), id=self.database.next_id())
+        self.database.add(data)
         return data
 
     async def exists(self, input_data: InputModel) -> bool:
-        return any(
-            self.database.storage[data_id].model_dump(exclude={"id"})
-            == input_data.model_dump()
-            for data_id in self.database.storage
-        )
+        return input_data.content_key() in self.database.content_index
+
+    async def bulk_create(self, input_data: List[InputModel]) -> BulkCreateResult:
+        result = BulkCreateResult(created=[], duplicates=[])
+        for data in input_data:
+            try:
+                result.created.append(await self.create(input_data=data))
+            except DuplicateDataException:
+                result.duplicates.append(data)
+        return result
 
-    async def update(self, item_id: PositiveInt, update_data: InputModel) -> DataEntity:
+    async def update(
+        self,
+        item_id: PositiveInt,
+        update_data: InputModel,
+        expected: Optional[DataEntity] = None,
+    ) -> DataEntity:
         data = await self.get(item_id=item_id)
+        if expected is not None and data != expected:
+            raise PreconditionFailed()
         if data:
-            new_data = update_data.model_dump(exclude_unset=True)
-            for k in new_data:
-                setattr(data, k, new_data[k])
+            duplicate_ids = self.database.content_index.get(
+                update_data.content_key(), set()
+            )
+            if duplicate_ids - {item_id}:
+                raise DuplicateDataException()
+            self.database.change(data, update_data.model_dump(exclude_unset=True))
             return data
         raise ObjectNotFound()
 
-    async def delete(self, item_id: PositiveInt) -> bool:
-        item = self.database.storage.pop(item_id, None)
+    async def delete(
+        self, item_id: PositiveInt, expected: Optional[DataEntity] = None
+    ) -> bool:
+        if expected is not None and await self.get(item_id=item_id) != expected:
+            raise PreconditionFailed()
+        item = self.database.remove(item_id)
         return item is not None
 
-    @staticmethod
-    def __filter_item(item: DataEntity, filters: Filters):
-        if (
-            filters.search_string is not None
-            and item.name.find(filters.search_string) == -1
-        ):
-            return False
+    async def dataset_version(self) -> Optional[str]:
+        return self.database.dataset_version()
+
+    def __plan(self, filters: Filters) -> Optional[List[int]]:
+        # pick the most selective index, remaining predicates are checked per item
+        candidates: List[Tuple[int, Callable[[], Iterable[int]]]] = []
+        if filters.search_string is not None and len(filters.search_string) >= 3:
+            postings = sorted(
+                (
+                    self.database.name_index.get(trigram, set())
+                    for trigram in trigrams(filters.search_string)
+                ),
+                key=len,
+            )
+            candidates.append((len(postings[0]), lambda: set.intersection(*postings)))
+        if filters.data_type is not None:
+            type_ids = self.database.data_type_index.get(filters.data_type, set())
+            candidates.append((len(type_ids), lambda: type_ids))
         if (
             filters.count_lower_limit is not None
-            and item.count < filters.count_lower_limit
-        ):
-            return False
-        if (
-            filters.count_upper_limit is not None
-            and item.count > filters.count_upper_limit
+            or filters.count_upper_limit is not None
         ):
-            return False
-        if filters.data_type is not None and item.data_type != filters.data_type:
-            return False
-        return True
+            lower, upper = filters.count_bounds()
+            buckets = self.database.count_index[lower : upper + 1]
+            candidates.append(
+                (sum(len(ids) for ids in buckets), lambda: chain.from_iterable(buckets))
+            )
+        if not candidates:
+            return None
+        _, candidate_ids = min(candidates, key=lambda candidate: candidate[0])
+        ids = sorted(candidate_ids())
+        if filters.after_id is not None:
+            del ids[: bisect_right(ids, filters.after_id)]
+        return ids
+
+    def __matching(self, filters: Filters, by_id: bool = False) -> Iterator[DataEntity]:
+        storage = self.database.storage
+        ids = self.__plan(filters)
+        if ids is None:
+            if filters.after_id is None and not by_id:
+                # ids are handed out in increasing order, so storage is ordered by id
+                items: Iterable[Optional[DataEntity]] = storage.values()
+            else:
+                after_id = filters.after_id or 0
+                ids = range(after_id + 1, self.database.last_id + 1)
+        if ids is not None:
+            items = (storage.get(item_id) for item_id in ids)
+        return islice(
+            (item for item in items if item is not None and filters.matches(item)),
+            filters.limit,
+        )
 
     async def list(self, filters: Filters) -> List[Optional[DataEntity]]:
-        return [
-            item
-            for item in self.database.storage.values()
-            if self.__filter_item(item, filters)
-        ]
+        return list(self.__matching(filters))
+
+    async def iter_list(self, filters: Filters) -> AsyncIterator[DataEntity]:
+        # storage can change while the consumer is suspended, so walk ids, not the dict
+        for item in self.__matching(filters, by_id=True):
+            yield item
+
+    async def stats(self, filters: Filters) -> DataStats:
+        if not filters.search_string:
+            return DataStats.from_histograms(self.database.histograms, filters)
+        return DataStats.from_rows(
+            (
+                (item.data_type, item.count, 1)
+                for item in self.__matching(filters.unpaged())
+            ),
+            filters,
+        )
@@ -0,0 +1,121 @@
+import logging
+import re
+import time
+from collections import deque
+from functools import lru_cache
+from typing import Deque, Dict, List, Optional
+
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+# configured by LoggingConfiguration.LOG_SQL
+SQL_LOGGER_NAME = "databases"
+OTHER_STATEMENTS = "<other statements>"
+
+# a parenthesised list of bind placeholders in qmark, numeric dollar, pyformat or named style
+PLACEHOLDER_LIST = re.compile(
+    r"\(\s*(?:\?|\$\d+|%\(\w+\)s|:\w+)(?:\s*,\s*(?:\?|\$\d+|%\(\w+\)s|:\w+))*\s*\)"
+)
+REPEATED_LISTS = re.compile(r"\(\.\.\.\)(?:\s*,\s*\(\.\.\.\))+")
+
+sql_logger = logging.getLogger(SQL_LOGGER_NAME)
+
+
+@lru_cache(maxsize=1024)
+def statement_shape(statement: str) -> str:
+    # IN lists and multi-row VALUES differ in length per call, but are one query shape
+    shape = PLACEHOLDER_LIST.sub("(...)", statement)
+    return " ".join(REPEATED_LISTS.sub("(...)", shape).split())
+
+
+def redact_parameters(parameters, many: bool) -> str:
+    # only the shape of the parameters is logged, never the values
+    if many:
+        return f"{len(parameters)} parameter sets"
+    if isinstance(parameters, dict):
+        return str({key: type(value).__name__ for key, value in parameters.items()})
+    return str(tuple(type(value).__name__ for value in parameters or ()))
+
+
+class StatementStatistics:
+    def __init__(self, samples: int):
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        # recent durations, percentiles follow the current behaviour of the query
+        self.durations: Deque[float] = deque(maxlen=samples)
+
+    def observe(self, duration: float):
+        self.count += 1
+        self.total += duration
+        self.max = max(self.max, duration)
+        self.durations.append(duration)
+
+    def summary(self) -> dict:
+        durations = sorted(self.durations)
+
+        def percentile(fraction: float) -> float:
+            return durations[int(fraction * (len(durations) - 1))] * 1000
+
+        return {
+            "count": self.count,
+            "total_ms": self.total * 1000,
+            "mean_ms": self.total / self.count * 1000,
+            "p50_ms": percentile(0.5),
+            "p99_ms": percentile(0.99),
+            "max_ms": self.max * 1000,
+        }
+
+
+class QueryStatistics:
+    def __init__(
+        self,
+        slow_query_ms: Optional[float] = None,
+        max_statements: int = 500,
+        samples: int = 1000,
+    ):
+        self.slow_query_ms = slow_query_ms
+        self.max_statements = max_statements
+        self.samples = samples
+        self.statements: Dict[str, StatementStatistics] = {}
+
+    def observe(self, statement: str, parameters, many: bool, duration: float):
+        shape = statement_shape(statement)
+        statistics = self.statements.get(shape)
+        if statistics is None:
+            if len(self.statements) >= self.max_statements:
+                shape = OTHER_STATEMENTS
+            statistics = self.statements.get(shape)
+            if statistics is None:
+                statistics = self.statements[shape] = StatementStatistics(self.samples)
+        statistics.observe(duration)
+        if self.slow_query_ms is not None and duration * 1000 >= self.slow_query_ms:
+            sql_logger.warning(
+                "slow query %.1f ms: %s parameters: %s",
+                duration * 1000,
+                shape,
+                redact_parameters(parameters, many),
+            )
+
+    def statistics(self) -> List[dict]:
+        # the statements that took the most time in total first
+        return sorted(
+            (
+                {"statement": shape, **statistics.summary()}
+                for shape, statistics in self.statements.items()
+            ),
+            key=lambda summary: summary["total_ms"],
+            reverse=True,
+        )
+
+
+def watch_queries(engine: AsyncEngine, query_statistics: QueryStatistics):
+    # the start time lives on the execution context, failed statements leave nothing behind
+    @event.listens_for(engine.sync_engine, "before_cursor_execute")
+    def before_cursor_execute(conn, cursor, statement, parameters, context, many):
+        context.query_statistics_start = time.perf_counter()
+
+    @event.listens_for(engine.sync_engine, "after_cursor_execute")
+    def after_cursor_execute(conn, cursor, statement, parameters, context, many):
+        duration = time.perf_counter() - context.query_statistics_start
+        query_statistics.observe(statement, parameters, many, duration)
@@ -0,0 +1,687 @@
+import asyncio
+import codecs
+import fcntl
+import os
+import platform
+import re
+import struct
+import tempfile
+from array import array
+from bisect import bisect_left, bisect_right
+from contextlib import asynccontextmanager, contextmanager
+from functools import partial
+from multiprocessing import resource_tracker, shared_memory
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+from simple_example.domain_logic.consts import DataCounterLimits
+from simple_example.domain_logic.exceptions import StorageFull
+from simple_example.domain_logic.models import (
+    ContentKey,
+    DataEntity,
+    Filters,
+    Histograms,
+    trusted_entity,
+)
+from simple_example.repository_implementation.columnar_repo import (
+    DELETED,
+    EMPTY,
+    MIN_SLOTS,
+    T,
+    combine_masks,
+    content_hash,
+    predicate_tables,
+)
+
+MAGIC = int.from_bytes(b"SHMCOL04", "little")
+# header words
+(
+    MAGIC_WORD,
+    SEQUENCE,
+    ROWS,
+    DEAD_ROWS,
+    LAST_ID,
+    SEGMENTS,
+    STALE_SEGMENTS,
+    NAMES_USED,
+    FOLDED_USED,
+    USED_SLOTS,
+    TYPE_COUNT,
+    CAPACITY,
+    NAME_CAPACITY,
+    EPOCH,
+) = range(14)
+HEADER_WORDS = 16
+MAX_DATA_TYPES = 256
+COUNT_BUCKETS = DataCounterLimits.MAX + 1
+# optimistic read attempts while writes keep landing, before waiting for the write lock
+READ_RETRIES = 100
+# the lock-free reads need loads and stores kept in program order, which x86-64
+# guarantees without barriers; weaker orderings like ARM could read torn rows
+SEQLOCK_MACHINES = ("x86_64", "amd64")
+
+Layout = List[Tuple[str, str, int, int]]
+
+
+def layout(capacity: int, name_capacity: int) -> Tuple[Layout, int]:
+    # (column, typecode, offset, bytes), wider types first so every column is aligned
+    slots = MIN_SLOTS
+    while slots < 4 * capacity:
+        slots *= 2
+    # renames take new segments, so a full segment can still rename rows
+    segments = 2 * capacity
+    columns = (
+        ("header", "Q", HEADER_WORDS),
+        ("ids", "q", capacity),
+        ("segments", "q", capacity),
+        ("segment_names", "q", segments),
+        ("segment_folded", "q", segments),
+        ("segment_owners", "q", segments),
+        ("slots", "q", slots),
+        # items per data type code and count
+        ("histograms", "q", MAX_DATA_TYPES * COUNT_BUCKETS),
+        ("hashes", "I", capacity),
+        ("data_types", "H", MAX_DATA_TYPES),
+        ("alive", "B", capacity),
+        ("type_codes", "B", capacity),
+        ("counts", "B", capacity),
+        ("names", "B", name_capacity),
+        ("folded_names", "B", name_capacity),
+    )
+    placed = []
+    offset = 0
+    for column, typecode, length in columns:
+        size = struct.calcsize(typecode) * length
+        placed.append((column, typecode, offset, size))
+        offset += size
+    return placed, offset
+
+
+def translate(column: memoryview, table: bytes) -> bytes:
+    # bytes.translate for a buffer: the charmap codec maps every byte through the
+    # table in C, straight from the shared memory
+    decoded, _ = codecs.charmap_decode(column, "strict", table.decode("latin-1"))
+    return decoded.encode("latin-1")
+
+
+def tracked_name(name: str) -> str:
+    # the POSIX name SharedMemory registers with the resource tracker
+    return f"/{name}"
+
+
+def untrack(name: str):
+    # the resource tracker of every process that opens a segment unlinks it when that
+    # process exits, under the feet of the other workers; segments are unlinked by
+    # the last worker to detach instead
+    resource_tracker.unregister(tracked_name(name), "shared_memory")
+
+
+class SharedMemoryDatabase:
+    # the columns of ColumnarDatabase in one shared memory segment, opened by every
+    # worker on the node. Rows are appended in id order and deleted rows are only
+    # marked until the segment is compacted, so positions stay put between writes.
+    # Writers take an flock; readers take no lock, they retry when the sequence
+    # number shows a write started or finished during the read (a seqlock)
+    def __init__(
+        self,
+        name: str,
+        capacity: int = 1000000,
+        name_capacity: int = 32 * 1024 * 1024,
+    ):
+        self.memory_name = name
+        self.lock_path = os.path.join(tempfile.gettempdir(), f"{name}.lock")
+        self.workers_path = os.path.join(tempfile.gettempdir(), f"{name}.workers")
+        self.capacity = capacity
+        self.name_capacity = name_capacity
+        self.memory: Optional[shared_memory.SharedMemory] = None
+        self.views: Dict[str, memoryview] = {}
+        self.lock_file = None
+        self.workers_file = None
+
+    async def connect(self):
+        self.open()
+
+    async def disconnect(self):
+        self.close()
+
+    def pool_status(self) -> dict:
+        # no connections to pool
+        return {}
+
+    def query_statistics(self) -> List[dict]:
+        # no queries to time
+        return []
+
+    def open(self):
+        machine = platform.machine()
+        if machine.lower() not in SEQLOCK_MACHINES:
+            raise RuntimeError(
+                f"the shared backend needs an x86-64 machine, this one is '{machine}'"
+            )
+        # kept after the last worker detaches, a worker may have them open already;
+        # held open for the flocks until close()
+        self.lock_file = open(self.lock_path, "w")  # noqa: SIM115
+        self.workers_file = open(self.workers_path, "w")  # noqa: SIM115
+        try:
+            with self.locked():
+                self.attach()
+        except Exception:
+            self.workers_file.close()
+            self.lock_file.close()
+            raise
+        views = self.views
+        self.header = views["header"]
+        self.id_column = views["ids"]
+        self.type_code_column = views["type_codes"]
+        self.count_column = views["counts"]
+        self.alive = views["alive"]
+        self.hashes = views["hashes"]
+        self.segments = views["segments"]
+        self.names = views["names"]
+        self.folded_names = views["folded_names"]
+        self.segment_names = views["segment_names"]
+        self.segment_folded = views["segment_folded"]
+        self.segment_owners = views["segment_owners"]
+        self.slots = views["slots"]
+        self.data_types = views["data_types"]
+        self.histogram_table = views["histograms"]
+
+    def attach(self):
+        # every attached worker holds a shared flock on the workers file, which the
+        # kernel drops when a worker dies; getting it exclusively means no worker
+        # is left, and a segment of workers killed without closing it is stale
+        first = self.only_worker()
+        fcntl.flock(self.workers_file, fcntl.LOCK_SH)
+        columns, size = layout(self.capacity, self.name_capacity)
+        if first:
+            try:
+                stale = shared_memory.SharedMemory(self.memory_name)
+            except FileNotFoundError:
+                pass
+            else:
+                stale.close()
+                stale.unlink()
+            memory = shared_memory.SharedMemory(
+                self.memory_name, create=True, size=size
+            )
+        else:
+            memory = shared_memory.SharedMemory(self.memory_name)
+        untrack(self.memory_name)
+        self.memory = memory
+        if memory.size < size:
+            self.release()
+            raise RuntimeError(
+                f"shared memory '{self.memory_name}' is smaller than the configured capacity"
+            )
+        self.views = {
+            column: memory.buf[offset : offset + length].cast(typecode)
+            for column, typecode, offset, length in columns
+        }
+        header = self.views["header"]
+        if first:
+            # a new segment is all zeros
+            header[CAPACITY] = self.capacity
+            header[NAME_CAPACITY] = self.name_capacity
+            # a segment created again starts its sequence from zero too
+            header[EPOCH] = int.from_bytes(os.urandom(4), "little")
+            header[MAGIC_WORD] = MAGIC
+        elif (
+            header[MAGIC_WORD] != MAGIC
+            or header[CAPACITY] != self.capacity
+            or header[NAME_CAPACITY] != self.name_capacity
+        ):
+            self.release()
+            raise RuntimeError(
+                f"shared memory '{self.memory_name}' was created with another layout"
+            )
+
+    def close(self):
+        if self.memory is None:
+            return
+        memory = self.memory
+        with self.locked():
+            last = self.only_worker()
+            self.release()
+            if last:
+                # unlink unregisters the segment from the tracker again
+                resource_tracker.register(
+                    tracked_name(self.memory_name), "shared_memory"
+                )
+                memory.unlink()
+        self.workers_file.close()
+        self.lock_file.close()
+
+    def only_worker(self) -> bool:
+        # under the lock, so no other worker attaches or closes in between; a failed
+        # upgrade drops the shared flock, attach() and close() give it up anyway
+        try:
+            fcntl.flock(self.workers_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            return False
+        return True
+
+    def release(self):
+        # released views cannot be read, the segment can only be closed without them
+        for view in self.views.values():
+            view.release()
+        self.views = {}
+        self.memory.close()
+        self.memory = None
+
+    @contextmanager
+    def locked(self):
+        # blocking, only for attaching and detaching
+        fcntl.flock(self.lock_file, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(self.lock_file, fcntl.LOCK_UN)
+
+    @asynccontextmanager
+    async def locked_async(self):
+        release = await self.acquire()
+        try:
+            yield
+        finally:
+            release()
+
+    async def acquire(self) -> Callable[[], None]:
+        # this worker's descriptor serves coroutines that hold the lock without
+        # awaiting, they cannot overlap
+        try:
+            fcntl.flock(self.lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            return partial(fcntl.flock, self.lock_file, fcntl.LOCK_UN)
+        except BlockingIOError:
+            pass
+        # busy, for example during another worker's compaction: wait in a thread
+        # instead of on the event loop, on a descriptor of its own so a cancelled
+        # wait can drop a lock it gets late by closing it
+        descriptor = os.open(self.lock_path, os.O_RDWR)
+        acquire = asyncio.get_running_loop().run_in_executor(
+            None, fcntl.flock, descriptor, fcntl.LOCK_EX
+        )
+        try:
+            await asyncio.shield(acquire)
+        except asyncio.CancelledError:
+            acquire.add_done_callback(lambda _: os.close(descriptor))
+            raise
+        except BaseException:
+            os.close(descriptor)
+            raise
+        return partial(os.close, descriptor)
+
+    @asynccontextmanager
+    async def writing(self):
+        # odd while the columns change; open() refuses machines that reorder stores
+        header = self.header
+        async with self.locked_async():
+            header[SEQUENCE] += 1
+            try:
+                yield
+            finally:
+                header[SEQUENCE] += 1
+
+    async def read(self, function: Callable[[], T]) -> T:
+        header = self.header
+        for _ in range(READ_RETRIES):
+            sequence = header[SEQUENCE]
+            if not sequence & 1:
+                try:
+                    result = function()
+                except Exception:
+                    # a write during the read can leave columns half updated
+                    if header[SEQUENCE] != sequence:
+                        continue
+                    raise
+                if header[SEQUENCE] == sequence:
+                    return result
+            await asyncio.sleep(0)
+        # a long write, like a compaction; wait for it instead of spinning
+        async with self.locked_async():
+            return function()
+
+    def __len__(self) -> int:
+        return self.header[ROWS]
+
+    @property
+    def ids(self) -> memoryview:
+        return self.id_column[: self.header[ROWS]]
+
+    @property
+    def type_codes(self) -> memoryview:
+        return self.type_code_column[: self.header[ROWS]]
+
+    @property
+    def counts(self) -> memoryview:
+        return self.count_column[: self.header[ROWS]]
+
+    @property
+    def last_id(self) -> int:
+        return self.header[LAST_ID]
+
+    @property
+    def data_type_codes(self) -> Dict[int, int]:
+        data_types = self.data_types
+        return {data_types[code]: code for code in range(self.header[TYPE_COUNT])}
+
+    @property
+    def histograms(self) -> Histograms:
+        table, data_types = self.histogram_table, self.data_types
+        return {
+            data_types[code]: table[code * COUNT_BUCKETS : (code + 1) * COUNT_BUCKETS]
+            for code in range(self.header[TYPE_COUNT])
+        }
+
+    def dataset_version(self) -> str:
+        # the sequence moves with every write of any worker
+        header = self.header
+        return f"{header[EPOCH]:08x}-{header[SEQUENCE]}"
+
+    def next_id(self) -> int:
+        # taken by add, so a create refused for lack of room does not use up an id
+        return self.header[LAST_ID] + 1
+
+    def position(self, item_id: int) -> Optional[int]:
+        ids = self.ids
+        position = bisect_left(ids, item_id)
+        if position < len(ids) and ids[position] == item_id and self.alive[position]:
+            return position
+        return None
+
+    def entity(self, position: int) -> DataEntity:
+        return self.entities((position,))[0]
+
+    def entities(self, positions: Iterable[int]) -> List[DataEntity]:
+        ids, type_codes, counts, segments = (
+            self.id_column,
+            self.type_code_column,
+            self.count_column,
+            self.segments,
+        )
+        names, starts, data_types = self.names, self.segment_names, self.data_types
+        last_segment = self.header[SEGMENTS] - 1
+        names_used = self.header[NAMES_USED]
+        items = []
+        for position in positions:
+            segment = segments[position]
+            end = starts[segment + 1] if segment < last_segment else names_used
+            # fields in ENTITY_FIELDS order
+            items.append(
+                trusted_entity(
+                    (
+                        str(names[starts[segment] : end], "utf-8"),
+                        data_types[type_codes[position]],
+                        counts[position],
+                        ids[position],
+                    )
+                )
+            )
+        return items
+
+    def name(self, position: int) -> str:
+        return self.encoded_name(position).decode()
+
+    def encoded_name(self, position: int) -> bytes:
+        segment = self.segments[position]
+        start, end = self._bounds(self.segment_names, NAMES_USED, segment)
+        return bytes(self.names[start:end])
+
+    def find(self, key: ContentKey) -> Optional[int]:
+        name, data_type, count = key
+        code = self.data_type_codes.get(data_type)
+        if code is None:
+            return None
+        encoded = name.encode()
+        content = content_hash(encoded, data_type, count)
+        slots = self.slots
+        mask = len(slots) - 1
+        slot = content & mask
+        while True:
+            item_id = slots[slot]
+            if item_id == EMPTY:
+                return None
+            if item_id != DELETED:
+                position = self.position(item_id)
+                if (
+                    position is not None
+                    and self.hashes[position] == content
+                    and self.count_column[position] == count
+                    and self.type_code_column[position] == code
+                    and self.encoded_name(position) == encoded
+                ):
+                    return item_id
+            slot = (slot + 1) & mask
+
+    def add(self, item: DataEntity):
+        header = self.header
+        if header[ROWS] and item.id <= self.id_column[header[ROWS] - 1]:
+            raise ValueError("rows are appended in increasing id order")
+        encoded = item.name.encode()
+        folded = item.name.lower().encode()
+        self._make_room(1, len(encoded), len(folded))
+        code = self._type_code(item.data_type)
+        content = content_hash(encoded, item.data_type, item.count)
+        position = header[ROWS]
+        self.id_column[position] = item.id
+        self.alive[position] = 1
+        self.type_code_column[position] = code
+        self.count_column[position] = item.count
+        self.hashes[position] = content
+        self.segments[position] = self._add_segment(item.id, encoded, folded)
+        self.histogram_table[code * COUNT_BUCKETS + item.count] += 1
+        header[ROWS] = position + 1
+        self._insert_slot(item.id, content)
+        header[LAST_ID] = max(header[LAST_ID], item.id)
+
+    def remove(self, item_id: int) -> bool:
+        position = self.position(item_id)
+        if position is None:
+            return False
+        self._remove_slot(item_id, self.hashes[position])
+        self.alive[position] = 0
+        self.histogram_table[
+            self.type_code_column[position] * COUNT_BUCKETS
+            + self.count_column[position]
+        ] -= 1
+        self.header[DEAD_ROWS] += 1
+        self._drop_segment(self.segments[position])
+        return True
+
+    def change(self, item_id: int, values: dict):
+        position = self.position(item_id)
+        name = values.get("name", self.name(position))
+        data_type = values.get(
+            "data_type", self.data_types[self.type_code_column[position]]
+        )
+        count = values.get("count", self.count_column[position])
+        renamed = name != self.name(position)
+        if renamed:
+            encoded = name.encode()
+            folded = name.lower().encode()
+            # a compaction moves rows
+            self._make_room(0, len(encoded), len(folded))
+            position = self.position(item_id)
+        code = self._type_code(data_type)
+        content = content_hash(name.encode(), data_type, count)
+        self._remove_slot(item_id, self.hashes[position])
+        self.histogram_table[
+            self.type_code_column[position] * COUNT_BUCKETS
+            + self.count_column[position]
+        ] -= 1
+        self.histogram_table[code * COUNT_BUCKETS + count] += 1
+        self.type_code_column[position] = code
+        self.count_column[position] = count
+        self.hashes[position] = content
+        segment = self.segments[position]
+        if renamed:
+            self.segments[position] = self._add_segment(item_id, encoded, folded)
+        self._insert_slot(item_id, content)
+        if renamed:
+            # last, a compaction moves rows and rebuilds the slots from them
+            self._drop_segment(segment)
+
+    def search(self, text: str) -> List[int]:
+        # substring search over all names at once, hits are mapped back to rows
+        needle = text.lower().encode()
+        pattern = re.compile(re.escape(needle))
+        folded, starts, owners = (
+            self.folded_names,
+            self.segment_folded[: self.header[SEGMENTS]],
+            self.segment_owners,
+        )
+        used = self.header[FOLDED_USED]
+        positions = []
+        match = pattern.search(folded, 0, used)
+        while match is not None:
+            hit = match.start()
+            segment = bisect_right(starts, hit) - 1
+            end = starts[segment + 1] if segment + 1 < len(starts) else used
+            owner = owners[segment]
+            if owner != EMPTY and hit + len(needle) <= end:
+                position = self.position(owner)
+                if position is not None:
+                    positions.append(position)
+            match = pattern.search(folded, max(end, hit + 1), used)
+        positions.sort()
+        return positions
+
+    def predicate_tables(
+        self, filters: Filters
+    ) -> Tuple[Optional[bytes], Optional[bytes]]:
+        return predicate_tables(filters, self.data_type_codes)
+
+    def mask(
+        self, type_table: Optional[bytes], count_table: Optional[bytes]
+    ) -> Optional[bytes]:
+        # evaluated over the shared columns without copying them out of the segment
+        rows = self.header[ROWS]
+        masks = [
+            translate(column[:rows], table)
+            for column, table in (
+                (self.type_code_column, type_table),
+                (self.count_column, count_table),
+            )
+            if table is not None
+        ]
+        if self.header[DEAD_ROWS]:
+            masks.append(self.alive[:rows])
+        if not masks:
+            return None
+        return combine_masks(masks, rows)
+
+    def _make_room(self, rows: int, names: int, folded: int):
+        header = self.header
+        for attempt in range(2):
+            if (
+                header[ROWS] + rows <= self.capacity
+                and header[SEGMENTS] < 2 * self.capacity
+                and header[NAMES_USED] + names <= self.name_capacity
+                and header[FOLDED_USED] + folded <= self.name_capacity
+            ):
+                return
+            if attempt or not (header[DEAD_ROWS] or header[STALE_SEGMENTS]):
+                break
+            self._compact()
+        raise StorageFull()
+
+    def _type_code(self, data_type: int) -> int:
+        code = self.data_type_codes.get(data_type)
+        if code is None:
+            code = self.header[TYPE_COUNT]
+            if code == MAX_DATA_TYPES:
+                raise StorageFull()
+            self.data_types[code] = data_type
+            self.header[TYPE_COUNT] = code + 1
+        return code
+
+    def _bounds(self, starts: memoryview, used: int, segment: int) -> Tuple[int, int]:
+        if segment + 1 < self.header[SEGMENTS]:
+            return starts[segment], starts[segment + 1]
+        return starts[segment], self.header[used]
+
+    def _add_segment(self, owner: int, encoded: bytes, folded: bytes) -> int:
+        header = self.header
+        segment = header[SEGMENTS]
+        names_used, folded_used = header[NAMES_USED], header[FOLDED_USED]
+        self.names[names_used : names_used + len(encoded)] = encoded
+        self.folded_names[folded_used : folded_used + len(folded)] = folded
+        self.segment_owners[segment] = owner
+        self.segment_names[segment] = names_used
+        self.segment_folded[segment] = folded_used
+        header[NAMES_USED] = names_used + len(encoded)
+        header[FOLDED_USED] = folded_used + len(folded)
+        header[SEGMENTS] = segment + 1
+        return segment
+
+    def _drop_segment(self, segment: int):
+        header = self.header
+        self.segment_owners[segment] = EMPTY
+        header[STALE_SEGMENTS] += 1
+        if header[STALE_SEGMENTS] > header[ROWS] - header[DEAD_ROWS]:
+            self._compact()
+
+    def _compact(self):
+        # live rows are moved to the front and their names packed again
+        header = self.header
+        rows = [
+            (
+                self.id_column[position],
+                self.type_code_column[position],
+                self.count_column[position],
+                self.hashes[position],
+                self.encoded_name(position),
+            )
+            for position in range(header[ROWS])
+            if self.alive[position]
+        ]
+        for attribute in (ROWS, DEAD_ROWS, SEGMENTS, STALE_SEGMENTS):
+            header[attribute] = 0
+        header[NAMES_USED] = header[FOLDED_USED] = 0
+        for position, (item_id, code, count, content, encoded) in enumerate(rows):
+            self.id_column[position] = item_id
+            self.alive[position] = 1
+            self.type_code_column[position] = code
+            self.count_column[position] = count
+            self.hashes[position] = content
+            self.segments[position] = self._add_segment(
+                item_id, encoded, encoded.decode().lower().encode()
+            )
+        header[ROWS] = len(rows)
+        self._rehash()
+
+    def _insert_slot(self, item_id: int, content: int):
+        if (self.header[USED_SLOTS] + 1) * 2 > len(self.slots):
+            # rebuilt from the columns, which already hold this row
+            self._rehash()
+            return
+        slots = self.slots
+        mask = len(slots) - 1
+        slot = content & mask
+        while slots[slot] > 0:
+            slot = (slot + 1) & mask
+        if slots[slot] == EMPTY:
+            self.header[USED_SLOTS] += 1
+        slots[slot] = item_id
+
+    def _remove_slot(self, item_id: int, content: int):
+        slots = self.slots
+        mask = len(slots) - 1
+        slot = content & mask
+        while slots[slot] != item_id:
+            slot = (slot + 1) & mask
+        slots[slot] = DELETED
+
+    def _rehash(self):
+        # the table has room for four times the capacity, deleted slots are dropped
+        slots = self.slots
+        slots[:] = array("q", bytes(slots.nbytes))
+        mask = len(slots) - 1
+        used = 0
+        for position in range(self.header[ROWS]):
+            if not self.alive[position]:
+                continue
+            slot = self.hashes[position] & mask
+            while slots[slot] != EMPTY:
+                slot = (slot + 1) & mask
+            slots[slot] = self.id_column[position]
+            used += 1
+        self.header[USED_SLOTS] = used
@@ -1,27 +1,55 @@
-from typing import List, Optional
+import os
+from typing import AsyncContextManager, AsyncIterator, List, Optional, Set
 
 from pydantic import PositiveInt, PostgresDsn
 from sqlalchemy import (
+    BigInteger,
     Column,
+    Index,
     Integer,
     MetaData,
     String,
     Table,
     and_,
     delete,
-    insert,
+    func,
     select,
+    text,
+    tuple_,
     update,
 )
-from sqlalchemy.ext.asyncio import create_async_engine
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncConnection, create_async_engine
 from sqlalchemy.orm import Query
+from sqlalchemy.sql.dml import Insert
 
-from simple_example.domain_logic.exceptions import ObjectNotFound
-from simple_example.domain_logic.models import DataEntity, Filters, InputModel
+from simple_example.domain_logic.exceptions import (
+    DuplicateDataException,
+    ObjectNotFound,
+    PreconditionFailed,
+)
+from simple_example.domain_logic.models import (
+    ENTITY_FIELDS,
+    BulkCreateResult,
+    DataEntity,
+    DataStats,
+    Filters,
+    InputModel,
+    trusted_entity,
+    validated_entity,
+)
 from simple_example.domain_logic.repository import AbstractRepository
+from simple_example.repository_implementation.query_statistics import (
+    QueryStatistics,
+    sql_logger,
+    watch_queries,
+)
 
 metadata = MetaData()
 
+CONTENT_INDEX = "uq_data_model_content"
+
 
 EntityDataTable = Table(
     "data_model",
@@ -30,32 +58,139 @@ EntityDataTable = Table(
     Column("name", String, nullable=False),
     Column("data_type", Integer, nullable=False),
     Column("count", Integer, nullable=False),
+    # backs duplicate detection and exists(), ON CONFLICT relies on it
+    Index(CONTENT_INDEX, "name", "data_type", "count", unique=True),
+    # data_type equality with a count range, as built from Filters
+    Index("ix_data_model_data_type_count", "data_type", "count"),
+)
+
+# one row, bumped in the transaction of every write that changes data_model; the
+# random epoch tells the versions of a recreated database apart
+DatasetVersionTable = Table(
+    "dataset_version",
+    metadata,
+    Column("id", Integer, primary_key=True),
+    Column("epoch", BigInteger, nullable=False),
+    Column("version", BigInteger, nullable=False),
+)
+BUMP_DATASET_VERSION = update(DatasetVersionTable).values(
+    version=DatasetVersionTable.c.version + 1
+)
+
+# selected and returned in model field order, so rows zip straight into DataEntity
+ENTITY_COLUMNS = tuple(EntityDataTable.c[field] for field in ENTITY_FIELDS)
+
+# dialects with INSERT ... ON CONFLICT DO NOTHING
+DIALECT_INSERTS = {
+    "postgresql": postgresql.insert,
+    "sqlite": sqlite.insert,
+}
+
+
+STREAM_CHUNK_SIZE = 1000
+
+TRIGRAM_INDEX_DDL = (
+    "CREATE EXTENSION IF NOT EXISTS pg_trgm",
+    "CREATE INDEX IF NOT EXISTS ix_data_model_name_trgm "
+    "ON data_model USING gin (name gin_trgm_ops)",
 )
 
 
+def escape_like(value: str, escape_character: str = "\\") -> str:
+    for character in (escape_character, "%", "_"):
+        value = value.replace(character, escape_character + character)
+    return value
+
+
 class Database:
-    def __init__(self, engine):
+    def __init__(
+        self,
+        engine,
+        trigram_index: bool = False,
+        queries: Optional[QueryStatistics] = None,
+    ):
         self.engine = engine
+        self.trigram_index = trigram_index
+        self.queries = queries
+        # declared indexes that existing rows kept create_missing_indexes from adding
+        self.missing_indexes: Set[str] = set()
 
     async def connect(self):
         async with self.engine.begin() as conn:
             await conn.run_sync(metadata.create_all)
+            await conn.execute(
+                DIALECT_INSERTS[conn.dialect.name](DatasetVersionTable)
+                .values(id=1, epoch=int.from_bytes(os.urandom(4), "little"), version=0)
+                .on_conflict_do_nothing()
+            )
+            if self.trigram_index and conn.dialect.name == "postgresql":
+                for statement in TRIGRAM_INDEX_DDL:
+                    await conn.execute(text(statement))
+        await self.create_missing_indexes()
+
+    async def create_missing_indexes(self):
+        # create_all skips existing tables, so deployments created before an index
+        # was declared get it here; one transaction each, a failure skips only that index
+        self.missing_indexes = set()
+        for index in sorted(EntityDataTable.indexes, key=lambda index: index.name):
+            try:
+                async with self.engine.begin() as conn:
+                    await conn.run_sync(index.create, checkfirst=True)
+            except IntegrityError as e:
+                self.missing_indexes.add(index.name)
+                sql_logger.warning(
+                    "index %s not created, existing rows violate it: %s",
+                    index.name,
+                    e.orig,
+                )
+
+    @property
+    def unique_content(self) -> bool:
+        # without the unique index, the database does not reject duplicate content
+        return CONTENT_INDEX not in self.missing_indexes
+
+    # SQLRepository writes go through here, single-writer backends serialize them
+    def begin_write(self) -> AsyncContextManager[AsyncConnection]:
+        return self.engine.begin()
 
     async def disconnect(self):
         await self.engine.dispose()
 
+    def pool_status(self) -> dict:
+        pool = self.engine.pool
+        return {
+            "size": pool.size(),
+            "checked_in": pool.checkedin(),
+            "checked_out": pool.checkedout(),
+            "overflow": pool.overflow(),
+        }
+
+    def query_statistics(self) -> List[dict]:
+        if self.queries is None:
+            return []
+        return self.queries.statistics()
 
-def setup_db_connection(database_url: PostgresDsn):
+
+def setup_db_connection(
+    database_url: PostgresDsn,
+    trigram_index: bool = False,
+    slow_query_ms: Optional[float] = None,
+    **engine_options,
+):
     # make sure to use string form to avoid sqlalchemy exception:
     # sqlalchemy.exc.ArgumentError: Expected string or URL object, got MultiHostUrl
-    engine = create_async_engine(database_url.unicode_string())
+    engine = create_async_engine(database_url.unicode_string(), **engine_options)
+    queries = QueryStatistics(slow_query_ms=slow_query_ms)
+    watch_queries(engine, queries)
 
-    return Database(engine)
+    return Database(engine, trigram_index=trigram_index, queries=queries)
 
 
 class SQLRepository(AbstractRepository):
-    def __init__(self, database: Database):
+    def __init__(self, database: Database, trusted_rows: bool = False):
+        self.database = database
         self.engine = database.engine
+        self.to_entity = trusted_entity if trusted_rows else validated_entity
 
     async def execute_query_with_one_result(
         self, query: select
@@ -64,7 +199,7 @@ class SQLRepository(AbstractRepository):
             result = await conn.execute(query)
             db_data = result.first()
             if db_data:
-                return DataEntity(**db_data._mapping)
+                return self.to_entity(db_data)
             return None
 
     async def execute_query_with_many_results(
@@ -74,31 +209,88 @@ class SQLRepository(AbstractRepository):
             result = await conn.execute(query)
             results = result.all()
             if results:
-                return [DataEntity(**result._mapping) for result in results]
+                return [self.to_entity(result) for result in results]
         return []
 
+    def insert_ignoring_duplicates(self) -> Insert:
+        # the unique content constraint makes duplicate rows a no-op instead of an error;
+        # without it, create and bulk_create look duplicates up in the same transaction
+        dialect_insert = DIALECT_INSERTS[self.engine.dialect.name]
+        return dialect_insert(EntityDataTable).on_conflict_do_nothing()
+
     async def get(self, item_id: PositiveInt) -> Optional[DataEntity]:
-        query = select(EntityDataTable).where(EntityDataTable.c.id == item_id)
+        query = select(*ENTITY_COLUMNS).where(EntityDataTable.c.id == item_id)
         return await self.execute_query_with_one_result(query)
 
     async def create(self, input_data: InputModel) -> DataEntity:
         insert_query = (
-            insert(EntityDataTable)
+            self.insert_ignoring_duplicates()
             .values(**input_data.model_dump())
-            .returning(EntityDataTable.c.id)
+            .returning(*ENTITY_COLUMNS)
         )
-        async with self.engine.begin() as conn:
-            last_record_id = await conn.execute(insert_query)
-            last_record_id = last_record_id.scalar()
-        get_query = select(EntityDataTable).where(
-            EntityDataTable.c.id == last_record_id
+        async with self.database.begin_write() as conn:
+            # without the index nothing makes ON CONFLICT skip a duplicate; concurrent
+            # creates can still both pass until the old rows are fixed and it is added
+            if (
+                not self.database.unique_content
+                and (await conn.execute(self.__exists_query(input_data))).scalar()
+            ):
+                raise DuplicateDataException()
+            result = await conn.execute(insert_query)
+            db_data = result.first()
+            if db_data:
+                await conn.execute(BUMP_DATASET_VERSION)
+        if not db_data:
+            raise DuplicateDataException()
+        return self.to_entity(db_data)
+
+    async def bulk_create(self, input_data: List[InputModel]) -> BulkCreateResult:
+        unique_data = {}
+        duplicates = []
+        for data in input_data:
+            if data.content_key() in unique_data:
+                duplicates.append(data)
+            else:
+                unique_data[data.content_key()] = data
+        if not unique_data:
+            return BulkCreateResult(created=[], duplicates=duplicates)
+
+        content_columns = (
+            EntityDataTable.c.name,
+            EntityDataTable.c.data_type,
+            EntityDataTable.c.count,
+        )
+        existing_query = select(*content_columns).where(
+            tuple_(*content_columns).in_(list(unique_data))
+        )
+        async with self.database.begin_write() as conn:
+            existing = await conn.execute(existing_query)
+            for row in existing:
+                duplicate = unique_data.pop(tuple(row), None)
+                if duplicate is not None:
+                    duplicates.append(duplicate)
+            rows = []
+            if unique_data:
+                insert_query = (
+                    self.insert_ignoring_duplicates()
+                    .values([data.model_dump() for data in unique_data.values()])
+                    .returning(*ENTITY_COLUMNS)
+                )
+                rows = (await conn.execute(insert_query)).all()
+            if rows:
+                await conn.execute(BUMP_DATASET_VERSION)
+        created = sorted(
+            (self.to_entity(row) for row in rows), key=lambda item: item.id
+        )
+        # rows inserted concurrently since the lookup are skipped by ON CONFLICT
+        created_keys = {item.content_key() for item in created}
+        duplicates.extend(
+            data for key, data in unique_data.items() if key not in created_keys
         )
-        new_object = await self.execute_query_with_one_result(get_query)
-        if not new_object:
-            raise ObjectNotFound()
-        return new_object
+        return BulkCreateResult(created=created, duplicates=duplicates)
 
-    async def exists(self, input_data: InputModel) -> bool:
+    @staticmethod
+    def __exists_query(input_data: InputModel) -> Query:
         exists_criteria = (
             select(EntityDataTable.c.id)
             .where(
@@ -110,40 +302,84 @@ class SQLRepository(AbstractRepository):
             )
             .exists()
         )
-        stmt = select(EntityDataTable.c.id).where(exists_criteria)
+        # a bare EXISTS, selecting from the table around it would scan every row
+        return select(exists_criteria)
+
+    async def exists(self, input_data: InputModel) -> bool:
         async with self.engine.begin() as conn:
-            result = await conn.execute(stmt)
-            return result.scalar() or 0
+            result = await conn.execute(self.__exists_query(input_data))
+            return bool(result.scalar())
 
-    async def update(self, item_id: PositiveInt, update_data: InputModel) -> DataEntity:
-        query = (
+    async def update(
+        self,
+        item_id: PositiveInt,
+        update_data: InputModel,
+        expected: Optional[DataEntity] = None,
+    ) -> DataEntity:
+        query = self.__unchanged(
             update(EntityDataTable)
-            .returning(EntityDataTable.c.id)
+            .returning(*ENTITY_COLUMNS)
             .where(EntityDataTable.c.id == item_id)
-            .values(update_data.model_dump(exclude_unset=True))
+            .values(update_data.model_dump(exclude_unset=True)),
+            expected,
         )
-        async with self.engine.begin() as conn:
-            result = await conn.execute(query)
-            item_exists = result.scalar()
-        if item_exists:
-            return await self.get(item_id=item_id)
+        try:
+            async with self.database.begin_write() as conn:
+                result = await conn.execute(query)
+                db_data = result.first()
+                if db_data:
+                    await conn.execute(BUMP_DATASET_VERSION)
+        except IntegrityError as e:
+            raise DuplicateDataException() from e
+        if db_data:
+            return self.to_entity(db_data)
+        if expected is not None:
+            raise PreconditionFailed()
         raise ObjectNotFound()
 
-    async def delete(self, item_id: PositiveInt) -> bool:
-        query = (
+    async def delete(
+        self, item_id: PositiveInt, expected: Optional[DataEntity] = None
+    ) -> bool:
+        query = self.__unchanged(
             delete(EntityDataTable)
             .returning(EntityDataTable.c.id)
-            .where(EntityDataTable.c.id == item_id)
+            .where(EntityDataTable.c.id == item_id),
+            expected,
         )
-        async with self.engine.begin() as conn:
+        async with self.database.begin_write() as conn:
             result = await conn.execute(query)
-            return result.scalar() == item_id
+            is_deleted = result.scalar() == item_id
+            if is_deleted:
+                await conn.execute(BUMP_DATASET_VERSION)
+        if expected is not None and not is_deleted:
+            raise PreconditionFailed()
+        return is_deleted
+
+    async def dataset_version(self) -> Optional[str]:
+        query = select(DatasetVersionTable.c.epoch, DatasetVersionTable.c.version)
+        async with self.engine.connect() as conn:
+            epoch, version = (await conn.execute(query)).one()
+        return f"{epoch:08x}-{version}"
+
+    @staticmethod
+    def __unchanged(query: Query, expected: Optional[DataEntity]) -> Query:
+        # compare-and-swap in one statement, the row must still hold what was read
+        if expected is None:
+            return query
+        return query.where(
+            EntityDataTable.c.name == expected.name,
+            EntityDataTable.c.data_type == expected.data_type,
+            EntityDataTable.c.count == expected.count,
+        )
 
     @staticmethod
-    def __filter_item(query: Query, filters: Filters) -> Query:
+    def __where(query: Query, filters: Filters) -> Query:
         if filters.search_string is not None:
+            # wildcards are escaped so search matches the memory backend substring search
             query = query.where(
-                EntityDataTable.c.name.ilike(f"%{filters.search_string}%")
+                EntityDataTable.c.name.ilike(
+                    f"%{escape_like(filters.search_string)}%", escape="\\"
+                )
             )
         if filters.count_lower_limit is not None:
             query = query.where(EntityDataTable.c.count >= filters.count_lower_limit)
@@ -153,6 +389,36 @@ class SQLRepository(AbstractRepository):
             query = query.where(EntityDataTable.c.data_type == filters.data_type)
         return query
 
+    @classmethod
+    def __filter_item(cls, query: Query, filters: Filters) -> Query:
+        query = cls.__where(query, filters)
+        if filters.after_id is not None:
+            query = query.where(EntityDataTable.c.id > filters.after_id)
+        query = query.order_by(EntityDataTable.c.id)
+        if filters.limit is not None:
+            query = query.limit(filters.limit)
+        return query
+
     async def list(self, filters: Filters) -> List[Optional[DataEntity]]:
-        query = self.__filter_item(query=select(EntityDataTable), filters=filters)
+        query = self.__filter_item(query=select(*ENTITY_COLUMNS), filters=filters)
         return await self.execute_query_with_many_results(query=query)
+
+    async def iter_list(self, filters: Filters) -> AsyncIterator[DataEntity]:
+        query = self.__filter_item(
+            query=select(*ENTITY_COLUMNS), filters=filters
+        ).execution_options(yield_per=STREAM_CHUNK_SIZE)
+        async with self.engine.connect() as conn:
+            result = await conn.stream(query)
+            async for partition in result.partitions():
+                for row in partition:
+                    yield self.to_entity(row)
+
+    async def stats(self, filters: Filters) -> DataStats:
+        # one GROUP BY, answered from the (data_type, count) index when not searching
+        query = self.__where(
+            select(EntityDataTable.c.data_type, EntityDataTable.c.count, func.count()),
+            filters,
+        ).group_by(EntityDataTable.c.data_type, EntityDataTable.c.count)
+        async with self.engine.connect() as conn:
+            rows = (await conn.execute(query)).all()
+        return DataStats.from_rows(rows, filters)
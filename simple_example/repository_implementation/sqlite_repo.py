@@ -0,0 +1,62 @@
+import asyncio
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Optional
+
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncConnection, create_async_engine
+
+from simple_example.repository_implementation.query_statistics import (
+    QueryStatistics,
+    watch_queries,
+)
+from simple_example.repository_implementation.sqlalchemy_repo import Database
+
+
+class SQLiteDatabase(Database):
+    def __init__(self, engine, queries: Optional[QueryStatistics] = None):
+        super().__init__(engine, queries=queries)
+        # SQLite has one writer at a time, writers of this process wait here in order
+        # instead of failing with "database is locked" when busy_timeout runs out
+        self.write_lock = asyncio.Lock()
+
+    @asynccontextmanager
+    async def begin_write(self) -> AsyncIterator[AsyncConnection]:
+        async with self.write_lock:
+            async with self.engine.begin() as conn:
+                yield conn
+
+
+def set_pragmas(
+    engine, synchronous: str, mmap_size: int, cache_size: int, busy_timeout_ms: int
+):
+    pragmas = (
+        "PRAGMA journal_mode=WAL",
+        f"PRAGMA synchronous={synchronous}",
+        f"PRAGMA mmap_size={int(mmap_size)}",
+        f"PRAGMA cache_size={int(cache_size)}",
+        f"PRAGMA busy_timeout={int(busy_timeout_ms)}",
+    )
+
+    # journal_mode is stored in the file, the others only last for the connection
+    @event.listens_for(engine.sync_engine, "connect")
+    def on_connect(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        for pragma in pragmas:
+            cursor.execute(pragma)
+        cursor.close()
+
+
+def setup_sqlite_connection(
+    path: str,
+    synchronous: str = "NORMAL",
+    mmap_size: int = 0,
+    cache_size: int = -2000,
+    busy_timeout_ms: int = 5000,
+    slow_query_ms: Optional[float] = None,
+    **engine_options,
+) -> SQLiteDatabase:
+    engine = create_async_engine(f"sqlite+aiosqlite:///{path}", **engine_options)
+    set_pragmas(engine, synchronous, mmap_size, cache_size, busy_timeout_ms)
+    queries = QueryStatistics(slow_query_ms=slow_query_ms)
+    watch_queries(engine, queries)
+    return SQLiteDatabase(engine, queries=queries)
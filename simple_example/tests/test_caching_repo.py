@@ -0,0 +1,155 @@
+import pytest
+
+from simple_example.domain_logic.consts import DataTypeEnum
+from simple_example.domain_logic.exceptions import PreconditionFailed
+from simple_example.domain_logic.models import DataEntity, Filters, InputModel
+from simple_example.repository_implementation import caching_repo
+from simple_example.repository_implementation.caching_repo import (
+    CachingRepository,
+    RepositoryCache,
+)
+from simple_example.repository_implementation.memory_repo import (
+    Database,
+    MemoryRepository,
+)
+
+
+@pytest.fixture(scope="function")
+def repository():
+    database = Database()
+    for i in range(10):
+        database.add(
+            DataEntity(
+                id=i + 1,
+                name=f"item-{i}",
+                data_type=DataTypeEnum.SIMPLE if i % 2 else DataTypeEnum.COMPLEX,
+                count=i,
+            )
+        )
+    return CachingRepository(
+        MemoryRepository(database=database),
+        cache=RepositoryCache(max_entities=5, max_lists=5, ttl=60),
+    )
+
+
+@pytest.mark.asyncio
+async def test_get_is_cached(repository):
+    first = await repository.get(item_id=1)
+    assert await repository.get(item_id=1) is first
+    assert repository.cache.statistics()["hits"] == 1
+    assert repository.cache.statistics()["misses"] == 1
+
+
+@pytest.mark.asyncio
+async def test_list_key_ignores_search_case(repository):
+    await repository.list(filters=Filters(search_string="ITEM-1"))
+    await repository.list(filters=Filters(search_string="item-1"))
+    assert repository.cache.statistics()["hits"] == 1
+
+
+@pytest.mark.asyncio
+async def test_create_invalidates_only_matching_lists(repository):
+    simple = Filters(data_type=DataTypeEnum.SIMPLE)
+    complex_ = Filters(data_type=DataTypeEnum.COMPLEX)
+    await repository.list(filters=simple)
+    await repository.list(filters=complex_)
+    created = await repository.create(
+        input_data=InputModel(name="new", data_type=DataTypeEnum.SIMPLE, count=0)
+    )
+    assert created in await repository.list(filters=simple)
+    await repository.list(filters=complex_)
+    assert repository.cache.statistics()["hits"] == 1
+
+
+@pytest.mark.asyncio
+async def test_full_page_is_kept_when_new_item_is_after_it(repository):
+    page = Filters(limit=2)
+    await repository.list(filters=page)
+    await repository.create(
+        input_data=InputModel(name="new", data_type=DataTypeEnum.SIMPLE, count=0)
+    )
+    await repository.list(filters=page)
+    assert repository.cache.statistics()["hits"] == 1
+
+
+@pytest.mark.asyncio
+async def test_update_and_delete_invalidate(repository):
+    simple = Filters(data_type=DataTypeEnum.SIMPLE)
+    assert 2 in {item.id for item in await repository.list(filters=simple)}
+    await repository.get(item_id=2)
+    updated = await repository.update(
+        item_id=2,
+        update_data=InputModel(name="moved", data_type=DataTypeEnum.COMPLEX, count=1),
+    )
+    assert await repository.get(item_id=2) == updated
+    assert 2 not in {item.id for item in await repository.list(filters=simple)}
+
+    await repository.delete(item_id=4)
+    assert await repository.get(item_id=4) is None
+    assert 4 not in {item.id for item in await repository.list(filters=simple)}
+
+
+@pytest.mark.asyncio
+async def test_entries_expire(repository, monkeypatch):
+    now = caching_repo.monotonic()
+    await repository.get(item_id=1)
+    monkeypatch.setattr(caching_repo, "monotonic", lambda: now + 61)
+    await repository.get(item_id=1)
+    assert repository.cache.statistics()["misses"] == 2
+
+
+@pytest.mark.asyncio
+async def test_size_is_bounded(repository):
+    for item_id in range(1, 11):
+        await repository.get(item_id=item_id)
+    assert repository.cache.statistics()["entities"] == 5
+
+
+@pytest.mark.asyncio
+async def test_stats_are_cached_until_a_write(repository):
+    stats = await repository.stats(filters=Filters())
+    assert await repository.stats(filters=Filters(limit=3)) is stats
+    await repository.delete(item_id=1)
+    assert (await repository.stats(filters=Filters())).total == stats.total - 1
+    assert repository.cache.statistics()["hits"] == 1
+
+
+@pytest.mark.asyncio
+async def test_failed_conditional_write_drops_the_stale_entry(repository):
+    stale = (await repository.get(item_id=3)).model_copy()
+    # another worker changes the item behind this cache
+    await repository.repository.update(
+        item_id=3,
+        update_data=InputModel(name="moved", data_type=DataTypeEnum.SIMPLE, count=2),
+    )
+    with pytest.raises(PreconditionFailed):
+        await repository.delete(item_id=3, expected=stale)
+    assert 3 not in repository.cache.entities.entries
+
+
+@pytest.mark.asyncio
+async def test_writes_of_other_workers_drop_lists(repository):
+    repository.other_writers = True
+    version = await repository.dataset_version()
+    await repository.list(filters=Filters(limit=3))
+    await repository.stats(filters=Filters())
+    await repository.get(item_id=3)
+    # another worker writes, past this cache
+    await repository.repository.delete(item_id=3)
+    assert await repository.dataset_version() != version
+    assert repository.cache.statistics()["lists"] == 0
+    assert repository.cache.statistics()["stats"] == 0
+    assert [item.id for item in await repository.list(filters=Filters(limit=3))] == [
+        1,
+        2,
+        4,
+    ]
+
+
+@pytest.mark.asyncio
+async def test_own_writes_keep_unaffected_lists(repository):
+    version = await repository.dataset_version()
+    await repository.list(filters=Filters(limit=3))
+    await repository.delete(item_id=10)
+    assert await repository.dataset_version() != version
+    assert repository.cache.statistics()["lists"] == 1
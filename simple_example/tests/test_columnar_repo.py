@@ -0,0 +1,239 @@
+import random
+from typing import Awaitable
+
+import pytest
+
+from simple_example.domain_logic.consts import DataCounterLimits, DataTypeEnum
+from simple_example.domain_logic.exceptions import (
+    DuplicateDataException,
+    ObjectNotFound,
+    PreconditionFailed,
+)
+from simple_example.domain_logic.models import DataEntity, Filters, InputModel
+from simple_example.repository_implementation.columnar_repo import (
+    ColumnarDatabase,
+    ColumnarRepository,
+)
+from simple_example.repository_implementation.memory_repo import (
+    Database,
+    MemoryRepository,
+)
+
+DATA_TYPES = list(DataTypeEnum)
+
+
+@pytest.fixture(scope="function")
+def repository():
+    return ColumnarRepository(database=ColumnarDatabase())
+
+
+@pytest.fixture(scope="function")
+def input_data():
+    return InputModel(
+        name="Pero",
+        data_type=DataTypeEnum.SIMPLE,
+        count=DataCounterLimits.MIN,
+    )
+
+
+@pytest.fixture(scope="function")
+def filled_repository(repository):
+    for i in range(30):
+        repository.database.add(
+            DataEntity(
+                id=i + 1,
+                name=f"item-{i}",
+                data_type=DATA_TYPES[i % len(DATA_TYPES)],
+                count=i,
+            )
+        )
+    return repository
+
+
+@pytest.mark.asyncio
+async def test_create_get_exists(repository, input_data):
+    assert not await repository.exists(input_data=input_data)
+    item = await repository.create(input_data=input_data)
+    assert await repository.exists(input_data=input_data)
+    assert await repository.get(item_id=item.id) == item
+    assert await repository.get(item_id=item.id + 1) is None
+    with pytest.raises(DuplicateDataException):
+        await repository.create(input_data=input_data)
+
+
+@pytest.mark.asyncio
+async def test_update_and_delete(repository, input_data):
+    item = await repository.create(input_data=input_data)
+    other = await repository.create(
+        input_data=input_data.model_copy(update={"name": "Ana"})
+    )
+    with pytest.raises(DuplicateDataException):
+        await repository.update(item_id=other.id, update_data=input_data)
+    with pytest.raises(ObjectNotFound):
+        await repository.update(item_id=99, update_data=input_data)
+
+    changed = input_data.model_copy(update={"name": "Ivo", "count": 5})
+    updated = await repository.update(item_id=item.id, update_data=changed)
+    assert updated == DataEntity(**changed.model_dump(), id=item.id)
+    assert not await repository.exists(input_data=input_data)
+    assert await repository.exists(input_data=changed)
+
+    assert await repository.delete(item_id=item.id)
+    assert not await repository.delete(item_id=item.id)
+    assert not await repository.exists(input_data=changed)
+    assert await repository.list(filters=Filters()) == [other]
+
+
+@pytest.mark.asyncio
+async def test_renames_compact_the_name_tables(filled_repository):
+    database = filled_repository.database
+    for round in range(3):
+        for item_id in range(1, 31):
+            await filled_repository.update(
+                item_id=item_id,
+                update_data=InputModel(
+                    name=f"round-{round}-{item_id}",
+                    data_type=DataTypeEnum.SIMPLE,
+                    count=item_id,
+                ),
+            )
+    assert database.stale_segments <= len(database)
+    assert [
+        item.id for item in await filled_repository.list(Filters(search_string="D-2-1"))
+    ] == [1] + list(range(10, 20))
+    assert await filled_repository.list(Filters(search_string="round-1")) == []
+
+
+@pytest.mark.asyncio
+async def test_deleted_rows_are_compacted(filled_repository):
+    database = filled_repository.database
+    for item_id in range(2, 31, 2):
+        assert await filled_repository.delete(item_id=item_id)
+    # marked, not moved, until they outnumber the live rows
+    assert database.dead_rows == 15
+    assert len(database) == 30
+    assert [item.id for item in await filled_repository.list(Filters(limit=3))] == [
+        1,
+        3,
+        5,
+    ]
+    await filled_repository.delete(item_id=1)
+    assert database.dead_rows == 0
+    assert len(database) == 14
+    assert [item.id for item in await filled_repository.list(Filters())] == list(
+        range(3, 31, 2)
+    )
+    assert await filled_repository.get(item_id=3) is not None
+    assert await filled_repository.get(item_id=2) is None
+
+
+@pytest.mark.asyncio
+async def test_iter_list_tolerates_changes_while_iterating(filled_repository):
+    seen = []
+    async for item in filled_repository.iter_list(filters=Filters()):
+        seen.append(item.id)
+        if item.id == 1:
+            await filled_repository.delete(item_id=2)
+            await filled_repository.create(
+                input_data=InputModel(
+                    name="late", data_type=DataTypeEnum.SIMPLE, count=0
+                )
+            )
+    assert seen == [1] + list(range(3, 31))
+
+
+async def outcome(call: Awaitable):
+    # the result, or the type of the domain exception raised instead
+    try:
+        return await call
+    except (DuplicateDataException, ObjectNotFound) as e:
+        return type(e)
+
+
+@pytest.mark.asyncio
+async def test_matches_memory_repository():
+    # the same random operations on both engines give the same answers
+    rng = random.Random(7)
+    columnar = ColumnarRepository(database=ColumnarDatabase())
+    memory = MemoryRepository(database=Database())
+
+    def random_input() -> InputModel:
+        return InputModel(
+            name=rng.choice(["Pero", "ana", "ANA-ß", "ivo", "šime", ""])
+            + str(rng.randrange(5)),
+            data_type=rng.choice(DATA_TYPES),
+            count=rng.randrange(5),
+        )
+
+    def random_filters() -> Filters:
+        lower = rng.choice([None, 0, 2])
+        upper = rng.choice([None, 1, 3])
+        return Filters(
+            search_string=rng.choice([None, "", "an", "A-SS", "1", "šim", "x"]),
+            data_type=rng.choice([None] + DATA_TYPES),
+            count_lower_limit=lower,
+            count_upper_limit=upper,
+            limit=rng.choice([None, 1, 3]),
+            after_id=rng.choice([None, 1, 10]),
+        )
+
+    for _ in range(500):
+        operation = rng.random()
+        if operation < 0.4:
+            data = random_input()
+            assert await outcome(columnar.create(input_data=data)) == await outcome(
+                memory.create(input_data=data)
+            )
+        elif operation < 0.6:
+            item_id, data = rng.randrange(1, 40), random_input()
+            assert await outcome(
+                columnar.update(item_id=item_id, update_data=data)
+            ) == await outcome(memory.update(item_id=item_id, update_data=data))
+        elif operation < 0.7:
+            item_id = rng.randrange(1, 40)
+            assert await columnar.delete(item_id=item_id) == await memory.delete(
+                item_id=item_id
+            )
+        else:
+            filters = random_filters()
+            assert await columnar.list(filters=filters) == await memory.list(
+                filters=filters
+            )
+            assert await columnar.stats(filters=filters) == await memory.stats(
+                filters=filters
+            )
+            data = random_input()
+            assert await columnar.exists(input_data=data) == await memory.exists(
+                input_data=data
+            )
+
+
+@pytest.mark.asyncio
+async def test_growing_the_slot_table_keeps_one_slot_per_row(filled_repository):
+    database = filled_repository.database
+    assert sorted(item_id for item_id in database.slots if item_id > 0) == list(
+        range(1, 31)
+    )
+    for item_id in range(1, 31):
+        await filled_repository.delete(item_id=item_id)
+    assert not [item_id for item_id in database.slots if item_id > 0]
+    assert not await filled_repository.exists(
+        input_data=InputModel(name="item-3", data_type=DATA_TYPES[0], count=3)
+    )
+
+
+@pytest.mark.asyncio
+async def test_writes_with_expected_item_compare_and_swap(repository, input_data):
+    item = await repository.create(input_data=input_data)
+    version = await repository.dataset_version()
+    changed = input_data.model_copy(update={"name": "Ivo"})
+    updated = await repository.update(
+        item_id=item.id, update_data=changed, expected=item
+    )
+    assert await repository.dataset_version() != version
+    with pytest.raises(PreconditionFailed):
+        await repository.update(item_id=item.id, update_data=input_data, expected=item)
+    with pytest.raises(PreconditionFailed):
+        await repository.delete(item_id=item.id, expected=item)
+    assert await repository.get(item_id=item.id) == updated
+    assert await repository.delete(item_id=item.id, expected=updated)
@@ -0,0 +1,52 @@
+import pytest
+
+from simple_example.domain_logic.manager import DomainLogicManager
+from simple_example.domain_logic.models import Filters
+from simple_example.repository_implementation.memory_repo import (
+    Database,
+    MemoryRepository,
+)
+from simple_example.web_app_example.instrumentation import (
+    Histogram,
+    Instrumented,
+    Metrics,
+    request_spans,
+)
+
+
+def test_histogram_cumulative_counts():
+    histogram = Histogram(buckets=(0.1, 1))
+    for value in (0.05, 0.1, 0.5, 3):
+        histogram.observe(value)
+    assert histogram.cumulative_counts() == [("0.1", 2), ("1", 3), ("+Inf", 4)]
+    assert histogram.count == 4
+    assert histogram.sum == pytest.approx(3.65)
+
+
+def test_prometheus_escapes_labels():
+    metrics = Metrics()
+    metrics.observe_request("GET", 'a"b\\c', 200, 0.01)
+    assert 'route="a\\"b\\\\c"' in metrics.prometheus()
+
+
+@pytest.mark.asyncio
+async def test_instrumented_manager_records_spans():
+    metrics = Metrics()
+    repository = MemoryRepository(database=Database())
+    manager = Instrumented(
+        DomainLogicManager(repository=repository), name="manager", metrics=metrics
+    )
+    assert manager.repository is repository
+    spans = {}
+    token = request_spans.set(spans)
+    try:
+        await manager.list(filters=Filters())
+        await manager.get(item_id=1)
+        await manager.get(item_id=2)
+    finally:
+        request_spans.reset(token)
+    assert {name: calls for name, (_, calls) in spans.items()} == {
+        "manager.list": 1,
+        "manager.get": 2,
+    }
+    assert metrics.spans["manager.get"].count == 2
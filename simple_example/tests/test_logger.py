@@ -0,0 +1,156 @@
+import io
+import logging
+import queue
+
+from simple_example.domain_logic.consts import DataTypeEnum
+from simple_example.domain_logic.models import InputModel
+from simple_example.web_app_example.logger import (
+    AppFormatter,
+    BoundedQueueHandler,
+    ModelDump,
+    Redactor,
+    async_routes,
+    get_standard_logger,
+    start_async_logging,
+    stop_async_logging,
+)
+from simple_example.web_app_example.settings import (
+    LoggingConfiguration,
+    RedactionRule,
+)
+
+
+def test_async_logging_restarts_after_stop(tmp_path):
+    logger = get_standard_logger(
+        name="async-test",
+        log_settings=LoggingConfiguration(
+            LOG_PATH=str(tmp_path),
+            LOG_TO_FILE=True,
+            LOG_SQL=False,
+            LOG_ASYNC=True,
+        ),
+    )
+    try:
+        assert [type(handler) for handler in logger.handlers] == [BoundedQueueHandler]
+        logger.warning("queued %s", "message")
+        stop_async_logging()
+        assert not any(
+            isinstance(handler, BoundedQueueHandler) for handler in logger.handlers
+        )
+        assert "queued message" in (tmp_path / "application.log").read_text()
+        # the next app to start queues the records again
+        start_async_logging()
+        assert [type(handler) for handler in logger.handlers] == [BoundedQueueHandler]
+        logger.warning("queued %s", "again")
+        stop_async_logging()
+        assert "queued again" in (tmp_path / "application.log").read_text()
+    finally:
+        async_routes[:] = [route for route in async_routes if route[0] is not logger]
+        for handler in logger.handlers[:]:
+            logger.removeHandler(handler)
+            handler.close()
+
+
+def test_queued_records_are_merged_by_the_listener():
+    dumped = []
+
+    class Dump:
+        def __str__(self) -> str:
+            dumped.append(True)
+            return "dumped"
+
+    handler = BoundedQueueHandler(queue.Queue(), block=True)
+    record = make_record("data passed: %s", Dump())
+    handler.emit(record)
+    queued = handler.queue.get_nowait()
+    # the caller only enqueued a copy, the listener's handlers merge it
+    assert dumped == []
+    assert queued is not record
+    assert Redactor(LoggingConfiguration().REDACTION_RULES).filter(queued)
+    assert queued.getMessage() == "data passed: dumped"
+    assert record.args is not None
+
+
+def test_full_queue_drops_records():
+    handler = BoundedQueueHandler(queue.Queue(maxsize=1), block=False)
+    for i in range(3):
+        handler.emit(logging.makeLogRecord({"msg": f"record {i}"}))
+    assert handler.queue.qsize() == 1
+    assert handler.queue.get_nowait().getMessage() == "record 0"
+    assert handler.dropped == 2
+
+
+def make_record(msg: str, *args) -> logging.LogRecord:
+    return logging.makeLogRecord({"msg": msg, "args": args, "levelno": logging.INFO})
+
+
+def test_formatter_redacts_credentials():
+    formatter = AppFormatter("%(message)s")
+    record = make_record("connecting to %s", "postgresql://user:secret@db:5432/app")
+    assert formatter.format(record) == "connecting to postgresql:***:***@//db:5432/app"
+
+
+def test_logger_redacts_record_once(tmp_path):
+    calls = []
+
+    class CountingRedactor(Redactor):
+        def redact(self, text: str) -> str:
+            calls.append(text)
+            return super().redact(text)
+
+    redactor = CountingRedactor(LoggingConfiguration().REDACTION_RULES)
+    records = []
+    logger = logging.getLogger("redaction-test")
+    handlers = [logging.Handler(), logging.Handler()]
+    for handler in handlers:
+        handler.addFilter(redactor)
+        handler.emit = records.append
+        logger.addHandler(handler)
+    try:
+        logger.warning("url %s", "sqlite://a:b@host")
+    finally:
+        for handler in handlers:
+            logger.removeHandler(handler)
+    assert [record.getMessage() for record in records] == [
+        "url sqlite:***:***@//host"
+    ] * 2
+    # the second handler gets the record the first one merged and redacted
+    assert calls == ["url sqlite://a:b@host"]
+    # formatters only run the cheap marker check on the redacted message
+    assert AppFormatter("%(message)s", redactor=redactor).format(records[0]) == (
+        "url sqlite:***:***@//host"
+    )
+
+
+def test_redactor_passes_malformed_records_through():
+    redactor = Redactor(LoggingConfiguration().REDACTION_RULES)
+    record = make_record("value %d", "not-a-number")
+    assert redactor.filter(record)
+    assert (record.msg, record.args) == ("value %d", ("not-a-number",))
+    logger = logging.getLogger("malformed-test")
+    stream = io.StringIO()
+    handler = logging.StreamHandler(stream)
+    handler.addFilter(redactor)
+    logger.addHandler(handler)
+    # pytest's capturing handler fails the test on a malformed record
+    logger.propagate = False
+    try:
+        # reported by handleError while formatting, not raised into the caller
+        logger.warning("value %d", "not-a-number")
+    finally:
+        logger.removeHandler(handler)
+    assert stream.getvalue() == ""
+
+
+def test_configured_redaction_rules():
+    redactor = Redactor(
+        [RedactionRule(PATTERN=r"token=\w+", REPLACEMENT="token=***", MARKER="token=")]
+    )
+    assert redactor.redact("GET /?token=abc123&x=1") == "GET /?token=***&x=1"
+    assert redactor.redact("no secrets here") == "no secrets here"
+
+
+def test_model_dump_logs_dict_form():
+    model = InputModel(name="a", data_type=DataTypeEnum.SIMPLE, count=2)
+    record = make_record("data passed: %s", ModelDump(model))
+    assert record.getMessage() == f"data passed: {model.model_dump()}"
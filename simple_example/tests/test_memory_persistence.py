@@ -0,0 +1,183 @@
+import logging
+import os
+
+import pytest
+
+from simple_example.domain_logic.consts import DataTypeEnum
+from simple_example.domain_logic.models import Filters, InputModel
+from simple_example.repository_implementation.memory_persistence import (
+    LOG_FILE,
+    PREVIOUS_LOG_FILE,
+    SNAPSHOT_FILE,
+    PersistentDatabase,
+    WriteLog,
+    read_snapshot,
+)
+from simple_example.repository_implementation.memory_repo import MemoryRepository
+
+
+def input_data(name: str, count: int = 0) -> InputModel:
+    return InputModel(name=name, data_type=DataTypeEnum.COMPLEX, count=count)
+
+
+async def open_repository(path, **options) -> MemoryRepository:
+    database = PersistentDatabase(str(path), **options)
+    await database.connect()
+    return MemoryRepository(database=database)
+
+
+async def write_some(repository: MemoryRepository):
+    first = await repository.create(input_data=input_data("Ana"))
+    second = await repository.create(input_data=input_data("Ivo"))
+    await repository.create(input_data=input_data("Pero"))
+    await repository.update(item_id=first.id, update_data=input_data("Ana", 5))
+    await repository.delete(item_id=second.id)
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("fsync_interval", [0, 0.01])
+async def test_restart_after_shutdown(tmp_path, fsync_interval):
+    repository = await open_repository(tmp_path, fsync_interval=fsync_interval)
+    await write_some(repository)
+    expected = await repository.list(filters=Filters())
+    await repository.database.disconnect()
+    assert os.path.getsize(tmp_path / LOG_FILE) == 0
+
+    repository = await open_repository(tmp_path)
+    assert await repository.list(filters=Filters()) == expected
+    assert await repository.exists(input_data=input_data("Ana", 5))
+    # ids of deleted items are not handed out again
+    assert (await repository.create(input_data=input_data("Iva"))).id == 4
+    await repository.database.disconnect()
+
+
+@pytest.mark.asyncio
+async def test_restart_after_crash_replays_log(tmp_path):
+    repository = await open_repository(tmp_path)
+    await write_some(repository)
+    expected = await repository.list(filters=Filters())
+    # no snapshot, as if the process was killed
+    repository.database.close()
+    assert not os.path.exists(tmp_path / SNAPSHOT_FILE)
+
+    repository = await open_repository(tmp_path)
+    assert await repository.list(filters=Filters()) == expected
+    assert (await repository.create(input_data=input_data("Iva"))).id == 4
+    repository.database.close()
+
+
+def test_log_appends_are_written_by_the_syncer(tmp_path):
+    log = WriteLog(str(tmp_path / LOG_FILE), fsync_interval=3600)
+    log.append(b"first")
+    # nothing reaches the file on the caller's thread
+    assert os.path.getsize(tmp_path / LOG_FILE) == 0
+    assert log.flush()
+    log.append(b"second")
+    # buffered records are covered by the snapshot that truncates the log
+    log.truncate()
+    log.append(b"third")
+    log.close()
+    assert (tmp_path / LOG_FILE).read_bytes() == b"third"
+
+
+@pytest.mark.asyncio
+async def test_torn_log_tail_is_dropped(tmp_path, caplog):
+    repository = await open_repository(tmp_path)
+    await write_some(repository)
+    expected = await repository.list(filters=Filters())
+    repository.database.close()
+    with open(tmp_path / LOG_FILE, "ab") as log:
+        log.write(b"\x01\x02\x03")
+
+    with caplog.at_level(logging.WARNING):
+        repository = await open_repository(tmp_path)
+    assert "dropped 3 bytes" in caplog.text
+    assert await repository.list(filters=Filters()) == expected
+    await repository.create(input_data=input_data("Iva"))
+    expected = await repository.list(filters=Filters())
+    repository.database.close()
+
+    repository = await open_repository(tmp_path)
+    assert await repository.list(filters=Filters()) == expected
+    repository.database.close()
+
+
+@pytest.mark.asyncio
+async def test_snapshot_every_starts_the_log_over(tmp_path):
+    repository = await open_repository(tmp_path, snapshot_every=4)
+    await write_some(repository)
+    assert repository.database.log.records == 1
+    expected = await repository.list(filters=Filters())
+    repository.database.close()
+
+    repository = await open_repository(tmp_path)
+    assert await repository.list(filters=Filters()) == expected
+    repository.database.close()
+
+
+@pytest.mark.asyncio
+async def test_snapshot_is_written_in_the_background(tmp_path):
+    repository = await open_repository(tmp_path, snapshot_every=4)
+    await write_some(repository)
+    database = repository.database
+    database.wait_for_snapshot()
+    assert os.path.getsize(tmp_path / SNAPSHOT_FILE)
+    assert not os.path.exists(tmp_path / PREVIOUS_LOG_FILE)
+    # the fifth write went to the new log, the snapshot has the first four
+    rows = {}
+    assert read_snapshot(str(tmp_path / SNAPSHOT_FILE), rows) == 3
+    complex_type = DataTypeEnum.COMPLEX
+    assert rows == {
+        1: ("Ana", complex_type, 5),
+        2: ("Ivo", complex_type, 0),
+        3: ("Pero", complex_type, 0),
+    }
+    expected = await repository.list(filters=Filters())
+    database.close()
+
+    repository = await open_repository(tmp_path)
+    assert await repository.list(filters=Filters()) == expected
+    repository.database.close()
+
+
+@pytest.mark.asyncio
+async def test_unfinished_background_snapshot_is_folded_on_start(tmp_path):
+    repository = await open_repository(tmp_path)
+    first = await repository.create(input_data=input_data("Ana"))
+    await repository.create(input_data=input_data("Ivo"))
+    repository.database.close()
+    # as if the process died while the snapshot of the previous log was written
+    os.replace(tmp_path / LOG_FILE, tmp_path / PREVIOUS_LOG_FILE)
+    repository = await open_repository(tmp_path)
+    await repository.update(item_id=first.id, update_data=input_data("Ana", 5))
+    expected = await repository.list(filters=Filters())
+    repository.database.close()
+
+    repository = await open_repository(tmp_path)
+    assert not os.path.exists(tmp_path / PREVIOUS_LOG_FILE)
+    assert await repository.list(filters=Filters()) == expected
+    assert await repository.exists(input_data=input_data("Ana", 5))
+    repository.database.close()
+
+
+@pytest.mark.asyncio
+async def test_crash_before_log_truncate_replays_old_records(tmp_path):
+    repository = await open_repository(tmp_path)
+    await write_some(repository)
+    old_log = (tmp_path / LOG_FILE).read_bytes()
+    repository.database.snapshot()
+    expected = await repository.list(filters=Filters())
+    repository.database.close()
+    (tmp_path / LOG_FILE).write_bytes(old_log)
+
+    repository = await open_repository(tmp_path)
+    assert await repository.list(filters=Filters()) == expected
+    repository.database.close()
+
+
+@pytest.mark.asyncio
+async def test_second_process_is_refused(tmp_path):
+    repository = await open_repository(tmp_path)
+    with pytest.raises(RuntimeError, match="used by another process"):
+        await open_repository(tmp_path)
+    await repository.database.disconnect()
@@ -0,0 +1,270 @@
+import pytest
+
+from simple_example.domain_logic.consts import DataCounterLimits, DataTypeEnum
+from simple_example.domain_logic.exceptions import (
+    DuplicateDataException,
+    PreconditionFailed,
+)
+from simple_example.domain_logic.models import (
+    DataEntity,
+    DataStats,
+    Filters,
+    InputModel,
+)
+from simple_example.repository_implementation.memory_repo import (
+    Database,
+    MemoryRepository,
+)
+
+
+@pytest.fixture(scope="function")
+def repository():
+    return MemoryRepository(database=Database())
+
+
+@pytest.fixture(scope="function")
+def input_data():
+    return InputModel(
+        name="Pero",
+        data_type=DataTypeEnum.SIMPLE,
+        count=DataCounterLimits.MIN,
+    )
+
+
+@pytest.mark.asyncio
+async def test_exists_after_create(repository, input_data):
+    assert not await repository.exists(input_data=input_data)
+    await repository.create(input_data=input_data)
+    assert await repository.exists(input_data=input_data)
+
+
+@pytest.mark.asyncio
+async def test_exists_follows_update(repository, input_data):
+    item = await repository.create(input_data=input_data)
+    changed = input_data.model_copy(update={"count": DataCounterLimits.MAX})
+    await repository.update(item_id=item.id, update_data=changed)
+    assert not await repository.exists(input_data=input_data)
+    assert await repository.exists(input_data=changed)
+
+
+@pytest.mark.asyncio
+async def test_exists_after_delete(repository, input_data):
+    item = await repository.create(input_data=input_data)
+    await repository.delete(item_id=item.id)
+    assert not await repository.exists(input_data=input_data)
+
+
+@pytest.mark.asyncio
+async def test_create_after_delete_does_not_reuse_id(repository, input_data):
+    first = await repository.create(input_data=input_data)
+    second = await repository.create(
+        input_data=input_data.model_copy(update={"name": "Ana"})
+    )
+    await repository.delete(item_id=first.id)
+    third = await repository.create(input_data=input_data)
+    assert third.id > second.id
+    assert (await repository.get(item_id=second.id)).name == "Ana"
+
+
+@pytest.fixture(scope="function")
+def filled_repository(repository):
+    for i in range(30):
+        repository.database.add(
+            DataEntity(
+                id=i + 1,
+                name=f"item-{i}",
+                data_type=list(DataTypeEnum)[i % len(DataTypeEnum)],
+                count=i,
+            )
+        )
+    return repository
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize(
+    "filters",
+    [
+        Filters(),
+        Filters(data_type=DataTypeEnum.COMPLEX),
+        Filters(count_lower_limit=10),
+        Filters(count_upper_limit=5),
+        Filters(count_lower_limit=3, count_upper_limit=20),
+        Filters(count_lower_limit=20, count_upper_limit=3),
+        Filters(data_type=DataTypeEnum.SIMPLE, count_lower_limit=12),
+        Filters(search_string="item-1", count_upper_limit=15),
+    ],
+)
+async def test_list_matches_full_scan(filled_repository, filters):
+    items = await filled_repository.list(filters=Filters())
+    expected = [
+        item
+        for item in items
+        if (filters.data_type is None or item.data_type == filters.data_type)
+        and (
+            filters.count_lower_limit is None or item.count >= filters.count_lower_limit
+        )
+        and (
+            filters.count_upper_limit is None or item.count <= filters.count_upper_limit
+        )
+        and (
+            filters.search_string is None
+            or filters.search_string.lower() in item.name.lower()
+        )
+    ]
+    assert await filled_repository.list(filters=filters) == expected
+
+
+@pytest.mark.asyncio
+async def test_list_follows_update(filled_repository):
+    item = await filled_repository.get(item_id=1)
+    await filled_repository.update(
+        item_id=item.id,
+        update_data=InputModel(
+            name=item.name, data_type=DataTypeEnum.ULTRA_SUPRA_COOL, count=99
+        ),
+    )
+    assert item in await filled_repository.list(
+        filters=Filters(data_type=DataTypeEnum.ULTRA_SUPRA_COOL, count_lower_limit=99)
+    )
+    assert item not in await filled_repository.list(
+        filters=Filters(data_type=DataTypeEnum.SIMPLE)
+    )
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("search_string", ["ITEM-2", "em-1", "m-", "2", "xyz", ""])
+async def test_search_is_case_insensitive_substring(filled_repository, search_string):
+    items = await filled_repository.list(filters=Filters())
+    expected = [item for item in items if search_string.lower() in item.name.lower()]
+    assert (
+        await filled_repository.list(filters=Filters(search_string=search_string))
+        == expected
+    )
+
+
+@pytest.mark.asyncio
+async def test_search_follows_update(filled_repository):
+    await filled_repository.update(
+        item_id=1,
+        update_data=InputModel(name="Renamed", data_type=DataTypeEnum.SIMPLE, count=0),
+    )
+    assert [
+        item.id for item in await filled_repository.list(Filters(search_string="nam"))
+    ] == [1]
+    assert await filled_repository.list(Filters(search_string="item-0")) == []
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize(
+    "filters",
+    [Filters(), Filters(data_type=DataTypeEnum.SIMPLE), Filters(search_string="item-")],
+)
+async def test_keyset_pagination_walks_all_items(filled_repository, filters):
+    expected = await filled_repository.list(filters=filters)
+    pages = []
+    after_id = None
+    while True:
+        page = await filled_repository.list(
+            filters=filters.model_copy(update={"limit": 4, "after_id": after_id})
+        )
+        pages.extend(page)
+        if len(page) < 4:
+            break
+        after_id = page[-1].id
+    assert pages == expected
+    assert [item.id for item in pages] == sorted(item.id for item in pages)
+
+
+@pytest.mark.asyncio
+async def test_iter_list_tolerates_changes_while_iterating(filled_repository):
+    seen = []
+    async for item in filled_repository.iter_list(filters=Filters()):
+        seen.append(item.id)
+        if item.id == 1:
+            await filled_repository.delete(item_id=2)
+            await filled_repository.create(
+                input_data=InputModel(
+                    name="late", data_type=DataTypeEnum.SIMPLE, count=0
+                )
+            )
+    # like a database cursor, rows created after the export started are not included
+    assert seen == [1] + list(range(3, 31))
+
+
+@pytest.mark.asyncio
+async def test_create_duplicate_raises(repository, input_data):
+    await repository.create(input_data=input_data)
+    with pytest.raises(DuplicateDataException):
+        await repository.create(input_data=input_data)
+
+
+@pytest.mark.asyncio
+async def test_update_to_duplicate_raises(repository, input_data):
+    await repository.create(input_data=input_data)
+    other = await repository.create(
+        input_data=input_data.model_copy(update={"name": "Ana"})
+    )
+    with pytest.raises(DuplicateDataException):
+        await repository.update(item_id=other.id, update_data=input_data)
+    assert (await repository.update(item_id=other.id, update_data=other)) == other
+
+
+def stats_of(items) -> DataStats:
+    data_types = {data_type.value: 0 for data_type in DataTypeEnum}
+    counts = [0] * (DataCounterLimits.MAX + 1)
+    for item in items:
+        data_types[item.data_type] += 1
+        counts[item.count] += 1
+    return DataStats(total=len(items), data_types=data_types, counts=counts)
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize(
+    "filters",
+    [
+        Filters(),
+        Filters(data_type=DataTypeEnum.COMPLEX),
+        Filters(count_lower_limit=3, count_upper_limit=20),
+        Filters(data_type=DataTypeEnum.SIMPLE, count_lower_limit=12),
+        Filters(search_string="item-1", count_upper_limit=15),
+        # pagination does not apply to stats
+        Filters(limit=2, after_id=5),
+    ],
+)
+async def test_stats_follow_writes(filled_repository, filters):
+    async def expected():
+        return stats_of(await filled_repository.list(filters=filters.unpaged()))
+
+    assert await filled_repository.stats(filters=filters) == await expected()
+    await filled_repository.update(
+        item_id=4,
+        update_data=InputModel(name="item-1x", data_type=DataTypeEnum.SIMPLE, count=14),
+    )
+    await filled_repository.delete(item_id=13)
+    await filled_repository.create(
+        input_data=InputModel(name="item-100", data_type=DataTypeEnum.COMPLEX, count=3)
+    )
+    assert await filled_repository.stats(filters=filters) == await expected()
+
+
+@pytest.mark.asyncio
+async def test_writes_with_expected_item_compare_and_swap(repository, input_data):
+    item = await repository.create(input_data=input_data)
+    read = item.model_copy()
+    version = await repository.dataset_version()
+    changed = input_data.model_copy(update={"count": 5})
+    await repository.update(item_id=item.id, update_data=changed, expected=read)
+    assert await repository.dataset_version() != version
+
+    # the item changed since it was read
+    with pytest.raises(PreconditionFailed):
+        await repository.update(item_id=item.id, update_data=input_data, expected=read)
+    with pytest.raises(PreconditionFailed):
+        await repository.delete(item_id=item.id, expected=read)
+    version = await repository.dataset_version()
+    assert await repository.delete(
+        item_id=item.id, expected=await repository.get(item_id=item.id)
+    )
+    with pytest.raises(PreconditionFailed):
+        await repository.delete(item_id=item.id, expected=read)
+    assert await repository.dataset_version() != version
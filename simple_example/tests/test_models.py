@@ -1,7 +1,12 @@
 import pytest
 
-from simple_example.domain_logic.consts import DataCounterLimits, DataTypeEnum
+from simple_example.domain_logic.consts import (
+    DataCounterLimits,
+    DataTypeEnum,
+    PageLimits,
+)
 from simple_example.domain_logic.models import Filters, InputModel
+from simple_example.web_app_example.settings import DatabasePoolConfiguration
 
 # your models are you contracts,
 # so testing your models ensures you can not just change model without consequences
@@ -26,3 +31,24 @@ def test_input_model_required_attrs_set():
     assert test_data.name == "Pero"
     assert test_data.data_type == DataTypeEnum.ULTRA_SUPRA_COOL
     assert test_data.count == DataCounterLimits.MIN
+
+
+def test_filters_limit():
+    with pytest.raises(ValueError):
+        Filters(limit=0)
+    with pytest.raises(ValueError):
+        Filters(limit=PageLimits.MAX + 1)
+
+
+def test_database_pool_engine_options():
+    pool = DatabasePoolConfiguration(POOL_SIZE=3, STATEMENT_TIMEOUT=5000)
+    options = pool.engine_options("asyncpg")
+    assert options["pool_size"] == 3
+    assert options["connect_args"]["server_settings"] == {"statement_timeout": "5000"}
+    assert pool.engine_options("psycopg")["connect_args"] == {
+        "options": "-c statement_timeout=5000"
+    }
+    disabled = DatabasePoolConfiguration(STATEMENT_CACHE_SIZE=0)
+    assert disabled.connect_args("psycopg") == {"prepare_threshold": None}
+    with pytest.raises(ValueError):
+        DatabasePoolConfiguration(POOL_SIZE=0)
@@ -0,0 +1,76 @@
+import logging
+from types import SimpleNamespace
+
+from sqlalchemy import create_engine, select
+
+from simple_example.repository_implementation.query_statistics import (
+    SQL_LOGGER_NAME,
+    QueryStatistics,
+    statement_shape,
+    watch_queries,
+)
+from simple_example.repository_implementation.sqlalchemy_repo import EntityDataTable
+
+
+def test_statement_shape_collapses_placeholder_lists():
+    assert statement_shape(
+        "SELECT id FROM t WHERE (a, b) IN ((?, ?), (?, ?), (?, ?))"
+    ) == statement_shape("SELECT id FROM t WHERE (a, b) IN ((?, ?))")
+    assert (
+        statement_shape("INSERT INTO t (a, b)\nVALUES ($1, $2), ($3, $4)")
+        == "INSERT INTO t (a, b) VALUES (...)"
+    )
+    assert statement_shape("SELECT id FROM t WHERE a = ?") == (
+        "SELECT id FROM t WHERE a = ?"
+    )
+
+
+def test_statistics_per_shape():
+    queries = QueryStatistics()
+    for i in range(100):
+        queries.observe("SELECT a FROM t WHERE id IN (?, ?)", (i, i), False, i / 1000)
+    queries.observe("SELECT b FROM t", (), False, 10)
+    slowest, shapes = queries.statistics()
+    assert slowest["statement"] == "SELECT b FROM t"
+    assert shapes["statement"] == "SELECT a FROM t WHERE id IN (...)"
+    assert shapes["count"] == 100
+    assert shapes["p50_ms"] == 49
+    assert shapes["p99_ms"] == 98
+    assert shapes["max_ms"] == 99
+
+
+def test_statement_count_is_bounded():
+    queries = QueryStatistics(max_statements=2)
+    for column in "abc":
+        queries.observe(f"SELECT {column} FROM t", (), False, 0.001)
+    assert sorted(item["statement"] for item in queries.statistics()) == [
+        "<other statements>",
+        "SELECT a FROM t",
+        "SELECT b FROM t",
+    ]
+
+
+def test_slow_query_log_redacts_parameters(caplog):
+    queries = QueryStatistics(slow_query_ms=10)
+    with caplog.at_level(logging.WARNING, logger=SQL_LOGGER_NAME):
+        queries.observe("SELECT a FROM t WHERE name = ?", ("secret",), False, 0.001)
+        queries.observe("SELECT a FROM t WHERE name = ?", ("secret",), False, 0.02)
+    assert [record.getMessage() for record in caplog.records] == [
+        "slow query 20.0 ms: SELECT a FROM t WHERE name = ? parameters: ('str',)"
+    ]
+
+
+def test_watch_queries_times_engine_statements():
+    engine = create_engine("sqlite://")
+    queries = QueryStatistics()
+    watch_queries(SimpleNamespace(sync_engine=engine), queries)
+    EntityDataTable.metadata.create_all(engine)
+    with engine.begin() as conn:
+        for _ in range(3):
+            conn.execute(select(EntityDataTable.c.id).where(EntityDataTable.c.id == 1))
+    [select_statistics] = [
+        item
+        for item in queries.statistics()
+        if item["statement"].startswith("SELECT data_model.id")
+    ]
+    assert select_statistics["count"] == 3
@@ -0,0 +1,266 @@
+import asyncio
+import fcntl
+import multiprocessing
+import os
+import platform
+import random
+import signal
+import uuid
+from multiprocessing import shared_memory
+
+import pytest
+
+from simple_example.domain_logic.consts import DataTypeEnum
+from simple_example.domain_logic.exceptions import (
+    DuplicateDataException,
+    ObjectNotFound,
+    StorageFull,
+)
+from simple_example.domain_logic.models import Filters, InputModel
+from simple_example.repository_implementation.columnar_repo import ColumnarRepository
+from simple_example.repository_implementation.memory_repo import (
+    Database,
+    MemoryRepository,
+)
+from simple_example.repository_implementation.shared_repo import (
+    SEQUENCE,
+    SharedMemoryDatabase,
+    translate,
+)
+
+DATA_TYPES = list(DataTypeEnum)
+
+
+def input_data(name: str, count: int = 0) -> InputModel:
+    return InputModel(name=name, data_type=DataTypeEnum.SIMPLE, count=count)
+
+
+@pytest.fixture(scope="function")
+def name():
+    return f"test-{uuid.uuid4().hex[:12]}"
+
+
+@pytest.fixture(scope="function")
+def open_repository(name):
+    databases = []
+
+    def open_repository(**options) -> ColumnarRepository:
+        database = SharedMemoryDatabase(name, **options)
+        database.open()
+        databases.append(database)
+        return ColumnarRepository(database=database)
+
+    yield open_repository
+    for database in databases:
+        database.close()
+    if databases:
+        os.remove(databases[0].lock_path)
+        os.remove(databases[0].workers_path)
+
+
+def create_in_other_process(name: str, names: list, killed: bool = False):
+    async def create():
+        database = SharedMemoryDatabase(name, capacity=16, name_capacity=256)
+        database.open()
+        repository = ColumnarRepository(database=database)
+        for item_name in names:
+            await repository.create(input_data=input_data(item_name))
+        if killed:
+            os.kill(os.getpid(), signal.SIGKILL)
+        database.close()
+
+    asyncio.run(create())
+
+
+@pytest.mark.asyncio
+async def test_workers_see_each_others_writes(open_repository, name):
+    first = open_repository(capacity=16, name_capacity=256)
+    second = open_repository(capacity=16, name_capacity=256)
+    item = await first.create(input_data=input_data("Ana"))
+    assert await second.get(item_id=item.id) == item
+    with pytest.raises(DuplicateDataException):
+        await second.create(input_data=input_data("Ana"))
+    assert (await second.create(input_data=input_data("Ivo"))).id == item.id + 1
+
+    await second.update(item_id=item.id, update_data=input_data("Pero", 3))
+    assert await first.list(filters=Filters(search_string="pe")) == [
+        await second.get(item_id=item.id)
+    ]
+    assert await first.delete(item_id=item.id)
+    assert await second.get(item_id=item.id) is None
+
+    first.database.close()
+    second.database.close()
+    # the last worker to detach removes the segment
+    with pytest.raises(FileNotFoundError):
+        shared_memory.SharedMemory(name)
+
+
+@pytest.mark.asyncio
+async def test_segment_outlives_the_processes_that_write_to_it(open_repository, name):
+    repository = open_repository(capacity=16, name_capacity=256)
+    context = multiprocessing.get_context("spawn")
+    for names in (["Ana", "Ivo"], ["Pero"]):
+        process = context.Process(target=create_in_other_process, args=(name, names))
+        process.start()
+        process.join()
+        assert process.exitcode == 0
+    assert [item.name for item in await repository.list(filters=Filters())] == [
+        "Ana",
+        "Ivo",
+        "Pero",
+    ]
+
+
+@pytest.mark.asyncio
+async def test_next_start_replaces_the_segment_of_killed_workers(open_repository, name):
+    context = multiprocessing.get_context("spawn")
+    process = context.Process(
+        target=create_in_other_process, args=(name, ["Ana"], True)
+    )
+    process.start()
+    process.join()
+    assert process.exitcode == -signal.SIGKILL
+    # the segment stayed behind without a worker attached to it
+    repository = open_repository(capacity=16, name_capacity=256)
+    assert await repository.list(filters=Filters()) == []
+    assert (await repository.create(input_data=input_data("Ana"))).id == 1
+
+
+@pytest.mark.asyncio
+async def test_deleted_rows_and_old_names_are_reclaimed(open_repository):
+    repository = open_repository(capacity=4, name_capacity=32)
+    items = [
+        await repository.create(input_data=input_data(f"item-{i}")) for i in range(4)
+    ]
+    with pytest.raises(StorageFull):
+        await repository.create(input_data=input_data("item-4"))
+    # renames append to the name table until a compaction packs it again
+    for count in range(10):
+        await repository.update(
+            item_id=items[0].id, update_data=input_data(f"new-{count}", count)
+        )
+    await repository.delete(item_id=items[1].id)
+    created = await repository.create(input_data=input_data("item-4"))
+    assert created.id == 5
+    assert [item.id for item in await repository.list(filters=Filters())] == [
+        1,
+        3,
+        4,
+        5,
+    ]
+    assert [
+        item.name for item in await repository.list(Filters(search_string="-9"))
+    ] == ["new-9"]
+    assert await repository.exists(input_data=input_data("new-9", 9))
+    assert not await repository.exists(input_data=input_data("item-1"))
+
+
+@pytest.mark.asyncio
+async def test_reads_retry_while_a_write_is_in_progress(open_repository):
+    repository = open_repository(capacity=4, name_capacity=16)
+    database = repository.database
+    calls = []
+
+    def read():
+        calls.append(database.header[SEQUENCE])
+        if len(calls) == 1:
+            # a writer in another process starts and finishes during this read
+            database.header[SEQUENCE] += 2
+        return len(calls)
+
+    assert await database.read(read) == 2
+
+
+@pytest.mark.asyncio
+async def test_writes_wait_for_the_lock_without_blocking(open_repository):
+    repository = open_repository(capacity=4, name_capacity=16)
+    # another open file description conflicts like another process would
+    with open(repository.database.lock_path) as other:
+        fcntl.flock(other, fcntl.LOCK_EX)
+        create = asyncio.create_task(repository.create(input_data=input_data("Ana")))
+        await asyncio.sleep(0.05)
+        # the event loop kept running while the write waited
+        assert not create.done()
+        fcntl.flock(other, fcntl.LOCK_UN)
+        assert (await create).name == "Ana"
+
+
+def test_translate_matches_bytes_translate():
+    column = bytes(range(256)) * 3
+    table = bytes(random.Random(1).randrange(2) for _ in range(256))
+    assert translate(memoryview(column), table) == column.translate(table)
+
+
+def test_other_layout_is_refused(open_repository, name):
+    open_repository(capacity=4, name_capacity=16)
+    with pytest.raises(RuntimeError, match="another layout"):
+        SharedMemoryDatabase(name, capacity=2, name_capacity=16).open()
+
+
+def test_other_architectures_are_refused(name, monkeypatch):
+    monkeypatch.setattr(platform, "machine", lambda: "aarch64")
+    with pytest.raises(RuntimeError, match="x86-64"):
+        SharedMemoryDatabase(name).open()
+
+
+@pytest.mark.asyncio
+async def test_matches_memory_repository(open_repository):
+    # random operations with little room, so compactions run between them
+    rng = random.Random(11)
+    shared = open_repository(capacity=160, name_capacity=1280)
+    memory = MemoryRepository(database=Database())
+
+    def random_input() -> InputModel:
+        return InputModel(
+            name=rng.choice(["Pero", "ana", "ANA-ß", "ivo", "šime", ""])
+            + str(rng.randrange(5)),
+            data_type=rng.choice(DATA_TYPES),
+            count=rng.randrange(5),
+        )
+
+    for _ in range(1000):
+        operation = rng.random()
+        # ids of existing and deleted rows, and the next one
+        random_id = rng.randrange(1, memory.database.last_id + 2)
+        if operation < 0.35:
+            data = random_input()
+            results = []
+            for repository in (shared, memory):
+                try:
+                    results.append(await repository.create(input_data=data))
+                except DuplicateDataException:
+                    results.append("duplicate")
+            assert results[0] == results[1]
+        elif operation < 0.55:
+            item_id, data = random_id, random_input()
+            results = []
+            for repository in (shared, memory):
+                try:
+                    item = await repository.update(item_id=item_id, update_data=data)
+                    results.append(item.model_dump())
+                except (DuplicateDataException, ObjectNotFound) as e:
+                    results.append(type(e))
+            assert results[0] == results[1]
+        elif operation < 0.8:
+            assert await shared.delete(item_id=random_id) == await memory.delete(
+                item_id=random_id
+            )
+        else:
+            filters = Filters(
+                search_string=rng.choice([None, "an", "A-SS", "1", "šim"]),
+                data_type=rng.choice([None] + DATA_TYPES),
+                count_lower_limit=rng.choice([None, 0, 2]),
+                count_upper_limit=rng.choice([None, 1, 3]),
+                after_id=rng.choice([None, 10]),
+            )
+            assert await shared.list(filters=filters) == await memory.list(
+                filters=filters
+            )
+            assert await shared.stats(filters=filters) == await memory.stats(
+                filters=filters
+            )
+            data = random_input()
+            assert await shared.exists(input_data=data) == await memory.exists(
+                input_data=data
+            )
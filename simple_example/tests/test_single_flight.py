@@ -0,0 +1,104 @@
+import asyncio
+
+import pytest
+
+from simple_example.domain_logic.manager import DomainLogicManager
+from simple_example.domain_logic.models import DataEntity, Filters
+from simple_example.domain_logic.single_flight import SingleFlight
+from simple_example.repository_implementation.memory_repo import (
+    Database,
+    MemoryRepository,
+)
+
+
+class SlowRepository(MemoryRepository):
+    def __init__(self, database: Database):
+        super().__init__(database=database)
+        self.calls = 0
+        self.release = asyncio.Event()
+
+    async def get(self, item_id):
+        self.calls += 1
+        await self.release.wait()
+        return await super().get(item_id=item_id)
+
+    async def list(self, filters):
+        self.calls += 1
+        await self.release.wait()
+        if filters.search_string == "fail":
+            raise RuntimeError("query failed")
+        return await super().list(filters=filters)
+
+
+@pytest.fixture(scope="function")
+def manager():
+    database = Database()
+    database.add(DataEntity(id=1, name="Pero", data_type=1, count=1))
+    return DomainLogicManager(
+        repository=SlowRepository(database=database), single_flight=SingleFlight()
+    )
+
+
+async def burst(manager, calls):
+    tasks = [asyncio.ensure_future(call()) for call in calls]
+    await asyncio.sleep(0)
+    manager.repository.release.set()
+    return await asyncio.gather(*tasks, return_exceptions=True)
+
+
+@pytest.mark.asyncio
+async def test_identical_calls_share_one_query(manager):
+    results = await burst(
+        manager,
+        [lambda: manager.get(item_id=1)] * 20
+        + [lambda: manager.list(filters=Filters(search_string="PERO"))] * 10
+        + [lambda: manager.list(filters=Filters(search_string="pero"))] * 10,
+    )
+    assert manager.repository.calls == 2
+    assert all(result.id == 1 for result in results[:20])
+    assert all(result == results[20] for result in results[20:])
+
+
+@pytest.mark.asyncio
+async def test_errors_reach_every_caller(manager):
+    results = await burst(
+        manager, [lambda: manager.list(filters=Filters(search_string="fail"))] * 5
+    )
+    assert manager.repository.calls == 1
+    assert all(isinstance(result, RuntimeError) for result in results)
+    assert manager.single_flight.calls == {}
+
+
+@pytest.mark.asyncio
+async def test_cancelled_caller_does_not_cancel_others(manager):
+    first = asyncio.ensure_future(manager.get(item_id=1))
+    second = asyncio.ensure_future(manager.get(item_id=1))
+    await asyncio.sleep(0)
+    first.cancel()
+    await asyncio.sleep(0)
+    manager.repository.release.set()
+    assert (await second).id == 1
+    assert first.cancelled()
+    assert manager.repository.calls == 1
+
+
+@pytest.mark.asyncio
+async def test_query_is_cancelled_with_last_caller(manager):
+    only = asyncio.ensure_future(manager.get(item_id=1))
+    await asyncio.sleep(0)
+    only.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await only
+    assert manager.single_flight.calls == {}
+
+
+@pytest.mark.asyncio
+async def test_reads_after_write_do_not_join_older_calls(manager):
+    before = asyncio.ensure_future(manager.get(item_id=1))
+    await asyncio.sleep(0)
+    await manager.delete(item_id=1)
+    after = asyncio.ensure_future(manager.get(item_id=1))
+    await asyncio.sleep(0)
+    manager.repository.release.set()
+    await asyncio.gather(before, after)
+    assert manager.repository.calls == 2
@@ -0,0 +1,251 @@
+import logging
+
+import pytest
+from sqlalchemy import create_engine, inspect, select, text
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from simple_example.domain_logic.consts import DataTypeEnum
+from simple_example.domain_logic.exceptions import (
+    DuplicateDataException,
+    PreconditionFailed,
+)
+from simple_example.domain_logic.models import (
+    DataEntity,
+    Filters,
+    InputModel,
+    trusted_entity,
+    validated_entity,
+)
+from simple_example.repository_implementation.memory_repo import (
+    Database as MemoryDatabase,
+)
+from simple_example.repository_implementation.memory_repo import MemoryRepository
+from simple_example.repository_implementation.query_statistics import SQL_LOGGER_NAME
+from simple_example.repository_implementation.sqlalchemy_repo import (
+    ENTITY_COLUMNS,
+    Database,
+    EntityDataTable,
+    SQLRepository,
+    escape_like,
+)
+
+
+def test_escape_like():
+    assert escape_like("50%_off\\") == "50\\%\\_off\\\\"
+
+
+def test_escape_like_plain_string():
+    assert escape_like("Pero") == "Pero"
+
+
+@pytest.fixture(scope="function")
+def row():
+    engine = create_engine("sqlite://")
+    EntityDataTable.metadata.create_all(engine)
+    with engine.begin() as conn:
+        conn.execute(
+            EntityDataTable.insert().values(
+                name="Pero", data_type=DataTypeEnum.COMPLEX, count=7
+            )
+        )
+        return conn.execute(select(*ENTITY_COLUMNS)).first()
+
+
+@pytest.mark.parametrize("to_entity", [validated_entity, trusted_entity])
+def test_row_to_entity(row, to_entity):
+    expected = DataEntity(id=1, name="Pero", data_type=DataTypeEnum.COMPLEX, count=7)
+    item = to_entity(row)
+    assert item == expected
+    assert item.model_dump_json() == expected.model_dump_json()
+    assert item.model_copy(update={"count": 8}).count == 8
+
+
+LEGACY_TABLE_DDL = (
+    "CREATE TABLE data_model (id INTEGER PRIMARY KEY, name VARCHAR NOT NULL, "
+    "data_type INTEGER NOT NULL, count INTEGER NOT NULL)"
+)
+
+
+@pytest.mark.asyncio
+async def test_connect_adds_indexes_to_existing_table(tmp_path, caplog):
+    pytest.importorskip("aiosqlite")
+    engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path}/legacy.db")
+    async with engine.begin() as conn:
+        await conn.execute(text(LEGACY_TABLE_DDL))
+        # duplicates from before the unique index existed
+        for _ in range(2):
+            await conn.execute(
+                text(
+                    "INSERT INTO data_model (name, data_type, count) VALUES ('a', 1, 1)"
+                )
+            )
+    database = Database(engine)
+    with caplog.at_level(logging.WARNING, logger=SQL_LOGGER_NAME):
+        await database.connect()
+        await database.connect()
+
+    async with engine.connect() as conn:
+        indexes = await conn.run_sync(
+            lambda sync_conn: inspect(sync_conn).get_indexes("data_model")
+        )
+    await database.disconnect()
+    assert [index["name"] for index in indexes] == ["ix_data_model_data_type_count"]
+    assert [record.getMessage().split(",")[0] for record in caplog.records] == [
+        "index uq_data_model_content not created"
+    ] * 2
+    assert database.missing_indexes == {"uq_data_model_content"}
+    assert not database.unique_content
+
+
+@pytest.mark.asyncio
+async def test_exists(tmp_path):
+    pytest.importorskip("aiosqlite")
+    database = Database(create_async_engine(f"sqlite+aiosqlite:///{tmp_path}/db.db"))
+    await database.connect()
+    repository = SQLRepository(database=database)
+    stored = InputModel(name="stored", data_type=DataTypeEnum.SIMPLE, count=1)
+    await repository.create(input_data=stored)
+    await repository.create(input_data=stored.model_copy(update={"name": "other"}))
+
+    assert await repository.exists(input_data=stored) is True
+    assert (
+        await repository.exists(input_data=stored.model_copy(update={"count": 2}))
+        is False
+    )
+    await database.disconnect()
+
+
+@pytest.mark.asyncio
+async def test_stats_match_memory_repository(tmp_path):
+    pytest.importorskip("aiosqlite")
+    database = Database(create_async_engine(f"sqlite+aiosqlite:///{tmp_path}/db.db"))
+    await database.connect()
+    repository = SQLRepository(database=database)
+    memory = MemoryRepository(database=MemoryDatabase())
+    for i in range(30):
+        data = InputModel(
+            name=f"item-{i}",
+            data_type=list(DataTypeEnum)[i % len(DataTypeEnum)],
+            count=i % 7,
+        )
+        await repository.create(input_data=data)
+        await memory.create(input_data=data)
+    for filters in (
+        Filters(),
+        Filters(data_type=DataTypeEnum.COMPLEX, count_lower_limit=2),
+        Filters(search_string="M-1", count_upper_limit=4),
+    ):
+        assert await repository.stats(filters=filters) == await memory.stats(
+            filters=filters
+        )
+    await database.disconnect()
+
+
+@pytest.mark.asyncio
+async def test_writes_with_expected_item_compare_and_swap(tmp_path):
+    pytest.importorskip("aiosqlite")
+    database = Database(create_async_engine(f"sqlite+aiosqlite:///{tmp_path}/db.db"))
+    await database.connect()
+    repository = SQLRepository(database=database)
+    data = InputModel(name="stored", data_type=DataTypeEnum.SIMPLE, count=1)
+    item = await repository.create(input_data=data)
+    version = await repository.dataset_version()
+    updated = await repository.update(
+        item_id=item.id, update_data=data.model_copy(update={"count": 2}), expected=item
+    )
+    assert updated.count == 2
+    assert await repository.dataset_version() != version
+    version = await repository.dataset_version()
+    # the row no longer holds what was read
+    with pytest.raises(PreconditionFailed):
+        await repository.update(item_id=item.id, update_data=data, expected=item)
+    with pytest.raises(PreconditionFailed):
+        await repository.delete(item_id=item.id, expected=item)
+    assert await repository.dataset_version() == version
+    assert await repository.get(item_id=item.id) == updated
+    assert await repository.delete(item_id=item.id, expected=updated)
+    with pytest.raises(PreconditionFailed):
+        await repository.delete(item_id=item.id, expected=updated)
+    assert await repository.dataset_version() != version
+    await database.disconnect()
+
+
+@pytest.mark.asyncio
+async def test_dataset_version_moves_with_writes_of_any_connection(tmp_path):
+    pytest.importorskip("aiosqlite")
+    url = f"sqlite+aiosqlite:///{tmp_path}/db.db"
+    first = Database(create_async_engine(url))
+    second = Database(create_async_engine(url))
+    await first.connect()
+    await second.connect()
+    data = InputModel(name="stored", data_type=DataTypeEnum.SIMPLE, count=1)
+    version = await SQLRepository(database=first).dataset_version()
+    created = await SQLRepository(database=second).bulk_create(input_data=[data])
+    assert len(created.created) == 1
+    assert await SQLRepository(database=first).dataset_version() != version
+    version = await SQLRepository(database=first).dataset_version()
+    # a duplicate changes nothing
+    with pytest.raises(DuplicateDataException):
+        await SQLRepository(database=second).create(input_data=data)
+    assert await SQLRepository(database=first).dataset_version() == version
+    await first.disconnect()
+    await second.disconnect()
+
+
+@pytest.mark.asyncio
+async def test_connect_records_no_missing_indexes(tmp_path):
+    pytest.importorskip("aiosqlite")
+    database = Database(create_async_engine(f"sqlite+aiosqlite:///{tmp_path}/db.db"))
+    await database.connect()
+    await database.disconnect()
+    assert database.missing_indexes == set()
+    assert database.unique_content
+
+
+async def repository_without_content_index(tmp_path) -> SQLRepository:
+    engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path}/legacy.db")
+    async with engine.begin() as conn:
+        await conn.execute(text(LEGACY_TABLE_DDL))
+        # old duplicates keep connect from adding the unique index
+        for name in ("a", "a", "b"):
+            await conn.execute(
+                text(
+                    "INSERT INTO data_model (name, data_type, count) "
+                    f"VALUES ('{name}', 1, 1)"
+                )
+            )
+    database = Database(engine)
+    await database.connect()
+    assert not database.unique_content
+    return SQLRepository(database=database)
+
+
+@pytest.mark.asyncio
+async def test_create_rejects_duplicates_without_content_index(tmp_path):
+    pytest.importorskip("aiosqlite")
+    repository = await repository_without_content_index(tmp_path)
+    with pytest.raises(DuplicateDataException):
+        await repository.create(
+            input_data=InputModel(name="b", data_type=DataTypeEnum.SIMPLE, count=1)
+        )
+    data = InputModel(name="c", data_type=DataTypeEnum.SIMPLE, count=1)
+    created = await repository.create(input_data=data)
+    assert created.id == 4
+    with pytest.raises(DuplicateDataException):
+        await repository.create(input_data=data)
+    await repository.database.disconnect()
+
+
+@pytest.mark.asyncio
+async def test_bulk_create_reports_duplicates_without_content_index(tmp_path):
+    pytest.importorskip("aiosqlite")
+    repository = await repository_without_content_index(tmp_path)
+    stored = InputModel(name="b", data_type=DataTypeEnum.SIMPLE, count=1)
+    new = InputModel(name="c", data_type=DataTypeEnum.SIMPLE, count=1)
+    result = await repository.bulk_create(input_data=[stored, new, new])
+    assert [item.name for item in result.created] == ["c"]
+    assert result.duplicates == [new, stored]
+    result = await repository.bulk_create(input_data=[new])
+    assert result.created == []
+    assert result.duplicates == [new]
+    await repository.database.disconnect()
@@ -0,0 +1,60 @@
+import asyncio
+
+import pytest
+import pytest_asyncio
+from sqlalchemy import text
+
+from simple_example.domain_logic.consts import DataTypeEnum
+from simple_example.domain_logic.models import InputModel
+from simple_example.repository_implementation.sqlalchemy_repo import SQLRepository
+from simple_example.repository_implementation.sqlite_repo import (
+    setup_sqlite_connection,
+)
+
+pytest.importorskip("aiosqlite")
+
+
+@pytest_asyncio.fixture(scope="function")
+async def database(tmp_path):
+    database = setup_sqlite_connection(
+        str(tmp_path / "data.db"), mmap_size=1024 * 1024, cache_size=-1000
+    )
+    await database.connect()
+    yield database
+    await database.disconnect()
+
+
+@pytest.mark.asyncio
+async def test_pragmas(database):
+    async with database.engine.connect() as conn:
+        pragmas = {
+            pragma: (await conn.execute(text(f"PRAGMA {pragma}"))).scalar()
+            for pragma in ("journal_mode", "synchronous", "mmap_size", "cache_size")
+        }
+    # synchronous NORMAL is 1
+    assert pragmas == {
+        "journal_mode": "wal",
+        "synchronous": 1,
+        "mmap_size": 1024 * 1024,
+        "cache_size": -1000,
+    }
+
+
+@pytest.mark.asyncio
+async def test_concurrent_writes(database):
+    repository = SQLRepository(database=database)
+    items = await asyncio.gather(
+        *(
+            repository.create(
+                input_data=InputModel(
+                    name=f"item-{i}", data_type=DataTypeEnum.SIMPLE, count=i
+                )
+            )
+            for i in range(50)
+        )
+    )
+    assert sorted(item.id for item in items) == list(range(1, 51))
+    deleted = await asyncio.gather(
+        *(repository.delete(item_id=item.id) for item in items)
+    )
+    assert all(deleted)
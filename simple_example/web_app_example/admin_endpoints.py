@@ -0,0 +1,33 @@
+from fastapi import APIRouter, Depends
+
+from simple_example.web_app_example.dependencies import (
+    get_database,
+    get_repository_cache,
+    get_single_flight,
+)
+
+admin_router = APIRouter(prefix="/admin")
+
+
+@admin_router.get("/pool")
+async def pool_status(database=Depends(get_database)):
+    return database.pool_status()
+
+
+@admin_router.get("/cache")
+async def cache_statistics(repository_cache=Depends(get_repository_cache)):
+    if repository_cache is None:
+        return {"enabled": False}
+    return {"enabled": True, **repository_cache.statistics()}
+
+
+@admin_router.get("/single-flight")
+async def single_flight_statistics(single_flight=Depends(get_single_flight)):
+    if single_flight is None:
+        return {"enabled": False}
+    return {"enabled": True, **single_flight.statistics()}
+
+
+@admin_router.get("/queries")
+async def query_statistics(database=Depends(get_database)):
+    return database.query_statistics()
@@ -1,16 +1,64 @@
+import time
+from contextlib import asynccontextmanager
 from typing import Optional
 
 from fastapi import FastAPI, Request
 from fastapi.responses import JSONResponse, RedirectResponse
 from pydantic import ValidationError
+
 from simple_example.domain_logic.exceptions import (
     DuplicateDataException,
     ObjectNotFound,
+    PreconditionFailed,
+    StorageFull,
+)
+from simple_example.repository_implementation.sqlalchemy_repo import (
+    Database as SQLDatabase,
 )
-from simple_example.web_app_example.db_initialize import set_database
 from simple_example.web_app_example import application_globals
+from simple_example.web_app_example.admin_endpoints import admin_router
+from simple_example.web_app_example.db_initialize import (
+    create_database,
+    create_manager,
+    create_repository,
+)
 from simple_example.web_app_example.endpoints import main_router
+from simple_example.web_app_example.health_endpoints import health_router
+from simple_example.web_app_example.instrumentation import (
+    InstrumentationMiddleware,
+    Instrumented,
+    Metrics,
+    instrument_engine,
+)
+from simple_example.web_app_example.logger import (
+    start_async_logging,
+    stop_async_logging,
+)
+from simple_example.web_app_example.metrics_endpoints import metrics_router
 from simple_example.web_app_example.settings import Settings, get_settings
+from simple_example.web_app_example.warmup import warm_up
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    settings = app.state.settings
+    start_async_logging()
+    await app.state.database.connect()
+    if settings.WARMUP:
+        start = time.perf_counter()
+        await warm_up(
+            app,
+            app.state.repository,
+            connections=settings.DATABASE_POOL.WARMUP_CONNECTIONS,
+        )
+        application_globals.logger.info(
+            "Warm-up done in %.1f ms.", (time.perf_counter() - start) * 1000
+        )
+    app.state.ready = True
+    yield
+    app.state.ready = False
+    await app.state.database.disconnect()
+    stop_async_logging()
 
 
 def app_setup(settings: Optional[Settings] = None):
@@ -18,7 +66,8 @@ def app_setup(settings: Optional[Settings] = None):
 
     application_globals.init_app_globals(settings=settings)
 
-    app = FastAPI()
+    app = FastAPI(lifespan=lifespan)
+    app.state.ready = False
 
     @app.exception_handler(DuplicateDataException)
     async def duplicate_exception_handler(
@@ -30,21 +79,45 @@ def app_setup(settings: Optional[Settings] = None):
     async def not_found_exception_handler(request: Request, exc: ObjectNotFound):
         return JSONResponse(status_code=400, content={"message": f"{exc.message}"})
 
+    @app.exception_handler(PreconditionFailed)
+    async def precondition_failed_exception_handler(
+        request: Request, exc: PreconditionFailed
+    ):
+        return JSONResponse(status_code=412, content={"message": f"{exc.message}"})
+
+    @app.exception_handler(StorageFull)
+    async def storage_full_exception_handler(request: Request, exc: StorageFull):
+        return JSONResponse(status_code=507, content={"message": f"{exc.message}"})
+
     @app.exception_handler(ValidationError)
     async def validation_exception_handler(request: Request, exc: ValidationError):
         return JSONResponse(status_code=400, content={"detail": exc.errors()})
 
     app.include_router(main_router, prefix=settings.API_PREFIX)
-    set_database(settings)
-    from simple_example.web_app_example.db_initialize import database  # noqa
-
-    @app.on_event("startup")
-    async def startup():
-        await database.connect()
-
-    @app.on_event("shutdown")
-    async def shutdown():
-        await database.disconnect()
+    app.include_router(admin_router, prefix=settings.API_PREFIX)
+    app.include_router(health_router)
+    app.state.settings = settings
+    app.state.database = create_database(settings)
+    app.state.repository = create_repository(settings, app.state.database)
+    app.state.manager = create_manager(settings, app.state.repository)
+    if settings.INSTRUMENTATION:
+        app.state.metrics = Metrics()
+        app.state.manager = Instrumented(
+            app.state.manager, name="manager", metrics=app.state.metrics
+        )
+        if isinstance(app.state.database, SQLDatabase):
+            instrument_engine(app.state.database.engine, app.state.metrics)
+        app.add_middleware(
+            InstrumentationMiddleware,
+            metrics=app.state.metrics,
+            server_timing=settings.SERVER_TIMING,
+            route_prefixes={
+                id(route): settings.API_PREFIX
+                for router in (main_router, admin_router)
+                for route in router.routes
+            },
+        )
+        app.include_router(metrics_router)
 
     @app.get("/")
     async def root():
@@ -1,13 +1,152 @@
-from simple_example.repository_implementation.memory_repo import Database
-from simple_example.repository_implementation.sqlalchemy_repo import setup_db_connection
-from simple_example.web_app_example.settings import Settings
+from typing import Any, Callable, Dict, NamedTuple
 
-database = None
+from simple_example.domain_logic.manager import DomainLogicManager
+from simple_example.domain_logic.repository import AbstractRepository
+from simple_example.domain_logic.single_flight import SingleFlight
+from simple_example.repository_implementation.caching_repo import (
+    CachingRepository,
+    RepositoryCache,
+)
+from simple_example.repository_implementation.columnar_repo import (
+    ColumnarDatabase,
+    ColumnarRepository,
+)
+from simple_example.repository_implementation.memory_persistence import (
+    PersistentDatabase,
+)
+from simple_example.repository_implementation.memory_repo import (
+    Database,
+    MemoryRepository,
+)
+from simple_example.repository_implementation.shared_repo import (
+    SharedMemoryDatabase,
+)
+from simple_example.repository_implementation.sqlalchemy_repo import (
+    Database as SQLDatabase,
+)
+from simple_example.repository_implementation.sqlalchemy_repo import (
+    SQLRepository,
+    setup_db_connection,
+)
+from simple_example.repository_implementation.sqlite_repo import (
+    SQLiteDatabase,
+    setup_sqlite_connection,
+)
+from simple_example.web_app_example.settings import DatabaseBackend, Settings
 
+# built once per process by app_setup and kept on app.state
 
-def set_database(database_settings: Settings):
-    global database
-    if database_settings.USE_DATABASE:
-        database = setup_db_connection(database_settings.DATABASE_URL)
-    else:
-        database = Database()
+
+class Backend(NamedTuple):
+    create_database: Callable[[Settings], Any]
+    create_repository: Callable[[Settings, Any], AbstractRepository]
+
+
+def create_memory_database(database_settings: Settings) -> Database:
+    persistence = database_settings.MEMORY_PERSISTENCE
+    if persistence.PATH:
+        return PersistentDatabase(
+            persistence.PATH,
+            fsync_interval=persistence.FSYNC_INTERVAL_MS / 1000,
+            snapshot_every=persistence.SNAPSHOT_EVERY,
+        )
+    return Database()
+
+
+def create_memory_repository(database_settings: Settings, database) -> MemoryRepository:
+    return MemoryRepository(database)
+
+
+def create_columnar_database(database_settings: Settings) -> ColumnarDatabase:
+    return ColumnarDatabase()
+
+
+def create_columnar_repository(
+    database_settings: Settings, database
+) -> ColumnarRepository:
+    return ColumnarRepository(database)
+
+
+def create_shared_database(database_settings: Settings) -> SharedMemoryDatabase:
+    shared_settings = database_settings.SHARED_MEMORY
+    return SharedMemoryDatabase(
+        shared_settings.NAME,
+        capacity=shared_settings.CAPACITY,
+        name_capacity=shared_settings.NAME_CAPACITY,
+    )
+
+
+def create_postgres_database(database_settings: Settings) -> SQLDatabase:
+    return setup_db_connection(
+        database_settings.DATABASE_URL,
+        trigram_index=database_settings.USE_TRIGRAM_INDEX,
+        slow_query_ms=database_settings.LOGGING.SLOW_QUERY_MS,
+        **database_settings.DATABASE_POOL.engine_options(
+            database_settings.database_driver()
+        ),
+    )
+
+
+def create_sqlite_database(database_settings: Settings) -> SQLiteDatabase:
+    sqlite_settings = database_settings.SQLITE
+    return setup_sqlite_connection(
+        sqlite_settings.PATH,
+        synchronous=sqlite_settings.SYNCHRONOUS,
+        mmap_size=sqlite_settings.MMAP_SIZE,
+        cache_size=sqlite_settings.CACHE_SIZE,
+        busy_timeout_ms=sqlite_settings.BUSY_TIMEOUT_MS,
+        slow_query_ms=database_settings.LOGGING.SLOW_QUERY_MS,
+        **database_settings.DATABASE_POOL.pool_options(),
+    )
+
+
+def create_sql_repository(database_settings: Settings, database) -> SQLRepository:
+    return SQLRepository(
+        database=database, trusted_rows=database_settings.TRUST_DATABASE_ROWS
+    )
+
+
+BACKENDS: Dict[DatabaseBackend, Backend] = {
+    DatabaseBackend.MEMORY: Backend(create_memory_database, create_memory_repository),
+    DatabaseBackend.POSTGRES: Backend(create_postgres_database, create_sql_repository),
+    DatabaseBackend.SQLITE: Backend(create_sqlite_database, create_sql_repository),
+    DatabaseBackend.COLUMNAR: Backend(
+        create_columnar_database, create_columnar_repository
+    ),
+    DatabaseBackend.SHARED: Backend(create_shared_database, create_columnar_repository),
+}
+
+
+# other workers write to these too, so their version moves without this worker's writes
+SHARED_BACKENDS = frozenset(
+    (DatabaseBackend.POSTGRES, DatabaseBackend.SQLITE, DatabaseBackend.SHARED)
+)
+
+
+def create_database(database_settings: Settings):
+    return BACKENDS[database_settings.USE_DATABASE].create_database(database_settings)
+
+
+def create_repository(database_settings: Settings, database) -> AbstractRepository:
+    backend = BACKENDS[database_settings.USE_DATABASE]
+    repository = backend.create_repository(database_settings, database)
+    if database_settings.CACHE.ENABLED:
+        repository = CachingRepository(
+            repository,
+            cache=RepositoryCache(
+                max_entities=database_settings.CACHE.MAX_ENTITIES,
+                max_lists=database_settings.CACHE.MAX_LISTS,
+                ttl=database_settings.CACHE.TTL_SECONDS,
+            ),
+            other_writers=database_settings.USE_DATABASE in SHARED_BACKENDS,
+        )
+    return repository
+
+
+def create_manager(
+    database_settings: Settings, repository: AbstractRepository
+) -> DomainLogicManager:
+    return DomainLogicManager(
+        repository=repository,
+        single_flight=SingleFlight() if database_settings.SINGLE_FLIGHT else None,
+    )
@@ -1,37 +1,76 @@
 from typing import Optional
 
-from fastapi import Depends
+from fastapi import Request
 
-from simple_example.domain_logic.consts import DataTypeEnum
+from simple_example.domain_logic.consts import DataTypeEnum, PageLimits
 from simple_example.domain_logic.manager import DomainLogicManager
 from simple_example.domain_logic.models import Filters
 from simple_example.domain_logic.repository import AbstractRepository
-from simple_example.repository_implementation.memory_repo import MemoryRepository
-from simple_example.repository_implementation.sqlalchemy_repo import SQLRepository
-from simple_example.web_app_example.settings import get_settings
+from simple_example.domain_logic.single_flight import SingleFlight
+from simple_example.repository_implementation.caching_repo import (
+    CachingRepository,
+    RepositoryCache,
+)
+from simple_example.web_app_example.instrumentation import Metrics
 
+# repository and manager are built once in app_setup, dependencies only look them up
 
-def get_repository(settings=Depends(get_settings)):
-    from simple_example.web_app_example.db_initialize import database  # noqa
 
-    if settings.USE_DATABASE:
+def get_database(request: Request):
+    return request.app.state.database
 
-        def inner_get_repository() -> AbstractRepository:
-            return SQLRepository(database=database)
 
-    else:
+def get_repository(request: Request) -> AbstractRepository:
+    return request.app.state.repository
 
-        def inner_get_repository() -> AbstractRepository:
-            return MemoryRepository(database)
 
-    return inner_get_repository()
+def get_repository_cache(request: Request) -> Optional[RepositoryCache]:
+    repository = request.app.state.repository
+    if isinstance(repository, CachingRepository):
+        return repository.cache
+    return None
 
 
-def get_manager(repository=Depends(get_repository)) -> DomainLogicManager:
-    return DomainLogicManager(repository=repository)
+def get_manager(request: Request) -> DomainLogicManager:
+    return request.app.state.manager
+
+
+def get_single_flight(request: Request) -> Optional[SingleFlight]:
+    return request.app.state.manager.single_flight
+
+
+def get_metrics(request: Request) -> Metrics:
+    return request.app.state.metrics
 
 
 async def search_parameters(
-    q: Optional[str] = None, data_type: Optional[DataTypeEnum] = None
+    q: Optional[str] = None,
+    data_type: Optional[DataTypeEnum] = None,
+    limit: int = PageLimits.MAX.value,
+    after_id: Optional[int] = None,
+) -> Filters:
+    return Filters(search_string=q, data_type=data_type, limit=limit, after_id=after_id)
+
+
+async def export_parameters(
+    q: Optional[str] = None,
+    data_type: Optional[DataTypeEnum] = None,
+    limit: Optional[int] = None,
+    after_id: Optional[int] = None,
+) -> Filters:
+    # an export streams every match unless a limit is asked for
+    return Filters(search_string=q, data_type=data_type, limit=limit, after_id=after_id)
+
+
+async def stats_parameters(
+    q: Optional[str] = None,
+    data_type: Optional[DataTypeEnum] = None,
+    count_lower_limit: Optional[int] = None,
+    count_upper_limit: Optional[int] = None,
 ) -> Filters:
-    return Filters(search_string=q, data_type=data_type)
+    return Filters(
+        search_string=q,
+        data_type=data_type,
+        count_lower_limit=count_lower_limit,
+        count_upper_limit=count_upper_limit,
+    )
@@ -1,70 +1,264 @@
-from typing import Optional
+import hashlib
+from typing import AsyncIterator, List, Optional
 
-from fastapi import APIRouter, Depends
-from pydantic import PositiveInt
+from fastapi import APIRouter, Body, Depends, Header, Request, Response
+from fastapi.responses import JSONResponse, StreamingResponse
+from pydantic import PositiveInt, TypeAdapter
 
+from simple_example.domain_logic.consts import BulkCreateLimits, PageLimits
+from simple_example.domain_logic.exceptions import ObjectNotFound, PreconditionFailed
 from simple_example.domain_logic.manager import DomainLogicManager
-from simple_example.domain_logic.models import DataEntity, Filters, InputModel
+from simple_example.domain_logic.models import (
+    BulkCreateResult,
+    DataEntity,
+    DataStats,
+    Filters,
+    InputModel,
+)
 from simple_example.web_app_example import application_globals
-from simple_example.web_app_example.dependencies import get_manager, search_parameters
+from simple_example.web_app_example.dependencies import (
+    export_parameters,
+    get_manager,
+    search_parameters,
+    stats_parameters,
+)
+from simple_example.web_app_example.logger import ModelDump
 
 main_router = APIRouter()
 
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+ETAG_HEADER = "ETag"
+EXPORT_LINES_PER_CHUNK = 500
+DATA_ENTITY_LIST = TypeAdapter(List[DataEntity])
+
+
+def set_next_cursor(
+    response: Response, limit: Optional[int], items: List[DataEntity]
+) -> List[DataEntity]:
+    if limit is not None and len(items) == limit:
+        response.headers[NEXT_CURSOR_HEADER] = str(items[-1].id)
+    return items
+
+
+def entity_tag(item: DataEntity) -> str:
+    # a hash of the content, the same in every worker and after restarts
+    content = f"{item.id}\0{item.name}\0{item.data_type}\0{item.count}"
+    return f'"{hashlib.blake2b(content.encode(), digest_size=8).hexdigest()}"'
+
+
+async def dataset_tag(manager: DomainLogicManager) -> Optional[str]:
+    # weak, any write changes it even if this result stays the same
+    version = await manager.dataset_version()
+    return None if version is None else f'W/"{version}"'
+
+
+def tag_matches(header: Optional[str], tag: str, weak: bool) -> bool:
+    # If-None-Match compares weakly, If-Match strongly, where weak tags never match
+    if header is None:
+        return False
+    for candidate in header.split(","):
+        candidate = candidate.strip()
+        if candidate == "*":
+            return True
+        if weak:
+            if candidate.removeprefix("W/") == tag.removeprefix("W/"):
+                return True
+        elif candidate == tag and not tag.startswith("W/"):
+            return True
+    return False
+
+
+def not_modified(tag: str) -> Response:
+    return Response(status_code=304, headers={ETAG_HEADER: tag})
+
+
+async def if_match_item(
+    manager: DomainLogicManager, item_id: int, if_match: Optional[str]
+) -> Optional[DataEntity]:
+    # the item If-Match was checked against, the write applies only if it is unchanged
+    if if_match is None:
+        return None
+    item = await manager.get(item_id=item_id)
+    if item is None or not tag_matches(if_match, entity_tag(item), weak=False):
+        raise PreconditionFailed()
+    # the memory backend changes its stored items in place
+    return item.model_copy()
+
+
+def list_response(
+    request: Request, response: Response, limit: Optional[int], items: List[DataEntity]
+):
+    set_next_cursor(response, limit, items)
+    if not request.app.state.settings.FAST_JSON_RESPONSES:
+        return items
+    # items are already valid, skip jsonable_encoder and dump straight to bytes
+    return Response(
+        content=DATA_ENTITY_LIST.dump_json(items),
+        media_type="application/json",
+        headers=dict(response.headers),
+    )
+
 
 @main_router.post("/search/")
 async def search_data(
-    filters: Filters, manager: DomainLogicManager = Depends(get_manager)
+    filters: Filters,
+    request: Request,
+    response: Response,
+    manager: DomainLogicManager = Depends(get_manager),
 ):
-    application_globals.logger.info(f"filters passed: {filters.model_dump()}")
-    return await manager.list(filters=filters)
+    application_globals.logger.info("filters passed: %s", ModelDump(filters))
+    if filters.limit is None:
+        # every list endpoint answers one page at most, exports stream the rest
+        filters = filters.model_copy(update={"limit": PageLimits.MAX.value})
+    items = await manager.list(filters=filters)
+    return list_response(request, response, filters.limit, items)
 
 
 @main_router.post("/data/", response_model=DataEntity)
 async def create_data(
-    data: InputModel, manager: DomainLogicManager = Depends(get_manager)
+    data: InputModel,
+    response: Response,
+    manager: DomainLogicManager = Depends(get_manager),
+):
+    application_globals.logger.info("data passed: %s", ModelDump(data))
+    item = await manager.create(data)
+    response.headers[ETAG_HEADER] = entity_tag(item)
+    return item
+
+
+@main_router.post("/data/bulk", response_model=BulkCreateResult)
+async def bulk_create_data(
+    data: List[InputModel] = Body(
+        min_length=BulkCreateLimits.MIN, max_length=BulkCreateLimits.MAX
+    ),
+    manager: DomainLogicManager = Depends(get_manager),
 ):
-    application_globals.logger.info(f"data passed: {data.model_dump()}")
-    return await manager.create(data)
+    application_globals.logger.info("bulk data passed: %d items", len(data))
+    return await manager.bulk_create(input_data=data)
 
 
 @main_router.put("/data/{item_id}", response_model=DataEntity)
 async def update_data(
     item_id: PositiveInt,
     data: InputModel,
+    response: Response,
+    if_match: Optional[str] = Header(None),
     manager: DomainLogicManager = Depends(get_manager),
 ):
-    application_globals.logger.info(f"data passed: {data.model_dump()}")
-    return await manager.update(item_id=item_id, update_data=data)
+    application_globals.logger.info("data passed: %s", ModelDump(data))
+    expected = await if_match_item(manager, item_id, if_match)
+    item = await manager.update(item_id=item_id, update_data=data, expected=expected)
+    response.headers[ETAG_HEADER] = entity_tag(item)
+    return item
 
 
 @main_router.delete("/data/{item_id}")
 async def delete_data(
-    item_id: PositiveInt, manager: DomainLogicManager = Depends(get_manager)
+    item_id: PositiveInt,
+    if_match: Optional[str] = Header(None),
+    manager: DomainLogicManager = Depends(get_manager),
 ):
-    application_globals.logger.info(f"ID to delete: {item_id}")
-    is_deleted = await manager.delete(item_id=item_id)
+    application_globals.logger.info("ID to delete: %s", item_id)
+    expected = await if_match_item(manager, item_id, if_match)
+    is_deleted = await manager.delete(item_id=item_id, expected=expected)
     return {"success": is_deleted}
 
 
 @main_router.post("/filter/")
 async def filter_data(
+    request: Request,
+    response: Response,
     search_string: Optional[str] = None,
     data_type: Optional[int] = None,
     count_upper_limit: Optional[int] = None,
     count_lower_limit: Optional[int] = None,
+    limit: int = PageLimits.MAX.value,
+    after_id: Optional[int] = None,
     manager: DomainLogicManager = Depends(get_manager),
 ):
-    return await manager.search_list(
+    items = await manager.search_list(
         search_string=search_string,
         data_type=data_type,
         count_upper_limit=count_upper_limit,
         count_lower_limit=count_lower_limit,
+        limit=limit,
+        after_id=after_id,
     )
+    return list_response(request, response, limit, items)
 
 
 @main_router.get("/data/")
 async def list_data(
+    request: Request,
+    response: Response,
     filters: Filters = Depends(search_parameters),
+    if_none_match: Optional[str] = Header(None),
+    manager: DomainLogicManager = Depends(get_manager),
+):
+    # taken before the query, so a write racing it can only make the tag older
+    tag = await dataset_tag(manager)
+    if tag is not None:
+        if tag_matches(if_none_match, tag, weak=True):
+            return not_modified(tag)
+        response.headers[ETAG_HEADER] = tag
+    items = await manager.list(filters=filters)
+    return list_response(request, response, filters.limit, items)
+
+
+# registered before any GET /data/{item_id}, which would take "stats" as an id
+@main_router.get("/data/stats", response_model=DataStats)
+async def data_stats(
+    response: Response,
+    filters: Filters = Depends(stats_parameters),
+    if_none_match: Optional[str] = Header(None),
+    manager: DomainLogicManager = Depends(get_manager),
+):
+    tag = await dataset_tag(manager)
+    if tag is not None:
+        if tag_matches(if_none_match, tag, weak=True):
+            return not_modified(tag)
+        response.headers[ETAG_HEADER] = tag
+    return await manager.stats(filters=filters)
+
+
+async def ndjson_lines(items: AsyncIterator[DataEntity]) -> AsyncIterator[str]:
+    lines = []
+    async for item in items:
+        lines.append(item.model_dump_json())
+        if len(lines) == EXPORT_LINES_PER_CHUNK:
+            yield "\n".join(lines) + "\n"
+            lines = []
+    if lines:
+        yield "\n".join(lines) + "\n"
+
+
+@main_router.get("/data/export")
+async def export_data(
+    filters: Filters = Depends(export_parameters),
+    manager: DomainLogicManager = Depends(get_manager),
+):
+    return StreamingResponse(
+        ndjson_lines(manager.iter_list(filters=filters)),
+        media_type="application/x-ndjson",
+    )
+
+
+# registered after the other GET /data/ routes, "stats" and "export" are not ids
+@main_router.get("/data/{item_id}", response_model=DataEntity)
+async def get_data(
+    item_id: PositiveInt,
+    response: Response,
+    if_none_match: Optional[str] = Header(None),
     manager: DomainLogicManager = Depends(get_manager),
 ):
-    return await manager.list(filters=filters)
+    item = await manager.get(item_id=item_id)
+    if item is None:
+        return JSONResponse(
+            status_code=404, content={"message": ObjectNotFound.message}
+        )
+    tag = entity_tag(item)
+    if tag_matches(if_none_match, tag, weak=True):
+        # the body is never serialized
+        return not_modified(tag)
+    response.headers[ETAG_HEADER] = tag
+    return item
@@ -0,0 +1,16 @@
+from fastapi import APIRouter, Request
+from fastapi.responses import JSONResponse
+
+health_router = APIRouter(prefix="/health")
+
+
+@health_router.get("/live")
+async def live():
+    return {"status": "live"}
+
+
+@health_router.get("/ready")
+async def ready(request: Request):
+    if not getattr(request.app.state, "ready", False):
+        return JSONResponse(status_code=503, content={"status": "starting"})
+    return {"status": "ready"}
@@ -0,0 +1,221 @@
+import inspect
+import time
+from bisect import bisect_left
+from contextvars import ContextVar
+from functools import wraps
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
+
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncEngine
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+# seconds, the Prometheus client defaults
+LATENCY_BUCKETS = (
+    0.001,
+    0.0025,
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1,
+    2.5,
+    5,
+    10,
+)
+SERVER_TIMING_HEADER = b"server-timing"
+# set in the ASGI scope of requests the app makes to itself, kept out of the metrics
+UNOBSERVED_SCOPE_KEY = "simple_example.unobserved"
+
+# span name -> (total seconds, calls) of the request being handled
+request_spans: ContextVar[Optional[Dict[str, List[float]]]] = ContextVar(
+    "request_spans", default=None
+)
+
+
+class Histogram:
+    def __init__(self, buckets: Tuple[float, ...] = LATENCY_BUCKETS):
+        self.buckets = buckets
+        # one more slot for observations above the last bucket
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def cumulative_counts(self) -> List[Tuple[str, int]]:
+        total = 0
+        counts = []
+        for bound, count in zip(self.buckets + ("+Inf",), self.counts):
+            total += count
+            counts.append((str(bound), total))
+        return counts
+
+
+def escape_label(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+class Metrics:
+    def __init__(self):
+        self.requests: Dict[Tuple[str, str, str], Histogram] = {}
+        self.spans: Dict[str, Histogram] = {}
+
+    def observe_request(self, method: str, route: str, status: int, duration: float):
+        key = (method, route, str(status))
+        histogram = self.requests.get(key)
+        if histogram is None:
+            histogram = self.requests[key] = Histogram()
+        histogram.observe(duration)
+
+    def observe_span(self, name: str, duration: float):
+        histogram = self.spans.get(name)
+        if histogram is None:
+            histogram = self.spans[name] = Histogram()
+        histogram.observe(duration)
+        spans = request_spans.get()
+        if spans is not None:
+            span = spans.setdefault(name, [0.0, 0])
+            span[0] += duration
+            span[1] += 1
+
+    def timed(self, name: str, function: Callable[..., Awaitable]):
+        @wraps(function)
+        async def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return await function(*args, **kwargs)
+            finally:
+                self.observe_span(name, time.perf_counter() - start)
+
+        return wrapper
+
+    def prometheus(self) -> str:
+        families = (
+            (
+                "http_request_duration_seconds",
+                "Request latency by route, until the last body chunk is sent.",
+                [
+                    ({"method": method, "route": route, "status": status}, histogram)
+                    for (method, route, status), histogram in self.requests.items()
+                ],
+            ),
+            (
+                "span_duration_seconds",
+                "Time spent in manager methods and database round trips.",
+                [({"span": name}, histogram) for name, histogram in self.spans.items()],
+            ),
+        )
+        lines = []
+        for name, description, series in families:
+            lines.append(f"# HELP {name} {description}")
+            lines.append(f"# TYPE {name} histogram")
+            for labels, histogram in series:
+                label_text = ",".join(
+                    f'{key}="{escape_label(value)}"' for key, value in labels.items()
+                )
+                for bound, count in histogram.cumulative_counts():
+                    lines.append(f'{name}_bucket{{{label_text},le="{bound}"}} {count}')
+                lines.append(f"{name}_sum{{{label_text}}} {histogram.sum}")
+                lines.append(f"{name}_count{{{label_text}}} {histogram.count}")
+        return "\n".join(lines) + "\n"
+
+
+class Instrumented:
+    # coroutine methods of the target are timed as spans, everything else passes through
+    def __init__(self, target, name: str, metrics: Metrics):
+        self.target = target
+        for method_name, method in inspect.getmembers(
+            target, inspect.iscoroutinefunction
+        ):
+            if not method_name.startswith("_"):
+                setattr(
+                    self, method_name, metrics.timed(f"{name}.{method_name}", method)
+                )
+
+    def __getattr__(self, name: str):
+        return getattr(self.target, name)
+
+
+def instrument_engine(engine: AsyncEngine, metrics: Metrics):
+    # cursor events run in the greenlet of the awaiting task, which shares its context
+    @event.listens_for(engine.sync_engine, "before_cursor_execute")
+    def before_cursor_execute(conn, cursor, statement, parameters, context, many):
+        context.instrumentation_start = time.perf_counter()
+
+    @event.listens_for(engine.sync_engine, "after_cursor_execute")
+    def after_cursor_execute(conn, cursor, statement, parameters, context, many):
+        metrics.observe_span("db", time.perf_counter() - context.instrumentation_start)
+
+
+def server_timing(spans: Dict[str, List[float]], total: float) -> bytes:
+    entries = [
+        f'{name};dur={duration * 1000:.2f};desc="{calls}x"'
+        for name, (duration, calls) in spans.items()
+    ]
+    entries.append(f"app;dur={total * 1000:.2f}")
+    return ", ".join(entries).encode()
+
+
+class InstrumentationMiddleware:
+    def __init__(
+        self,
+        app: ASGIApp,
+        metrics: Metrics,
+        server_timing: bool = False,
+        route_prefixes: Optional[Dict[int, str]] = None,
+    ):
+        self.app = app
+        self.metrics = metrics
+        self.server_timing = server_timing
+        # id() of a router's own route -> the prefix it was included with;
+        # routes are unhashable, and newer FastAPI matches the router's route
+        # itself instead of a prefixed copy
+        self.route_prefixes = route_prefixes or {}
+
+    def route_label(self, scope: Scope) -> str:
+        # the route template, raw paths would give every item id its own series
+        route = scope.get("route")
+        path = getattr(route, "path", None)
+        if path is None:
+            return "unmatched"
+        return self.route_prefixes.get(id(route), "") + path
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http" or scope.get(UNOBSERVED_SCOPE_KEY):
+            await self.app(scope, receive, send)
+            return
+
+        start = time.perf_counter()
+        spans: Dict[str, List[float]] = {}
+        token = request_spans.set(spans)
+        status = 500
+
+        async def instrumented_send(message: Message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                if self.server_timing:
+                    message["headers"] = list(message.get("headers", [])) + [
+                        (
+                            SERVER_TIMING_HEADER,
+                            server_timing(spans, time.perf_counter() - start),
+                        )
+                    ]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, instrumented_send)
+        finally:
+            request_spans.reset(token)
+            self.metrics.observe_request(
+                scope["method"],
+                self.route_label(scope),
+                status,
+                time.perf_counter() - start,
+            )
@@ -1,29 +1,73 @@
+import atexit
 import logging
 import os
+import queue
 import re
 import sys
 from datetime import datetime
-from logging.handlers import WatchedFileHandler
+from logging.handlers import QueueHandler, QueueListener, WatchedFileHandler
+from typing import Iterable, List, Tuple
 
 import json_log_formatter
+from pydantic import BaseModel
 
-from simple_example.web_app_example.settings import LoggingConfiguration
+from simple_example.repository_implementation.query_statistics import SQL_LOGGER_NAME
+from simple_example.web_app_example.settings import (
+    LoggingConfiguration,
+    RedactionRule,
+)
+
+
+class Redactor(logging.Filter):
+    def __init__(self, rules: Iterable[RedactionRule]):
+        super().__init__()
+        self.rules = [
+            (rule.MARKER, re.compile(rule.PATTERN), rule.REPLACEMENT) for rule in rules
+        ]
+
+    def redact(self, text: str) -> str:
+        for marker, pattern, replacement in self.rules:
+            if marker in text:
+                text = pattern.sub(replacement, text)
+        return text
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        # a handler filter, so with LOG_ASYNC it runs on the listener thread; the
+        # first handler merges and redacts the record, the others format the cached
+        # message. Logging calls always pass a tuple, args of None mark a done record
+        if record.args is None:
+            return True
+        try:
+            message = record.getMessage()
+        except Exception:
+            # a malformed call is left to the formatter, which reports it the
+            # usual way instead of raising out of the filter
+            return True
+        record.msg, record.args = self.redact(message), None
+        return True
+
+
+DEFAULT_REDACTOR = Redactor(LoggingConfiguration().REDACTION_RULES)
 
 
 class AppFormatter(logging.Formatter):
-    @staticmethod
-    def filter_sensitive_information(s: str):
-        return re.sub(r":\/\/(.*?)\@", r":***:***@//", s)
+    def __init__(self, *args, redactor: Redactor = DEFAULT_REDACTOR, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.redactor = redactor
 
-    def format(self, record: logging.LogRecord):
-        record = logging.Formatter.format(self, record)
-        record = self.filter_sensitive_information(record)
-        return record
+    def format(self, record: logging.LogRecord) -> str:
+        # the handler filter only redacts the message, this covers exception text;
+        # already redacted messages usually fail the marker check right away
+        return self.redactor.redact(super().format(record))
 
 
 class CustomisedJSONFormatter(json_log_formatter.JSONFormatter):
+    def __init__(self, *args, redactor: Redactor = DEFAULT_REDACTOR, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.redactor = redactor
+
     def json_record(self, message: str, extra: dict, record: logging.LogRecord) -> dict:
-        extra["message"] = AppFormatter.filter_sensitive_information(message)
+        extra["message"] = self.redactor.redact(message)
 
         # Include builtins
         extra["level"] = record.levelname
@@ -38,6 +82,17 @@ class CustomisedJSONFormatter(json_log_formatter.JSONFormatter):
         return extra
 
 
+class ModelDump:
+    # logs a model in its dict form, dumped only once the record is formatted
+    __slots__ = ("model",)
+
+    def __init__(self, model: BaseModel):
+        self.model = model
+
+    def __str__(self) -> str:
+        return str(self.model.model_dump())
+
+
 class LogLevelFilter(logging.Filter):
     def __init__(self, level):
         self.level = level
@@ -47,6 +102,96 @@ class LogLevelFilter(logging.Filter):
         return record.levelno == self.level
 
 
+class BoundedQueueHandler(QueueHandler):
+    def __init__(self, log_queue: queue.Queue, block: bool):
+        super().__init__(log_queue)
+        self.block = block
+        self.dropped = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # merged, redacted and formatted by the listener's handlers instead of the
+        # caller; a copy per queue, records of the app logger reach the root one too.
+        # Only the attributes are copied, copy.copy costs as much as the record
+        copied = record.__class__.__new__(record.__class__)
+        copied.__dict__.update(record.__dict__)
+        return copied
+
+    def enqueue(self, record: logging.LogRecord):
+        if self.block:
+            # back-pressure: the caller waits until the listener catches up
+            self.queue.put(record)
+            return
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+# loggers routed through a queue, with the handlers their listener writes to
+queued_loggers: List[Tuple[logging.Logger, BoundedQueueHandler, QueueListener]] = []
+# loggers configured to log through a queue, rerouted by start_async_logging
+async_routes: List[
+    Tuple[logging.Logger, List[logging.Handler], LoggingConfiguration]
+] = []
+
+
+def route_through_queue(
+    logger: logging.Logger,
+    handlers: List[logging.Handler],
+    log_settings: LoggingConfiguration,
+):
+    async_routes.append((logger, handlers, log_settings))
+    queue_handlers(logger, handlers, log_settings)
+
+
+def queue_handlers(
+    logger: logging.Logger,
+    handlers: List[logging.Handler],
+    log_settings: LoggingConfiguration,
+):
+    handlers = [handler for handler in handlers if handler in logger.handlers]
+    if not handlers:
+        return
+    queue_handler = BoundedQueueHandler(
+        queue.Queue(maxsize=log_settings.LOG_QUEUE_SIZE),
+        block=log_settings.LOG_QUEUE_FULL == "block",
+    )
+    for handler in handlers:
+        logger.removeHandler(handler)
+    logger.addHandler(queue_handler)
+    listener = QueueListener(queue_handler.queue, *handlers, respect_handler_level=True)
+    listener.start()
+    queued_loggers.append((logger, queue_handler, listener))
+
+
+def start_async_logging():
+    # loggers are process-global, so an app starting after another one shut
+    # down routes them through queues again instead of writing directly
+    queued = {logger for logger, _, _ in queued_loggers}
+    for logger, handlers, log_settings in async_routes:
+        if logger not in queued:
+            queue_handlers(logger, handlers, log_settings)
+            queued.add(logger)
+
+
+def stop_async_logging():
+    # drain the queues and write directly again, nothing is lost or left blocked
+    while queued_loggers:
+        logger, queue_handler, listener = queued_loggers.pop()
+        logger.removeHandler(queue_handler)
+        listener.stop()
+        for handler in listener.handlers:
+            logger.addHandler(handler)
+        if queue_handler.dropped:
+            logger.warning(
+                "%d log records were dropped, the log queue was full",
+                queue_handler.dropped,
+            )
+
+
+atexit.register(stop_async_logging)
+
+
 def create_watched_file_handler(
     log_path: str,
     filename: str,
@@ -74,14 +219,20 @@ def get_standard_logger(
 
     stream_log_format = prefix_log_format + "CONSOLE %(message)s"
 
+    redactor = Redactor(log_settings.REDACTION_RULES)
+
     # Basic config settings
     stdout_stream_handler = logging.StreamHandler(sys.stdout)
     stdout_stream_handler.setLevel(log_settings.MIN_LOG_LEVEL)
-    stdout_stream_handler.setFormatter(AppFormatter(stream_log_format))
+    stdout_stream_handler.setFormatter(
+        AppFormatter(stream_log_format, redactor=redactor)
+    )
 
     stderr_stream_handler = logging.StreamHandler(sys.stderr)
     stderr_stream_handler.setLevel(logging.ERROR)
-    stderr_stream_handler.setFormatter(AppFormatter(stream_log_format))
+    stderr_stream_handler.setFormatter(
+        AppFormatter(stream_log_format, redactor=redactor)
+    )
 
     logging.basicConfig(
         datefmt="%Y-%m-%d %H:%M:%S",
@@ -92,7 +243,7 @@ def get_standard_logger(
     standard_logger = logging.getLogger(name)
 
     if log_settings.LOG_SQL:
-        sql_logger = logging.getLogger("databases")
+        sql_logger = logging.getLogger(SQL_LOGGER_NAME)
         sql_logger.setLevel(level=log_settings.MIN_LOG_LEVEL)
         if not log_settings.LOG_TO_FILE:
             sql_logger.addHandler(stdout_stream_handler)
@@ -100,7 +251,7 @@ def get_standard_logger(
     if log_settings.LOG_TO_FILE:
         file_log_format = prefix_log_format + "%(message)s"
 
-        app_formatter = AppFormatter(file_log_format)
+        app_formatter = AppFormatter(file_log_format, redactor=redactor)
 
         if log_settings.LOG_SQL:
 
@@ -155,4 +306,24 @@ def get_standard_logger(
                     apply_level_filter=False,
                 )
             )
+
+    sql_handlers = sql_logger.handlers if log_settings.LOG_SQL else []
+    for handler in [
+        stdout_stream_handler,
+        stderr_stream_handler,
+        *standard_logger.handlers,
+        *sql_handlers,
+    ]:
+        handler.addFilter(redactor)
+
+    if log_settings.LOG_ASYNC:
+        # handlers write from listener threads, logging calls only enqueue
+        route_through_queue(
+            logging.getLogger(),
+            [stdout_stream_handler, stderr_stream_handler],
+            log_settings,
+        )
+        route_through_queue(standard_logger, standard_logger.handlers, log_settings)
+        if log_settings.LOG_SQL:
+            route_through_queue(sql_logger, sql_logger.handlers, log_settings)
     return standard_logger
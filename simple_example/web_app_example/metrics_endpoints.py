@@ -0,0 +1,13 @@
+from fastapi import APIRouter, Depends
+from fastapi.responses import PlainTextResponse
+
+from simple_example.web_app_example.dependencies import get_metrics
+
+metrics_router = APIRouter()
+
+PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+@metrics_router.get("/metrics", response_class=PlainTextResponse)
+async def metrics(metrics=Depends(get_metrics)):
+    return PlainTextResponse(metrics.prometheus(), media_type=PROMETHEUS_CONTENT_TYPE)
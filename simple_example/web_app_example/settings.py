@@ -1,20 +1,71 @@
 import logging
 import os.path
+import re
+from enum import Enum
 from functools import lru_cache
-from typing import Optional
+from typing import List, Literal, Optional
 
 from pydantic import BaseModel, Field, PostgresDsn, field_validator, model_validator
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
 
+class DatabaseBackend(str, Enum):
+    MEMORY = "memory"
+    POSTGRES = "postgres"
+    SQLITE = "sqlite"
+    # in memory, rows in typed arrays instead of model objects
+    COLUMNAR = "columnar"
+    # the columnar arrays in shared memory, one dataset for all workers on a node
+    SHARED = "shared"
+
+
+# USE_DATABASE was a bool before there was more than one database
+LEGACY_BACKENDS = {
+    "true": DatabaseBackend.POSTGRES,
+    "1": DatabaseBackend.POSTGRES,
+    "false": DatabaseBackend.MEMORY,
+    "0": DatabaseBackend.MEMORY,
+}
+
+# async PostgreSQL drivers, the statement options are connect arguments of each
+POSTGRES_DRIVERS = ("asyncpg", "psycopg")
+
+
+class RedactionRule(BaseModel):
+    PATTERN: str
+    REPLACEMENT: str
+    # the regex only runs on messages containing MARKER, empty always runs it
+    MARKER: str = ""
+
+    @field_validator("PATTERN")
+    @classmethod
+    def validate_pattern(cls, v):
+        try:
+            re.compile(v)
+        except re.error as e:
+            raise ValueError(f"'{v}' is not a valid regular expression: {e}")
+        return v
+
+
 class LoggingConfiguration(BaseModel):
     LOG_PATH: Optional[str] = None
     LOG_TO_FILE: bool = False
     LOG_TO_LEVEL_FILES: bool = False
     JSON_LOG_FILE: Optional[str] = None
     LOG_SQL: bool = True
+    # SQL statements taking at least this long are logged, None turns the log off
+    SLOW_QUERY_MS: Optional[float] = Field(default=100, gt=0)
     LOG_JSON: bool = False
     MIN_LOG_LEVEL: int = logging.DEBUG
+    # handlers write from a background thread through a bounded queue
+    LOG_ASYNC: bool = False
+    LOG_QUEUE_SIZE: int = Field(default=10000, gt=0)
+    # when the queue is full: drop the record or block the caller until there is room
+    LOG_QUEUE_FULL: Literal["drop", "block"] = "drop"
+    # applied in order to every message, credentials in urls are hidden by default
+    REDACTION_RULES: List[RedactionRule] = [
+        RedactionRule(PATTERN=r":\/\/(.*?)\@", REPLACEMENT=r":***:***@//", MARKER="://")
+    ]
 
     @field_validator("LOG_PATH")
     @classmethod
@@ -50,23 +101,144 @@ class LoggingConfiguration(BaseModel):
         return self
 
 
+class DatabasePoolConfiguration(BaseModel):
+    POOL_SIZE: int = Field(default=5, ge=1)
+    MAX_OVERFLOW: int = Field(default=10, ge=0)
+    POOL_TIMEOUT: float = Field(default=30, gt=0)
+    # seconds, -1 keeps connections forever
+    POOL_RECYCLE: int = -1
+    POOL_PRE_PING: bool = False
+    # prepared statements cached per connection, 0 disables them; psycopg keeps its
+    # own cache size and only reads 0
+    STATEMENT_CACHE_SIZE: int = Field(default=100, ge=0)
+    # milliseconds, None uses the server default
+    STATEMENT_TIMEOUT: Optional[int] = Field(default=None, gt=0)
+    # connections opened and prepared by the startup warm-up
+    WARMUP_CONNECTIONS: int = Field(default=1, ge=0)
+
+    def pool_options(self) -> dict:
+        return {
+            "pool_size": self.POOL_SIZE,
+            "max_overflow": self.MAX_OVERFLOW,
+            "pool_timeout": self.POOL_TIMEOUT,
+            "pool_recycle": self.POOL_RECYCLE,
+            "pool_pre_ping": self.POOL_PRE_PING,
+        }
+
+    def engine_options(self, driver: str) -> dict:
+        return {**self.pool_options(), "connect_args": self.connect_args(driver)}
+
+    def connect_args(self, driver: str) -> dict:
+        if driver == "asyncpg":
+            server_settings = {}
+            if self.STATEMENT_TIMEOUT is not None:
+                server_settings["statement_timeout"] = str(self.STATEMENT_TIMEOUT)
+            return {
+                "prepared_statement_cache_size": self.STATEMENT_CACHE_SIZE,
+                "server_settings": server_settings,
+            }
+        connect_args = {}
+        if self.STATEMENT_TIMEOUT is not None:
+            connect_args["options"] = f"-c statement_timeout={self.STATEMENT_TIMEOUT}"
+        if self.STATEMENT_CACHE_SIZE == 0:
+            connect_args["prepare_threshold"] = None
+        return connect_args
+
+
+class SQLiteConfiguration(BaseModel):
+    PATH: Optional[str] = None
+    # WAL is always on, NORMAL only fsyncs at checkpoints, which is safe with WAL
+    SYNCHRONOUS: Literal["OFF", "NORMAL", "FULL", "EXTRA"] = "NORMAL"
+    # bytes of the database file read through mmap, 0 turns it off
+    MMAP_SIZE: int = Field(default=256 * 1024 * 1024, ge=0)
+    # page cache per connection, negative values are KiB, positive values pages
+    CACHE_SIZE: int = -64000
+    # how long a connection waits for a lock held by another process
+    BUSY_TIMEOUT_MS: int = Field(default=5000, ge=0)
+
+
+class CacheConfiguration(BaseModel):
+    ENABLED: bool = False
+    MAX_ENTITIES: int = Field(default=10000, ge=1)
+    MAX_LISTS: int = Field(default=256, ge=1)
+    TTL_SECONDS: float = Field(default=30, gt=0)
+
+
+class MemoryPersistenceConfiguration(BaseModel):
+    # folder for the snapshot and write log of the memory backend, None keeps no files
+    PATH: Optional[str] = None
+    # writes are buffered, a thread writes and fsyncs them this often; 0 writes and
+    # fsyncs every write on the event loop, which blocks the worker for each fsync
+    FSYNC_INTERVAL_MS: float = Field(default=100, ge=0)
+    # log records after which a snapshot is written in the background and the log
+    # starts over
+    SNAPSHOT_EVERY: int = Field(default=100000, gt=0)
+
+    @field_validator("PATH")
+    @classmethod
+    def validate_path(cls, v):
+        if v and not os.path.isdir(v):
+            raise ValueError(f"'{v} is not valid folder")
+        return v
+
+
+class SharedMemoryConfiguration(BaseModel):
+    # segment name under /dev/shm, workers with the same name share the data
+    NAME: str = Field(default="simple_example", pattern=r"^[\w.-]+$")
+    # the segment is sized once for this many rows and bytes of UTF-8 names
+    CAPACITY: int = Field(default=1000000, gt=0)
+    NAME_CAPACITY: int = Field(default=32 * 1024 * 1024, gt=0)
+
+
 class Settings(BaseSettings):
     API_PREFIX: str = Field(strict=True, pattern=r"^(/\w+)*[^/]$|^$")
-    USE_DATABASE: bool
+    USE_DATABASE: DatabaseBackend
     DATABASE_URL: Optional[PostgresDsn] = None
+    SQLITE: SQLiteConfiguration = SQLiteConfiguration()
+    USE_TRIGRAM_INDEX: bool = False
+    # build models from database rows through the cached validator of the in-memory
+    # backends instead of model_validate
+    TRUST_DATABASE_ROWS: bool = False
     APP_NAME: str = "FastAPI example"
     LOGGING: LoggingConfiguration = LoggingConfiguration()
+    DATABASE_POOL: DatabasePoolConfiguration = DatabasePoolConfiguration()
+    CACHE: CacheConfiguration = CacheConfiguration()
+    MEMORY_PERSISTENCE: MemoryPersistenceConfiguration = (
+        MemoryPersistenceConfiguration()
+    )
+    SHARED_MEMORY: SharedMemoryConfiguration = SharedMemoryConfiguration()
+    # share in-flight get/list calls between concurrent identical requests
+    SINGLE_FLIGHT: bool = True
+    # run repository and model warm-up before reporting ready
+    WARMUP: bool = True
+    # list endpoints dump items straight to JSON bytes instead of jsonable_encoder
+    FAST_JSON_RESPONSES: bool = False
+    # per-route latency histograms and spans on /metrics
+    INSTRUMENTATION: bool = True
+    # request spans in a Server-Timing response header, needs INSTRUMENTATION; off by
+    # default, it tells every client how the request was served
+    SERVER_TIMING: bool = False
 
-    @model_validator(mode="before")
+    @field_validator("USE_DATABASE", mode="before")
     @classmethod
-    def validate(cls, data):
-        if (
-            isinstance(data, dict)
-            and data.get("USE_DATABASE")
-            and not data.get("DATABASE_URL")
-        ):
-            raise ValueError("DATABASE_URL must be set when USE_DATABASE=True")
-        return data
+    def validate_use_database(cls, v):
+        return LEGACY_BACKENDS.get(str(v).lower(), v)
+
+    @model_validator(mode="after")
+    def validate_database_url(self):
+        if self.USE_DATABASE == DatabaseBackend.POSTGRES and not self.DATABASE_URL:
+            raise ValueError("DATABASE_URL must be set when USE_DATABASE=postgres")
+        if self.DATABASE_URL and self.database_driver() not in POSTGRES_DRIVERS:
+            raise ValueError(
+                "DATABASE_URL must use one of the drivers "
+                + ", ".join(f"postgresql+{driver}" for driver in POSTGRES_DRIVERS)
+            )
+        if self.USE_DATABASE == DatabaseBackend.SQLITE and not self.SQLITE.PATH:
+            raise ValueError("SQLITE.PATH must be set when USE_DATABASE=sqlite")
+        return self
+
+    def database_driver(self) -> str:
+        return self.DATABASE_URL.scheme.partition("+")[2]
 
     model_config = SettingsConfigDict(
         env_file=".env", env_file_encoding="utf-8", extra="ignore"
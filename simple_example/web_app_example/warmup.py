@@ -0,0 +1,83 @@
+import asyncio
+
+from fastapi import FastAPI
+from starlette.concurrency import run_in_threadpool
+
+from simple_example.domain_logic.consts import DataCounterLimits, DataTypeEnum
+from simple_example.domain_logic.models import DataEntity, Filters, InputModel
+from simple_example.domain_logic.repository import AbstractRepository
+from simple_example.repository_implementation.caching_repo import CachingRepository
+from simple_example.web_app_example.instrumentation import UNOBSERVED_SCOPE_KEY
+
+WARMUP_INPUT = InputModel(
+    name="warm-up", data_type=DataTypeEnum.SIMPLE, count=DataCounterLimits.MIN
+)
+WARMUP_FILTERS = (
+    Filters(limit=1),
+    Filters(
+        search_string=WARMUP_INPUT.name,
+        data_type=WARMUP_INPUT.data_type,
+        count_lower_limit=DataCounterLimits.MIN,
+        count_upper_limit=DataCounterLimits.MAX,
+        limit=1,
+        after_id=1,
+    ),
+)
+
+
+def warm_up_models():
+    item = DataEntity.model_validate({**WARMUP_INPUT.model_dump(), "id": 1})
+    InputModel.model_validate_json(WARMUP_INPUT.model_dump_json())
+    DataEntity.model_validate_json(item.model_dump_json())
+    for filters in WARMUP_FILTERS:
+        Filters.model_validate(filters.model_dump())
+
+
+async def warm_up_repository(repository: AbstractRepository):
+    # read-only calls, warm-up must never change stored data
+    await repository.get(item_id=1)
+    await repository.exists(input_data=WARMUP_INPUT)
+    for filters in WARMUP_FILTERS:
+        await repository.list(filters=filters)
+        async for _ in repository.iter_list(filters=filters):
+            pass
+        await repository.stats(filters=filters)
+
+
+async def warm_up_framework(app: FastAPI, path: str):
+    # sync dependencies run in a worker thread, start the thread pool now
+    await run_in_threadpool(warm_up_models)
+    # routes of included routers are compiled on the first request that walks them
+    scope = {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": "GET",
+        "scheme": "http",
+        "path": path,
+        "raw_path": path.encode(),
+        "root_path": "",
+        "query_string": b"",
+        "headers": [],
+        "client": None,
+        "server": None,
+        UNOBSERVED_SCOPE_KEY: True,
+    }
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        pass
+
+    await app(scope, receive, send)
+
+
+async def warm_up(app: FastAPI, repository: AbstractRepository, connections: int):
+    await warm_up_framework(app, path="/health/live")
+    if isinstance(repository, CachingRepository):
+        repository = repository.repository
+    # concurrent runs check out (and prepare statements on) several pooled connections
+    await asyncio.gather(
+        *(warm_up_repository(repository) for _ in range(max(connections, 1)))
+    )